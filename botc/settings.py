@@ -73,6 +73,8 @@ TEMPLATES = [
                 "django.contrib.messages.context_processors.messages",
                 "django.template.context_processors.request",
                 "scripts.context_processors.custom_configuration",
+                "scripts.context_processors.user_scripts",
+                "scripts.context_processors.character_resolver",
             ],
         },
     }
@@ -197,9 +199,36 @@ CORS_ALLOW_METHODS = "GET"
 
 DISABLE_VALIDATORS = os.getenv("DISABLE_VALIDATORS", False) == "True"
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'local-cache',
+# Whether the similar scripts API narrows down the scripts it compares with MinHash LSH, which is
+# approximate. Either way, requests can ask for an exact comparison with ?exact=true.
+SIMILAR_SCRIPTS_USE_LSH = os.getenv("SIMILAR_SCRIPTS_USE_LSH", "True") == "True"
+
+# Snapshot of the official script tool's roles, used to recognise characters that have been released
+# but not yet added to the database. The snapshot is kept in a writable cache directory rather than
+# the app, is fetched in the background when the app starts, and is refreshed in the background every interval (in
+# seconds, 0 to disable) or with the refresh_official_roles management command.
+OFFICIAL_ROLES_URL = os.getenv("OFFICIAL_ROLES_URL", "https://script.bloodontheclocktower.com/data/roles.json")
+OFFICIAL_ROLES_PATH = os.getenv(
+    "OFFICIAL_ROLES_PATH", Path(os.getenv("XDG_CACHE_HOME", Path.home() / ".cache")) / "botc-scripts" / "official_roles.json"
+)
+OFFICIAL_ROLES_REFRESH_INTERVAL = int(os.getenv("OFFICIAL_ROLES_REFRESH_INTERVAL", 60 * 60 * 6))
+
+# The cache is shared by every worker when CACHE_URL is set to a Redis server
+# (redis://host:port/db). Otherwise each worker process has its own in-memory cache, which is fine
+# for development. The file based cache isn't supported, as its add isn't atomic, so workers
+# could compute the same cached value at once.
+CACHE_URL = os.getenv("CACHE_URL", "")
+if CACHE_URL.startswith(("redis://", "rediss://")):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
     }
-}
\ No newline at end of file
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'local-cache',
+        }
+    }
\ No newline at end of file
@@ -1,12 +1,27 @@
 # Register your models here.
 from django.contrib import admin
 
-from scripts import models
+from scripts import constants, models, worldcup
+from scripts.views import update_script_version_characters
 
 
 class ScriptVersionAdmin(admin.ModelAdmin):
     readonly_fields = ["created"]
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if "content" in form.changed_data:
+            # Keep the characters used to search for scripts in step with the edited content.
+            update_script_version_characters([obj])
+
+    def save_related(self, request, form, formsets, change):
+        was_in_world_cup = any(tag.pk == constants.WORLD_CUP_TAG_PK for tag in form.initial.get("tags", []))
+        super().save_related(request, form, formsets, change)
+        if "tags" in form.changed_data or "content" in form.changed_data:
+            worldcup.record_world_cup_script_version_edit(
+                form.instance, was_in_world_cup, content_changed="content" in form.changed_data
+            )
+
 
 admin.site.register(models.ClocktowerCharacter)
 admin.site.register(models.HomebrewCharacter)
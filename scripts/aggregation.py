@@ -0,0 +1,65 @@
+from collections import Counter
+
+from django.db import connections
+from django.db.models import Q
+
+from scripts import models
+
+
+def has_character_object(character_id: str) -> Q:
+    """
+    Condition that is true for script versions listing the character as an object with an id, the
+    same rule count_characters counts by, so filtering on a character never gives it a count of 0.
+    """
+    return Q(content__contains=[{"id": character_id}])
+
+
+def count_characters(queryset) -> Counter:
+    """
+    Counts the number of script versions in the queryset that each character appears on.
+
+    Only characters given as objects with an id are counted, matching a content__contains
+    [{"id": ...}] lookup, so old format scripts listing bare character IDs aren't counted.
+
+    On PostgreSQL this is a single GROUP BY over the expanded script content. Other database
+    backends stream the content of each script version and count the characters in Python.
+    """
+    if queryset.query.is_empty():
+        # An empty queryset has no SQL to nest in the GROUP BY.
+        return Counter()
+    if connections[queryset.db].vendor == "postgresql":
+        return count_characters_postgres(queryset)
+    return count_characters_streaming(queryset)
+
+
+def count_characters_postgres(queryset) -> Counter:
+    pk_sql, params = queryset.order_by().values("pk").query.sql_with_params()
+    table = models.ScriptVersion._meta.db_table
+    pk_column = models.ScriptVersion._meta.pk.column
+
+    sql = f"""
+        SELECT element.value ->> 'id' AS character_id, COUNT(DISTINCT script_version.{pk_column})
+        FROM {table} AS script_version
+        CROSS JOIN LATERAL jsonb_array_elements(script_version.content) AS element
+        WHERE jsonb_typeof(script_version.content) = 'array'
+          AND jsonb_typeof(element.value) = 'object'
+          AND script_version.{pk_column} IN ({pk_sql})
+        GROUP BY character_id
+    """
+
+    counter = Counter()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        for character_id, count in cursor.fetchall():
+            if character_id and character_id != "_meta":
+                counter[character_id] = count
+    return counter
+
+
+def count_characters_streaming(queryset) -> Counter:
+    counter = Counter()
+    for content in queryset.values_list("content", flat=True).iterator(chunk_size=1000):
+        counter.update(
+            {item.get("id") for item in content if isinstance(item, dict) and item.get("id") not in (None, "", "_meta")}
+        )
+    return counter
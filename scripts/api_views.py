@@ -1,6 +1,8 @@
+from django.http import StreamingHttpResponse
+from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from scripts import models
+from scripts import aggregation, cache, export, models
 from collections import Counter
 from drf_spectacular.utils import extend_schema
 
@@ -22,39 +24,33 @@ class StatisticsAPI(APIView):
     def get(self, request, format=None):
         counter = Counter()
         if "all" in request.query_params:
-            queryset = models.ScriptVersion.objects.all()
+            queryset = models.ScriptVersion.plain_objects.all()
         else:
-            queryset = models.ScriptVersion.objects.filter(latest=True)
+            queryset = models.ScriptVersion.plain_objects.filter(latest=True)
 
+        clocktower_characters = cache.get_clocktower_characters()
         for param in request.query_params.lists():
             if param[0] == "character":
                 for character in param[1]:
-                    try:
-                        character = models.ClocktowerCharacter.objects.get(character_id=character)
-                        queryset = queryset.filter(content__contains=[{"id": character.character_id}])
-                    except models.ClocktowerCharacter.DoesNotExist:
+                    if character not in clocktower_characters:
                         continue
+                    queryset = queryset.filter(aggregation.has_character_object(character))
             elif param[0] == "character_or":
                 orig_queryset = queryset.all()
-                queryset = models.ScriptVersion.objects.none()
+                queryset = models.ScriptVersion.plain_objects.none()
                 for character in param[1]:
-                    try:
-                        character = models.ClocktowerCharacter.objects.get(character_id=character)
-                        queryset = queryset | orig_queryset.filter(content__contains=[{"id": character.character_id}])
-                    except models.ClocktowerCharacter.DoesNotExist:
+                    if character not in clocktower_characters:
                         continue
+                    queryset = queryset | orig_queryset.filter(aggregation.has_character_object(character))
             elif param[0] == "exclude":
                 for character in param[1]:
-                    try:
-                        character = models.ClocktowerCharacter.objects.get(character_id=character)
-                        queryset = queryset.exclude(content__contains=[{"id": character.character_id}])
-                    except models.ClocktowerCharacter.DoesNotExist:
+                    if character not in clocktower_characters:
                         continue
+                    queryset = queryset.exclude(aggregation.has_character_object(character))
 
-        for character in models.ClocktowerCharacter.objects.all():
-            counter[character.character_id] = queryset.filter(
-                content__contains=[{"id": character.character_id}]
-            ).count()
+        character_counts = aggregation.count_characters(queryset)
+        for character_id in clocktower_characters:
+            counter[character_id] = character_counts.get(character_id, 0)
         data = {}
         if "total" in request.query_params:
             data["total"] = queryset.count()
@@ -97,3 +93,64 @@ class CharactersAPI(APIView):
                 }
             )
         return Response(data)
+
+
+EXPORT_FIELDS = {
+    "pk": "pk",
+    "script_id": "script_id",
+    "name": "script__name",
+    "version": "version",
+    "script_type": "script_type",
+    "author": "author",
+    "edition": "edition",
+    "homebrewiness": "homebrewiness",
+    "latest": "latest",
+    "created": "created",
+    "score": "script__num_likes",
+    "content": "content",
+}
+
+
+@extend_schema(
+    responses={
+        (200, "application/x-ndjson"): {
+            "type": "string",
+            "description": "One JSON object per line for each script version, in ascending pk order",
+        }
+    },
+    summary="Export all scripts",
+    description=(
+        "Streams every script version as newline delimited JSON. Use since=<pk or ISO 8601 timestamp> to only "
+        "export script versions created after a previous export, latest to only export the latest versions and "
+        "gzip to compress the response."
+    ),
+)
+class ExportAPI(APIView):
+    permission_classes = []
+    # Rows are fetched from a server-side cursor in batches of this size, so memory use doesn't grow
+    # with the size of the catalogue.
+    chunk_size = 500
+
+    def get(self, request, format=None):
+        queryset = models.ScriptVersion.plain_objects.all()
+        if "latest" in request.query_params:
+            queryset = queryset.filter(latest=True)
+        if request.query_params.get("since"):
+            try:
+                queryset = queryset.filter(**export.parse_since(request.query_params["since"]))
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = queryset.order_by("pk").values_list(*EXPORT_FIELDS.values()).iterator(chunk_size=self.chunk_size)
+        chunks = export.encode_ndjson(self.get_export_row(row) for row in rows)
+        if "gzip" in request.query_params:
+            response = StreamingHttpResponse(export.gzip_chunks(chunks), content_type="application/gzip")
+            response["Content-Disposition"] = 'attachment; filename="scripts.ndjson.gz"'
+        else:
+            response = StreamingHttpResponse(chunks, content_type="application/x-ndjson")
+        return response
+
+    def get_export_row(self, row) -> dict:
+        export_row = dict(zip(EXPORT_FIELDS, row))
+        export_row["version"] = str(export_row["version"])
+        return export_row
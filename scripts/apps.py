@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class ScriptsConfig(AppConfig):
     name = "scripts"
+
+    def ready(self):
+        from scripts import official_roles, script_schema, signals  # noqa: F401
+
+        script_schema.warm_up()
+        official_roles.warm_up()
@@ -0,0 +1,369 @@
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import jsonschema.exceptions
+from django.contrib.auth.models import User
+from django.db import DatabaseError, transaction
+from rest_framework.exceptions import ValidationError
+from versionfield import Version
+
+from scripts import (
+    cache,
+    character_index,
+    constants,
+    models,
+    official_roles,
+    script_json,
+    script_schema,
+    serializers,
+    versions,
+    worldcup,
+)
+from scripts.character_record import CharacterRecord
+from scripts.views import (
+    calculate_edition,
+    classify_script_characters,
+    count_characters_by_type,
+    get_homebrew_character,
+    get_scripts_homebrew_characters,
+    save_homebrew_characters,
+    update_script_version_characters,
+)
+
+DEFAULT_CHUNK_SIZE = 200
+COUNT_FIELDS = {
+    "num_townsfolk": models.CharacterType.TOWNSFOLK,
+    "num_outsiders": models.CharacterType.OUTSIDER,
+    "num_minions": models.CharacterType.MINION,
+    "num_demons": models.CharacterType.DEMON,
+    "num_fabled": models.CharacterType.FABLED,
+    "num_loric": models.CharacterType.LORIC,
+    "num_travellers": models.CharacterType.TRAVELLER,
+}
+
+
+@dataclass
+class ImportResult:
+    """
+    The outcome of importing one script from a bulk import, reported back to the caller.
+    """
+
+    index: int
+    name: Optional[str] = None
+    version: Optional[str] = None
+    # "created", "valid" if it would have been created by a dry run, or "error".
+    status: str = "error"
+    pk: Optional[int] = None
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def created(self) -> bool:
+        return self.status == "created"
+
+    def as_dict(self) -> dict:
+        result = {"index": self.index, "name": self.name, "version": self.version, "status": self.status}
+        if self.created:
+            result["pk"] = self.pk
+        if self.errors:
+            result["errors"] = self.errors
+        return result
+
+
+@dataclass
+class PreparedScript:
+    """
+    A script from a bulk import which has been validated and classified, ready to be saved.
+    """
+
+    result: ImportResult
+    version: Version
+    script_type: str
+    author: Optional[str]
+    notes: str
+    content: list
+    homebrewiness: models.Homebrewiness
+    homebrew_characters: dict
+    edition: int
+
+
+def prepare_script(
+    index: int, data, clocktower_character_ids, official_role_ids, validator
+) -> "PreparedScript | ImportResult":
+    """
+    Validates one script from a bulk import and works out everything about it that doesn't depend on
+    the database.
+
+    Returns the prepared script, or an ImportResult with the errors if it isn't valid.
+    """
+    result = ImportResult(index=index)
+    if not isinstance(data, dict):
+        result.errors.append("Each script must be an object.")
+        return result
+    result.name = data.get("name")
+    result.version = str(data["version"]) if data.get("version") is not None else None
+
+    serializer = serializers.ScriptUploadSerializer(data=data)
+    try:
+        serializer.is_valid(raise_exception=True)
+        content = script_json.get_json_content(serializer.validated_data)
+    except ValidationError as e:
+        result.errors.extend(flatten_errors(e.detail))
+        return result
+    except ValueError:
+        # The version field raises ValueError rather than a validation error for versions it can't parse.
+        result.errors.append("version: Versions must be numbers separated by dots.")
+        return result
+    except script_json.JSONError as e:
+        result.errors.append(f"Invalid JSON content: {e}")
+        return result
+    result.name = serializer.validated_data["name"]
+    if not isinstance(content, list):
+        result.errors.append("Content must be a list of script items.")
+        return result
+
+    if validator is not None:
+        try:
+            validator.validate(content)
+        except jsonschema.exceptions.ValidationError as e:
+            result.errors.append(f"Content does not conform to the script schema: {e.message}")
+            return result
+
+    homebrewiness, homebrew_characters = classify_script_characters(
+        content, clocktower_character_ids, official_role_ids
+    )
+    return PreparedScript(
+        result=result,
+        version=Version(str(serializer.validated_data["version"])),
+        script_type=serializer.validated_data["script_type"],
+        author=serializer.validated_data.get("author") or script_json.get_author_from_json(content) or None,
+        notes=serializer.validated_data.get("notes") or "",
+        content=content,
+        homebrewiness=homebrewiness,
+        homebrew_characters=homebrew_characters,
+        edition=calculate_edition(content),
+    )
+
+
+def flatten_errors(detail) -> List[str]:
+    if isinstance(detail, dict):
+        return [f"{key}: {error}" for key, errors in detail.items() for error in flatten_errors(errors)]
+    if isinstance(detail, list):
+        return [error for errors in detail for error in flatten_errors(errors)]
+    return [str(detail)]
+
+
+def import_scripts(
+    items: Iterable,
+    user: Optional[User] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    dry_run: bool = False,
+    progress=None,
+) -> List[ImportResult]:
+    """
+    Imports many scripts at once, as the scripts API would create them one at a time.
+
+    Scripts are validated and classified, then saved in chunks of chunk_size, each in its own
+    transaction using bulk inserts. Preparing a script is CPU bound, so it is done in this thread as
+    a thread pool would be serialised by the GIL. A script that fails validation, or that conflicts
+    with an existing script, is reported and skipped without affecting the others. If saving a
+    chunk fails, every script in that chunk is reported as failed. A dry run reports what would
+    happen without saving anything.
+
+    progress, if given, is called with the results of each chunk once it has been saved.
+    """
+    clocktower_character_ids = frozenset(cache.get_clocktower_characters())
+    official_role_ids = official_roles.get_official_role_ids()
+    validator = script_schema.get_validator()
+
+    results = []
+    chunk = []
+    for index, data in enumerate(items):
+        chunk.append(prepare_script(index, data, clocktower_character_ids, official_role_ids, validator))
+        if len(chunk) == chunk_size:
+            results.extend(import_chunk(chunk, user, dry_run, progress))
+            chunk = []
+    if chunk:
+        results.extend(import_chunk(chunk, user, dry_run, progress))
+
+    created_names = {result.name for result in results if result.created}
+    if created_names and not dry_run:
+        if models.ScriptVersion.plain_objects.filter(
+            script__name__in=created_names, latest=True, tags=constants.WORLD_CUP_TAG_PK
+        ).exists():
+            worldcup.rebuild_world_cup_statistics()
+    return results
+
+
+def import_chunk(prepared, user: Optional[User], dry_run: bool, progress) -> List[ImportResult]:
+    results = [script.result if isinstance(script, PreparedScript) else script for script in prepared]
+    scripts = [script for script in prepared if isinstance(script, PreparedScript)]
+
+    if scripts:
+        try:
+            with transaction.atomic():
+                existing = ExistingScripts([script.result.name for script in scripts])
+                accepted = existing.check_conflicts(scripts, user)
+                if dry_run:
+                    for script in accepted:
+                        script.result.status = "valid"
+                elif accepted:
+                    save_scripts(accepted, existing, user)
+        except DatabaseError as e:
+            for script in scripts:
+                script.result.status = "error"
+                script.result.pk = None
+                script.result.errors.append(f"Could not save the script: {e}")
+
+    if progress is not None:
+        progress(results)
+    return results
+
+
+class ExistingScripts:
+    """
+    The scripts already in the database with the names being imported, and their versions.
+    """
+
+    def __init__(self, names: Iterable[str]):
+        self.scripts = {script.name: script for script in models.Script.objects.filter(name__in=set(names))}
+        script_versions = models.ScriptVersion.plain_objects.filter(script__in=self.scripts.values())
+        self.versions = {
+            (script_id, str(version)) for script_id, version in script_versions.values_list("script_id", "version")
+        }
+        # The version, content and pk of the latest version of each script, by script pk.
+        self.latest = {
+            script_id: (Version(str(version)), content, pk)
+            for script_id, version, content, pk in script_versions.filter(latest=True).values_list(
+                "script_id", "version", "content", "pk"
+            )
+        }
+
+    def check_conflicts(self, prepared: List[PreparedScript], user: Optional[User]) -> List[PreparedScript]:
+        """
+        Returns the scripts that can be created, adding the reason to the errors of the rest.
+        """
+        accepted = []
+        seen = set()
+        for script in prepared:
+            name = script.result.name
+            if (name, str(script.version)) in seen:
+                script.result.errors.append("This script and version appears more than once in the import.")
+                continue
+            existing_script = self.scripts.get(name)
+            if existing_script is not None:
+                if existing_script.owner_id and existing_script.owner_id != getattr(user, "pk", None):
+                    script.result.errors.append("You do not have permission to update this script.")
+                    continue
+                if (existing_script.pk, str(script.version)) in self.versions:
+                    script.result.errors.append("A script with this name and version already exists.")
+                    continue
+                latest = self.latest.get(existing_script.pk)
+                if latest is not None and latest[1] == script.content:
+                    script.result.errors.append("The content is identical to the latest version.")
+                    continue
+            seen.add((name, str(script.version)))
+            accepted.append(script)
+        return accepted
+
+
+def save_scripts(accepted: List[PreparedScript], existing: ExistingScripts, user: Optional[User]) -> None:
+    """
+    Saves a chunk of scripts with bulk inserts, setting the pk of the result of each one.
+    """
+    new_names = dict.fromkeys(script.result.name for script in accepted if script.result.name not in existing.scripts)
+    new_scripts = models.Script.objects.bulk_create([models.Script(name=name, owner=user) for name in new_names])
+    scripts_by_name = {**existing.scripts, **{script.name: script for script in new_scripts}}
+
+    # Later scripts overwrite the homebrew characters of earlier ones, as they would if each script
+    # was uploaded in turn.
+    homebrew_characters = {}
+    for script in accepted:
+        for character_id, item in script.homebrew_characters.items():
+            homebrew_characters[character_id] = get_homebrew_character(item, scripts_by_name[script.result.name])
+    save_homebrew_characters(list(homebrew_characters.values()))
+
+    clocktower_characters = cache.get_clocktower_characters()
+    all_homebrew_characters = {
+        **get_scripts_homebrew_characters([script.content for script in accepted], clocktower_characters),
+        **{
+            character_id: CharacterRecord.from_character(character)
+            for character_id, character in homebrew_characters.items()
+        },
+    }
+    script_versions = []
+    for script in accepted:
+        character_counts = count_characters_by_type(script.content, clocktower_characters, all_homebrew_characters)
+        script_versions.append(
+            models.ScriptVersion(
+                script=scripts_by_name[script.result.name],
+                version=script.version,
+                script_type=script.script_type,
+                author=script.author,
+                notes=script.notes,
+                content=script.content,
+                latest=False,
+                edition=script.edition,
+                homebrewiness=script.homebrewiness,
+                **{field: character_counts[character_type] for field, character_type in COUNT_FIELDS.items()},
+            )
+        )
+    models.ScriptVersion.plain_objects.bulk_create(script_versions)
+    for script, script_version in zip(accepted, script_versions):
+        script.result.status = "created"
+        script.result.pk = script_version.pk
+
+    add_tags(accepted, script_versions, existing)
+    update_script_version_characters(script_versions)
+    changed = {}
+    for script_version in script_versions:
+        changed.setdefault(script_version.script, []).append(script_version.pk)
+    versions.update_latest_flags(list(changed))
+    for script, script_version_pks in changed.items():
+        versions.update_version_diffs(script, changed=script_version_pks)
+
+    def index_script_versions():
+        for script_version in script_versions:
+            character_index.index_script_version(script_version)
+
+    transaction.on_commit(index_script_versions)
+
+
+def add_tags(accepted: List[PreparedScript], script_versions: List[models.ScriptVersion], existing: ExistingScripts):
+    """
+    Tags imported script versions as an upload would. Versions newer than the existing latest
+    version inherit its tags, and hybrid and homebrew scripts get the matching tag.
+    """
+    ScriptVersionTag = models.ScriptVersion.tags.through
+    inherit_from = {}
+    for script, script_version in zip(accepted, script_versions):
+        latest = existing.latest.get(script_version.script_id)
+        if latest is not None and script.version > latest[0]:
+            inherit_from[script_version.pk] = latest[2]
+
+    latest_tags = {}
+    for script_version_id, tag_id in ScriptVersionTag.objects.filter(
+        scriptversion_id__in=set(inherit_from.values())
+    ).values_list("scriptversion_id", "scripttag_id"):
+        latest_tags.setdefault(script_version_id, []).append(tag_id)
+
+    tag_pks = dict(
+        models.ScriptTag.objects.filter(name__in=["Hybrid Script", "Homebrew Script"]).values_list("name", "pk")
+    )
+    homebrewiness_tags = {
+        models.Homebrewiness.HYBRID: tag_pks.get("Hybrid Script"),
+        models.Homebrewiness.HOMEBREW: tag_pks.get("Homebrew Script"),
+    }
+
+    rows = set()
+    for script_version in script_versions:
+        for tag_id in latest_tags.get(inherit_from.get(script_version.pk), []):
+            rows.add((script_version.pk, tag_id))
+        if homebrewiness_tags.get(script_version.homebrewiness):
+            rows.add((script_version.pk, homebrewiness_tags[script_version.homebrewiness]))
+    ScriptVersionTag.objects.bulk_create(
+        [
+            ScriptVersionTag(scriptversion_id=script_version_id, scripttag_id=tag_id)
+            for script_version_id, tag_id in rows
+        ]
+    )
@@ -1,29 +1,293 @@
 from django.core.cache import cache
-from scripts import models
-from typing import List, Optional
+from django.db import transaction
+from scripts import models, single_flight
+from scripts.character_record import CharacterRecord
+from scripts.lru import LRUCache
+from typing import Iterable, List, Optional
+import hashlib
+import random
+import time
 import uuid
 
 CACHE_TIMEOUT = 60 * 60 * 1  # 1 hour
 CLOCKTOWER_CHARACTERS_CACHE_KEY = "clocktower_characters"
-HOMEBREW_CHARACTERS_CACHE_KEY = "homebrew_characters"
+HOMEBREW_CHARACTER_CACHE_KEY_PREFIX = "homebrew_character"
+# Counts the changes to homebrew characters. The IDs changed by each change are cached under its
+# number, so each worker drops just those characters from its local copies. It starts at a random
+# number, so a worker can't mistake a count that was evicted and restarted for the one it last saw.
+HOMEBREW_CHARACTERS_VERSION_CACHE_KEY = "homebrew_characters_version"
+HOMEBREW_CHARACTERS_CHANGE_CACHE_KEY_PREFIX = "homebrew_characters_change"
+# Workers further behind than this drop all their local copies rather than fetch every change.
+MAX_HOMEBREW_CHARACTERS_CHANGES = 100
+# Cached for IDs that aren't homebrew characters, so unknown IDs don't query the database on every
+# page. Kept short as a character created in the meantime may be overwritten by it.
+MISSING_CHARACTER = False
+MISSING_CHARACTER_CACHE_TIMEOUT = 60 * 5  # 5 minutes
+# Homebrew characters loaded from the database are also cached briefly by the IDs that were
+# requested and the version they were loaded at, for requests that were waiting for the same IDs
+# to be loaded.
+HOMEBREW_CHARACTERS_LOAD_CACHE_KEY_PREFIX = "homebrew_characters_load"
+HOMEBREW_CHARACTERS_LOAD_CACHE_TIMEOUT = 10
+# The most homebrew characters each worker keeps in memory.
+LOCAL_HOMEBREW_CHARACTERS_MAX_SIZE = 5000
+# The fields of each character model copied into its CharacterRecord.
+CHARACTER_RECORD_FIELDS = [
+    "character_id",
+    "character_name",
+    "character_type",
+    "edition",
+    "first_night_position",
+    "other_night_position",
+    "reminders",
+]
+# Changed whenever a character is created, updated or deleted. The character maps are cached under
+# the current version, so changing it makes every worker reload them.
+CHARACTER_CATALOGUE_VERSION_CACHE_KEY = "character_catalogue_version"
+# How often each worker checks the shared cache for a new catalogue version, in seconds, so changes
+# made by other workers are seen within this long.
+CHARACTER_CATALOGUE_VERSION_CHECK_INTERVAL = 5
 
+# This process's copy of each character map and the catalogue version it was loaded at, so the maps
+# aren't fetched from a shared cache every time they're used.
+_local_characters: dict[str, tuple[str, dict]] = {}
+# The catalogue version this process last saw, and when it was checked by time.monotonic().
+_character_catalogue_version: Optional[tuple[str, float]] = None
+# This process's most recently used homebrew characters, or MISSING_CHARACTER for unknown IDs, and
+# the homebrew characters version they're up to date with.
+_local_homebrew_characters = LRUCache(LOCAL_HOMEBREW_CHARACTERS_MAX_SIZE)
+_local_homebrew_characters_version: Optional[int] = None
+
+
+def _get_version(cache_key: str, version: Optional[str] = None) -> str:
+    if version is None:
+        version = cache.get(cache_key)
+    if version is None:
+        # Another worker may be setting the version at the same time, so keep whichever was first.
+        cache.add(cache_key, uuid.uuid4().hex, timeout=None)
+        version = cache.get(cache_key)
+    return version
+
+
+def get_character_catalogue_version() -> str:
+    global _character_catalogue_version
+    now = time.monotonic()
+    if (
+        _character_catalogue_version is not None
+        and now - _character_catalogue_version[1] < CHARACTER_CATALOGUE_VERSION_CHECK_INTERVAL
+    ):
+        return _character_catalogue_version[0]
+    version = _get_version(CHARACTER_CATALOGUE_VERSION_CACHE_KEY)
+    _character_catalogue_version = (version, now)
+    return version
 
-def get_clocktower_characters(force=False) -> dict[str, models.ClocktowerCharacter]:
-    characters = cache.get(CLOCKTOWER_CHARACTERS_CACHE_KEY)
-    if force or characters is None:
-        characters = {character.character_id: character for character in models.ClocktowerCharacter.objects.all()}
-        cache.set(CLOCKTOWER_CHARACTERS_CACHE_KEY, characters, timeout=CACHE_TIMEOUT)  # Cache for 24 hours
-    return characters
 
+def bump_character_catalogue_version() -> None:
+    """
+    Makes this worker reload the character maps the next time they're used, and every other worker
+    within CHARACTER_CATALOGUE_VERSION_CHECK_INTERVAL. Call this once a change to the characters is
+    committed, as signals aren't sent for bulk operations.
+    """
+    global _character_catalogue_version
+    version = uuid.uuid4().hex
+    cache.set(CHARACTER_CATALOGUE_VERSION_CACHE_KEY, version, timeout=None)
+    _character_catalogue_version = (version, time.monotonic())
+    _local_characters.clear()
 
-def get_homebrew_characters(force=False) -> dict[str, models.HomebrewCharacter]:
-    characters = cache.get(HOMEBREW_CHARACTERS_CACHE_KEY)
-    if force or characters is None:
-        characters = {character.character_id: character for character in models.HomebrewCharacter.objects.all()}
-        cache.set(HOMEBREW_CHARACTERS_CACHE_KEY, characters, timeout=CACHE_TIMEOUT)  # Cache for 24 hours
+
+def _get_characters(cache_key: str, model, force: bool) -> dict:
+    version = get_character_catalogue_version()
+    local = _local_characters.get(cache_key)
+    if not force and local is not None and local[0] == version:
+        return local[1]
+
+    characters = single_flight.get_or_compute(
+        cache,
+        f"{cache_key}:{version}",
+        lambda: load_character_records(model.objects.all()),
+        CACHE_TIMEOUT,
+        force=force,
+    )
+    _local_characters[cache_key] = (version, characters)
     return characters
 
 
+def load_character_records(queryset) -> dict[str, CharacterRecord]:
+    field_names = {field.name for field in queryset.model._meta.fields}
+    fields = [field for field in CHARACTER_RECORD_FIELDS if field in field_names]
+    return {values["character_id"]: CharacterRecord.create(**values) for values in queryset.values(*fields).iterator()}
+
+
+def get_clocktower_characters(force=False) -> dict[str, CharacterRecord]:
+    return _get_characters(CLOCKTOWER_CHARACTERS_CACHE_KEY, models.ClocktowerCharacter, force)
+
+
+def get_homebrew_character_cache_key(character_id: str) -> str:
+    # Character IDs are uploaded by users, so may contain characters that aren't valid in a cache key.
+    return f"{HOMEBREW_CHARACTER_CACHE_KEY_PREFIX}:{hashlib.sha256(character_id.encode()).hexdigest()}"
+
+
+def get_homebrew_characters(character_ids: Iterable[str]) -> dict[str, CharacterRecord]:
+    """
+    Returns the homebrew characters with the given IDs, leaving out IDs that aren't homebrew
+    characters. Characters this worker hasn't used recently are fetched from the shared cache in a
+    single call, and any that aren't cached there from the database in a single query.
+    """
+    character_ids = set(character_ids)
+    local = _local_homebrew_characters.get_many(character_ids)
+    missing = character_ids.difference(local)
+    keys = {get_homebrew_character_cache_key(character_id): character_id for character_id in missing}
+    cached = cache.get_many([HOMEBREW_CHARACTERS_VERSION_CACHE_KEY, *keys])
+
+    version = cached.pop(HOMEBREW_CHARACTERS_VERSION_CACHE_KEY, None)
+    if version is None:
+        version = get_homebrew_characters_version()
+    if version != _local_homebrew_characters_version:
+        _drop_changed_homebrew_characters(version)
+        # Fetch the characters that were dropped from the shared cache along with the rest.
+        still_local = _local_homebrew_characters.get_many(local)
+        stale_keys = {
+            get_homebrew_character_cache_key(character_id): character_id
+            for character_id in set(local).difference(still_local)
+        }
+        if stale_keys:
+            cached.update(cache.get_many(stale_keys))
+            keys.update(stale_keys)
+            missing.update(stale_keys.values())
+        local = still_local
+
+    characters = {keys[key]: character for key, character in cached.items()}
+    uncached = missing.difference(characters)
+    if uncached:
+        # Requests for the same page miss the same characters, so only one of them loads them.
+        load_key = hashlib.sha256("\n".join(sorted(uncached)).encode()).hexdigest()
+        characters.update(
+            single_flight.get_or_compute(
+                cache,
+                f"{HOMEBREW_CHARACTERS_LOAD_CACHE_KEY_PREFIX}:{version}:{load_key}",
+                lambda: _load_homebrew_characters(uncached),
+                HOMEBREW_CHARACTERS_LOAD_CACHE_TIMEOUT,
+            )
+        )
+    if version == _local_homebrew_characters_version:
+        # Otherwise another request has seen a newer version in the meantime, and these characters
+        # may be from before it.
+        _local_homebrew_characters.set_many(characters)
+    characters.update(local)
+    return {
+        character_id: character for character_id, character in characters.items() if character is not MISSING_CHARACTER
+    }
+
+
+def get_homebrew_characters_version() -> int:
+    version = cache.get(HOMEBREW_CHARACTERS_VERSION_CACHE_KEY)
+    if version is None:
+        # Another worker may be starting the count at the same time, so keep whichever was first.
+        cache.add(HOMEBREW_CHARACTERS_VERSION_CACHE_KEY, random.randrange(1 << 62), timeout=None)
+        version = cache.get(HOMEBREW_CHARACTERS_VERSION_CACHE_KEY)
+    return version
+
+
+def _drop_changed_homebrew_characters(version: int) -> None:
+    """
+    Brings this process's homebrew characters up to date with version, dropping those that have
+    changed since, or all of them if the changes can't be fetched.
+    """
+    global _local_homebrew_characters_version
+    previous_version = _local_homebrew_characters_version
+    _local_homebrew_characters_version = version
+    if previous_version is None or not 0 < version - previous_version <= MAX_HOMEBREW_CHARACTERS_CHANGES:
+        _local_homebrew_characters.clear()
+        return
+    change_keys = [
+        f"{HOMEBREW_CHARACTERS_CHANGE_CACHE_KEY_PREFIX}:{change}" for change in range(previous_version + 1, version + 1)
+    ]
+    changes = cache.get_many(change_keys)
+    if len(changes) < len(change_keys):
+        # A change has expired, or is still being recorded, so it's not known what it changed.
+        _local_homebrew_characters.clear()
+        return
+    _local_homebrew_characters.delete_many(
+        character_id for character_ids in changes.values() for character_id in character_ids
+    )
+
+
+def _load_homebrew_characters(character_ids: set[str]) -> dict:
+    """
+    Loads homebrew characters from the database into the shared cache, along with MISSING_CHARACTER
+    for the IDs that aren't homebrew characters.
+
+    Characters are only added if they aren't already cached, as a change committed since they were
+    read will already have cached the changed character, which mustn't be overwritten.
+    """
+    characters = load_character_records(models.HomebrewCharacter.objects.filter(character_id__in=character_ids))
+    for character_id, character in characters.items():
+        cache.add(get_homebrew_character_cache_key(character_id), character, timeout=CACHE_TIMEOUT)
+    unknown = dict.fromkeys(character_ids.difference(characters), MISSING_CHARACTER)
+    for character_id in unknown:
+        cache.add(get_homebrew_character_cache_key(character_id), MISSING_CHARACTER, MISSING_CHARACTER_CACHE_TIMEOUT)
+    return {**characters, **unknown}
+
+
+def update_homebrew_characters(characters: Iterable[models.HomebrewCharacter]) -> None:
+    """
+    Caches newly created or updated homebrew characters once the change is committed, and has
+    every other worker drop its local copies of them.
+    """
+    records = {character.character_id: CharacterRecord.from_character(character) for character in characters}
+
+    def update_caches():
+        cache.set_many(
+            {get_homebrew_character_cache_key(character_id): record for character_id, record in records.items()},
+            timeout=CACHE_TIMEOUT,
+        )
+        if _record_homebrew_characters_change(records):
+            _local_homebrew_characters.set_many(records)
+
+    transaction.on_commit(update_caches)
+
+
+def remove_homebrew_characters(character_ids: Iterable[str]) -> None:
+    """
+    Removes deleted homebrew characters from the caches once the deletion is committed.
+    """
+    character_ids = list(character_ids)
+
+    def update_caches():
+        # Cached as missing rather than deleted, so a request that read them before the deletion
+        # can't add them back.
+        cache.set_many(
+            {get_homebrew_character_cache_key(character_id): MISSING_CHARACTER for character_id in character_ids},
+            timeout=MISSING_CHARACTER_CACHE_TIMEOUT,
+        )
+        _local_homebrew_characters.delete_many(character_ids)
+        _record_homebrew_characters_change(character_ids)
+
+    transaction.on_commit(update_caches)
+
+
+def _record_homebrew_characters_change(character_ids: Iterable[str]) -> bool:
+    """
+    Records a change to the homebrew characters with the given IDs, for other workers to drop them
+    from their local copies.
+
+    Returns whether this process's local copies were up to date before the change, and so are up to
+    date with it once the changed characters are updated in them.
+    """
+    global _local_homebrew_characters_version
+    previous_version = get_homebrew_characters_version()
+    try:
+        version = cache.incr(HOMEBREW_CHARACTERS_VERSION_CACHE_KEY)
+    except ValueError:
+        # The count was evicted since it was read, so start it again.
+        cache.add(HOMEBREW_CHARACTERS_VERSION_CACHE_KEY, random.randrange(1 << 62), timeout=None)
+        return False
+    cache.set(f"{HOMEBREW_CHARACTERS_CHANGE_CACHE_KEY_PREFIX}:{version}", list(character_ids), timeout=CACHE_TIMEOUT)
+    if _local_homebrew_characters_version == previous_version == version - 1:
+        _local_homebrew_characters_version = version
+        return True
+    return False
+
+
 def store_advanced_search_results(pk_list: List[int]) -> str:
     cache_key = f"{uuid.uuid4().hex}"
     cache.set(cache_key, {"queryset_pks": pk_list, "num_results": len(pk_list)}, timeout=300)
@@ -0,0 +1,338 @@
+import heapq
+import threading
+from collections import Counter
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from scripts import minhash, models, script_json
+
+# How far before the latest change already indexed to look for changes, as a change saved just before
+# it may not have been committed until after the index last synced.
+SYNC_OVERLAP = timedelta(minutes=1)
+# The fields of each script version loaded into the index.
+INDEXED_FIELDS = ["pk", "content", "modified", "script_type", "latest", "homebrewiness"]
+# The most candidates MinHash LSH returns for a script, keeping those sharing the most bands.
+MAX_APPROXIMATE_CANDIDATES = 1000
+
+
+def iter_bits(bits: int):
+    """
+    Yields the position of each set bit, lowest first.
+    """
+    binary = bin(bits)
+    length = len(binary)
+    position = binary.rfind("1")
+    while position > 1:
+        yield length - 1 - position
+        position = binary.rfind("1", 0, position)
+
+
+class CharacterIndex:
+    """
+    In-process incidence index of which characters appear on which script versions.
+
+    Every ScriptVersion is given a bit position (ordinal) and every character ID maps to
+    a bitset of the ordinals of the script versions it appears on. Counting how many
+    scripts in a set contain a character is then a single AND and popcount rather than
+    a JSON containment query per character.
+
+    The script type, homebrewiness and latest flag of each script version are held as bitsets
+    too, so the candidates for similar scripts are found without querying the database. For large
+    catalogues a MinHash LSH index narrows down the candidates first.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._ordinals: dict[int, int] = {}
+        # The pk of the script version at each ordinal, or None for free ordinals.
+        self._pks: list[int | None] = []
+        self._free_ordinals: list[int] = []
+        self._next_ordinal = 0
+        self._characters: dict[int, frozenset[str]] = {}
+        self._lengths: dict[int, int] = {}
+        self._postings: dict[str, int] = {}
+        # Bitsets of the script versions with each value of each indexed field, e.g.
+        # ("script_type", "Full"), and the field values of each script version.
+        self._fields: dict[tuple[str, object], int] = {}
+        self._field_values: dict[int, tuple[tuple[str, object], ...]] = {}
+        self._all = 0
+        # When the latest change indexed was saved, and when each script version changed since
+        # SYNC_OVERLAP before it was saved.
+        self._last_modified: datetime | None = None
+        self._recently_modified: dict[int, datetime] = {}
+        self._lsh: minhash.MinHashLSH | None = None
+        self._lsh_thread: threading.Thread | None = None
+
+    def __len__(self):
+        return len(self._ordinals)
+
+    def add(
+        self,
+        pk: int,
+        content,
+        script_type: str | None = None,
+        latest: bool = True,
+        homebrewiness: int | None = None,
+    ) -> None:
+        with self._lock:
+            if pk in self._ordinals:
+                self.remove(pk)
+
+            if self._free_ordinals:
+                ordinal = self._free_ordinals.pop()
+            else:
+                ordinal = self._next_ordinal
+                self._next_ordinal += 1
+                self._pks.append(None)
+
+            character_ids = script_json.get_character_ids(content)
+            characters = frozenset(character_ids)
+            bit = 1 << ordinal
+            for character_id in characters:
+                self._postings[character_id] = self._postings.get(character_id, 0) | bit
+            field_values = (("script_type", script_type), ("latest", latest), ("homebrewiness", homebrewiness))
+            for field_value in field_values:
+                self._fields[field_value] = self._fields.get(field_value, 0) | bit
+            self._all |= bit
+
+            self._ordinals[pk] = ordinal
+            self._pks[ordinal] = pk
+            self._field_values[pk] = field_values
+            self._characters[pk] = characters
+            self._lengths[pk] = len(character_ids)
+            if self._lsh is not None:
+                self._lsh.add(pk, characters)
+
+    def remove(self, pk: int) -> None:
+        with self._lock:
+            ordinal = self._ordinals.pop(pk, None)
+            if ordinal is None:
+                return
+
+            bit = 1 << ordinal
+            for character_id in self._characters.pop(pk):
+                posting = self._postings[character_id] & ~bit
+                if posting:
+                    self._postings[character_id] = posting
+                else:
+                    del self._postings[character_id]
+            for field_value in self._field_values.pop(pk):
+                bits = self._fields[field_value] & ~bit
+                if bits:
+                    self._fields[field_value] = bits
+                else:
+                    del self._fields[field_value]
+            self._all &= ~bit
+            self._pks[ordinal] = None
+            del self._lengths[pk]
+            self._free_ordinals.append(ordinal)
+            if self._lsh is not None:
+                self._lsh.remove(pk)
+
+    def characters(self, pk: int) -> frozenset[str]:
+        return self._characters.get(pk, frozenset())
+
+    def mask(self, pks: Iterable[int]) -> int:
+        """
+        Converts a collection of ScriptVersion primary keys into a bitset of their ordinals.
+        """
+        buffer = bytearray((self._next_ordinal + 7) // 8)
+        for pk in pks:
+            ordinal = self._ordinals.get(pk)
+            if ordinal is not None:
+                buffer[ordinal >> 3] |= 1 << (ordinal & 7)
+        return int.from_bytes(buffer, "little")
+
+    def pks(self, mask: int) -> list[int]:
+        """
+        Converts a bitset of ordinals back into the ScriptVersion primary keys.
+        """
+        return [self._pks[ordinal] for ordinal in iter_bits(mask & self._all)]
+
+    def versions(
+        self,
+        script_type: str | None = None,
+        latest: bool | None = None,
+        homebrewiness: int | None = None,
+    ) -> int:
+        """
+        Returns a bitset of the script versions with the given script type, latest flag and
+        homebrewiness, leaving out any that are None.
+        """
+        mask = self._all
+        for field_value in (("script_type", script_type), ("latest", latest), ("homebrewiness", homebrewiness)):
+            if field_value[1] is not None:
+                mask &= self._fields.get(field_value, 0)
+        return mask
+
+    def posting(self, character_id: str) -> int:
+        return self._postings.get(character_id, 0)
+
+    def count(self, character_id: str, mask: int) -> int:
+        """
+        Returns the number of script versions in the mask that contain the character.
+        """
+        return (self._postings.get(character_id, 0) & mask).bit_count()
+
+    def most_similar(self, content, candidates: int, same_type: bool, k: int = 10) -> list[tuple[int, int]]:
+        """
+        Returns the k script versions in the candidates bitset most similar to the script content as
+        (pk, similarity) pairs, using the same scoring as script_json.get_similarity. Ties are broken
+        by the lowest pk.
+        """
+        character_ids = script_json.get_character_ids(content)
+        length = len(character_ids)
+
+        shared = Counter()
+        sharing = 0
+        for character_id in set(character_ids):
+            bits = self._postings.get(character_id, 0) & candidates
+            if bits:
+                shared.update(iter_bits(bits))
+                sharing |= bits
+
+        scores = []
+        for ordinal, count in shared.items():
+            pk = self._pks[ordinal]
+            scores.append((script_json.get_similarity_score(count, length, self._lengths[pk], same_type), -pk))
+        best = [(-negative_pk, score) for score, negative_pk in heapq.nlargest(k, scores)]
+
+        # Scripts sharing no characters can still make up the numbers on a small catalogue.
+        if len(best) < k:
+            best.extend((pk, 0) for pk in heapq.nsmallest(k - len(best), self.pks(candidates & ~sharing)))
+        return best
+
+    def approximate_candidates(self, content, candidates: int, limit: int = MAX_APPROXIMATE_CANDIDATES) -> int | None:
+        """
+        Narrows down the candidates bitset to the script versions likely to be similar to the script
+        content using MinHash LSH, keeping at most limit of them.
+
+        The LSH index is built in the background the first time it is needed and is then kept up to
+        date alongside the rest of the index. Until it is ready None is returned, and callers should
+        compare against every candidate instead.
+        """
+        with self._lock:
+            lsh = self._lsh
+            if lsh is None:
+                if self._lsh_thread is None:
+                    self._lsh_thread = threading.Thread(target=self.build_lsh, name="minhash-lsh", daemon=True)
+                    self._lsh_thread.start()
+                return None
+            band_counts = lsh.candidates(script_json.get_character_ids(content))
+            found = self.mask(band_counts) & candidates
+            if found.bit_count() <= limit:
+                return found
+            ranked = [(band_counts[pk], -pk) for pk in self.pks(found)]
+            return self.mask(-negative_pk for _, negative_pk in heapq.nlargest(limit, ranked))
+
+    def build_lsh(self, lsh: minhash.MinHashLSH | None = None) -> None:
+        """
+        Builds the MinHash LSH index of every script version in the index, into lsh if given.
+
+        The index is built from a snapshot without holding the lock, so requests aren't held up, and
+        script versions added or removed in the meantime are caught up with at the end.
+        """
+        with self._lock:
+            snapshot = dict(self._characters)
+        if lsh is None:
+            lsh = minhash.MinHashLSH()
+        for pk, characters in snapshot.items():
+            lsh.add(pk, characters)
+
+        with self._lock:
+            for pk, characters in snapshot.items():
+                if self._characters.get(pk) is not characters:
+                    lsh.remove(pk)
+            for pk, characters in self._characters.items():
+                if snapshot.get(pk) is not characters:
+                    lsh.add(pk, characters)
+            self._lsh = lsh
+
+    def sync(self) -> None:
+        """
+        Brings the index up to date with the database.
+
+        Script versions record when they were last saved, so new and edited versions, including
+        those saved by other processes, are found by looking for versions saved since the latest
+        change indexed. The full list of primary keys is only compared when the number of versions
+        doesn't match, e.g. after a deletion.
+        """
+        summary = models.ScriptVersion.plain_objects.aggregate(num_versions=Count("pk"), last_modified=Max("modified"))
+        with self._lock:
+            if self._last_modified is None:
+                self._load(models.ScriptVersion.plain_objects.all())
+            elif summary["last_modified"] and (
+                summary["last_modified"] > self._last_modified or timezone.now() - self._last_modified < SYNC_OVERLAP
+            ):
+                recent = models.ScriptVersion.plain_objects.filter(
+                    modified__gte=self._last_modified - SYNC_OVERLAP
+                ).values_list("pk", "modified")
+                changed = [pk for pk, modified in recent if self._recently_modified.get(pk) != modified]
+                if changed:
+                    self._load(models.ScriptVersion.plain_objects.filter(pk__in=changed))
+
+            if summary["num_versions"] != len(self._ordinals):
+                existing = set(models.ScriptVersion.plain_objects.values_list("pk", flat=True))
+                for pk in [pk for pk in self._ordinals if pk not in existing]:
+                    self.remove(pk)
+                missing = existing.difference(self._ordinals)
+                if missing:
+                    self._load(models.ScriptVersion.plain_objects.filter(pk__in=missing))
+
+    def _load(self, queryset) -> None:
+        modified_times = {}
+        for script_version in queryset.values(*INDEXED_FIELDS).iterator(chunk_size=2000):
+            self.add(
+                script_version["pk"],
+                script_version["content"],
+                script_type=script_version["script_type"],
+                latest=script_version["latest"],
+                homebrewiness=script_version["homebrewiness"],
+            )
+            modified_times[script_version["pk"]] = script_version["modified"]
+        self._record_modified(modified_times)
+
+    def _record_modified(self, modified_times: dict[int, datetime]) -> None:
+        if not modified_times:
+            return
+        last_modified = max(modified_times.values())
+        if self._last_modified is None or last_modified > self._last_modified:
+            self._last_modified = last_modified
+        since = self._last_modified - SYNC_OVERLAP
+        self._recently_modified.update((pk, modified) for pk, modified in modified_times.items() if modified >= since)
+        for pk in [pk for pk, modified in self._recently_modified.items() if modified < since]:
+            del self._recently_modified[pk]
+
+
+_index = CharacterIndex()
+
+
+def get_character_index() -> CharacterIndex:
+    _index.sync()
+    return _index
+
+
+def index_script_version(script_version: models.ScriptVersion) -> None:
+    """
+    Adds a newly created (or modified) script version to this process's index.
+
+    Other processes pick up the change the next time they sync.
+    """
+    if len(_index):
+        with _index._lock:
+            _index.add(
+                script_version.pk,
+                script_version.content,
+                script_type=script_version.script_type,
+                latest=script_version.latest,
+                homebrewiness=script_version.homebrewiness,
+            )
+            if script_version.modified:
+                _index._record_modified({script_version.pk: script_version.modified})
+
+
+def remove_script_version(pk: int) -> None:
+    _index.remove(pk)
@@ -0,0 +1,52 @@
+import sys
+from typing import NamedTuple, Optional
+
+
+class CharacterRecord(NamedTuple):
+    """
+    A compact, immutable copy of the parts of a character the site looks up when rendering and
+    classifying scripts. The cached character maps hold these rather than model instances, which
+    are several times larger to pickle and keep in memory.
+    """
+
+    character_id: str
+    character_name: str
+    character_type: str
+    edition: Optional[int]
+    first_night_position: Optional[float]
+    other_night_position: Optional[float]
+    reminders: tuple[str, ...]
+
+    @classmethod
+    def create(
+        cls,
+        character_id: str,
+        character_name: str,
+        character_type: str,
+        edition: Optional[int] = None,
+        first_night_position: Optional[float] = None,
+        other_night_position: Optional[float] = None,
+        reminders: Optional[str] = None,
+    ) -> "CharacterRecord":
+        return cls(
+            character_id,
+            character_name,
+            # There are only a handful of character types, so share one string for each.
+            sys.intern(str(character_type)),
+            edition,
+            first_night_position,
+            other_night_position,
+            tuple(reminder for reminder in (reminders or "").split(",") if reminder),
+        )
+
+    @classmethod
+    def from_character(cls, character) -> "CharacterRecord":
+        return cls.create(
+            character.character_id,
+            character.character_name,
+            character.character_type,
+            getattr(character, "edition", None),
+            character.first_night_position,
+            character.other_night_position,
+            character.reminders,
+        )
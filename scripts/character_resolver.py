@@ -0,0 +1,58 @@
+from functools import cached_property
+from typing import Optional
+
+from scripts import cache, script_json
+from scripts.character_record import CharacterRecord
+
+
+class CharacterResolver:
+    """
+    Looks up characters by ID, fetching the clocktower characters from the cache at most once per
+    request however many characters a page renders. Homebrew characters are fetched as they're
+    needed, so prefetch the characters of a script to fetch them all in one go.
+    """
+
+    def __init__(self):
+        # The homebrew characters looked up so far, or None for IDs that aren't homebrew characters.
+        self.homebrew_characters: dict[str, Optional[CharacterRecord]] = {}
+
+    @cached_property
+    def clocktower_characters(self) -> dict[str, CharacterRecord]:
+        return cache.get_clocktower_characters()
+
+    def prefetch(self, script_content) -> None:
+        """
+        Fetches the homebrew characters of a script that haven't been looked up yet.
+        """
+        character_ids = {
+            character_id
+            for character_id in script_json.get_character_ids(script_content)
+            if character_id not in self.clocktower_characters and character_id not in self.homebrew_characters
+        }
+        if character_ids:
+            characters = cache.get_homebrew_characters(character_ids)
+            self.homebrew_characters.update(
+                (character_id, characters.get(character_id)) for character_id in character_ids
+            )
+
+    def get(self, character_id: str) -> Optional[CharacterRecord]:
+        """
+        Returns the clocktower character with an ID, or the homebrew character if there isn't one.
+        """
+        character = self.clocktower_characters.get(character_id)
+        if character is None and character_id:
+            if character_id not in self.homebrew_characters:
+                self.homebrew_characters[character_id] = cache.get_homebrew_characters([character_id]).get(character_id)
+            character = self.homebrew_characters[character_id]
+        return character
+
+
+def get_character_resolver(context) -> CharacterResolver:
+    """
+    Returns the resolver the character_resolver context processor added to a template context, or a
+    new one if the template is rendered without it.
+    """
+    resolver = context.get("character_resolver")
+    if resolver is None:
+        resolver = CharacterResolver()
+    return resolver
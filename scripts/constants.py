@@ -3,3 +3,5 @@ MAX_SCRIPT_NAME_LENGTH = 100
 MAX_AUTHOR_NAME_LENGTH = 100
 STANDARD_TEENSYVILLE_CHARACTER_COUNT = 12
 MAX_CHARACTER_COUNT = 25
+MAX_CHARACTER_ID_LENGTH = 50
+WORLD_CUP_TAG_PK = 3
@@ -1,5 +1,16 @@
 from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+from scripts.character_resolver import CharacterResolver
+from scripts.user_scripts import UserScriptLookup
 
 
 def custom_configuration(_request):
     return {"UPLOAD_DISABLED": settings.UPLOAD_DISABLED, "BANNER": settings.BANNER}
+
+
+def user_scripts(request):
+    return {"user_scripts": SimpleLazyObject(lambda: UserScriptLookup(request.user))}
+
+
+def character_resolver(_request):
+    return {"character_resolver": CharacterResolver()}
@@ -0,0 +1,115 @@
+from collections.abc import Iterable
+from typing import Optional
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from scripts import models
+
+# The counter on Script for each model that relates users to scripts, and that model's field
+# pointing at the script.
+COUNTERS = {
+    "num_likes": (models.Vote, "parent"),
+    "num_favourites": (models.Favourite, "parent"),
+    "num_comments": (models.Comment, "script"),
+}
+
+
+def get_counter_field(model) -> str:
+    for field, (counter_model, _) in COUNTERS.items():
+        if counter_model is model:
+            return field
+    raise ValueError(f"{model.__name__} has no counter on Script")
+
+
+def adjust_counter(model, script_pk: int, delta: int) -> None:
+    """
+    Adds delta to the counter for model on a script. The update is done in the database so
+    concurrent requests can't overwrite each other's changes, and should be made in the same
+    transaction as the change being counted.
+    """
+    field = get_counter_field(model)
+    models.Script.objects.filter(pk=script_pk).update(**{field: F(field) + delta})
+
+
+def toggle_user_related_script(model, user: User, script: models.Script) -> bool:
+    """
+    Adds or removes a user's vote or favourite on a script, keeping the script's counter in step.
+
+    Returns True if the vote or favourite now exists.
+    """
+    with transaction.atomic():
+        deleted, _ = model.objects.filter(user=user, parent=script).delete()
+        if deleted:
+            adjust_counter(model, script.pk, -deleted)
+            return False
+        model.objects.create(user=user, parent=script)
+        adjust_counter(model, script.pk, 1)
+        return True
+
+
+def remove_user_counters(user: User) -> None:
+    """
+    Takes a user's votes, favourites and comments off the counters of the scripts they are on.
+    Must be called in the same transaction as deleting the user, which deletes all of them.
+    """
+    for field, (model, script_field) in COUNTERS.items():
+        counts = (
+            model.objects.filter(user=user, **{f"{script_field}__isnull": False})
+            .order_by()
+            .values(script_field)
+            .annotate(count=Count("pk"))
+            .values_list(script_field, "count")
+        )
+        for script_pk, count in counts:
+            models.Script.objects.filter(pk=script_pk).update(**{field: F(field) - count})
+
+
+def get_actual_counts() -> dict:
+    """
+    Returns expressions counting the rows behind each counter on a Script.
+    """
+    return {
+        f"actual_{field}": Coalesce(
+            Subquery(
+                model.objects.filter(**{script_field: OuterRef("pk")})
+                .order_by()
+                .values(script_field)
+                .annotate(count=Count("pk"))
+                .values("count")
+            ),
+            0,
+        )
+        for field, (model, script_field) in COUNTERS.items()
+    }
+
+
+def reconcile_counters(scripts: Optional[Iterable[models.Script]] = None, dry_run: bool = False) -> list[dict]:
+    """
+    Recounts the votes, favourites and comments of scripts, all scripts by default, and corrects
+    any counters which have drifted.
+
+    Returns the scripts whose counters were wrong, with the stored and actual counts.
+    """
+    queryset = models.Script.objects.all()
+    if scripts is not None:
+        queryset = queryset.filter(pk__in=[script.pk for script in scripts])
+
+    mismatched = Q()
+    for field in COUNTERS:
+        mismatched |= ~Q(**{field: F(f"actual_{field}")})
+    wrong = list(
+        queryset.annotate(**get_actual_counts())
+        .filter(mismatched)
+        .order_by("pk")
+        .values("pk", "name", *COUNTERS, *(f"actual_{field}" for field in COUNTERS))
+    )
+
+    if wrong and not dry_run:
+        actual_counts = get_actual_counts()
+        models.Script.objects.filter(pk__in=[script["pk"] for script in wrong]).update(
+            **{field: actual_counts[f"actual_{field}"] for field in COUNTERS}
+        )
+    return wrong
@@ -0,0 +1,61 @@
+import zlib
+from collections.abc import Iterable, Iterator
+from datetime import datetime, time, timezone as dt_timezone
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+# Roughly how much NDJSON to gather before yielding it, so the response isn't written a line at a time.
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_since(since: str) -> dict:
+    """
+    Returns the queryset filter for the rows after since, which is either a script version pk or an
+    ISO 8601 date or timestamp of when it was created. Raises ValueError if it is neither.
+    """
+    since = since.strip()
+    if since.isdigit():
+        return {"pk__gt": int(since)}
+
+    created = parse_datetime(since)
+    if created is None:
+        date = parse_date(since)
+        if date is None:
+            raise ValueError(f"'{since}' is neither a script version ID nor an ISO 8601 date or timestamp")
+        created = datetime.combine(date, time.min)
+    if timezone.is_naive(created):
+        created = timezone.make_aware(created, dt_timezone.utc)
+    return {"created__gt": created}
+
+
+def encode_ndjson(rows: Iterable[dict], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Encodes rows as newline delimited JSON, yielding it in chunks of about chunk_size bytes.
+    """
+    encoder = DjangoJSONEncoder(separators=(",", ":"))
+    chunk = []
+    size = 0
+    for row in rows:
+        line = encoder.encode(row).encode("utf-8") + b"\n"
+        chunk.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield b"".join(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        yield b"".join(chunk)
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Gzips a stream of chunks as they are produced.
+    """
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
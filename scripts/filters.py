@@ -4,6 +4,7 @@ import django_filters
 from django_filters import rest_framework as filters
 from django import forms
 from django.contrib.postgres.search import TrigramSimilarity
+from django.db.models import Exists, OuterRef
 
 from scripts import models, widgets, script_json
 
@@ -27,12 +28,21 @@ def annotate_queryset(queryset, field, value):
     return queryset.annotate(similarity=TrigramSimilarity(field, value))
 
 
+def has_character(character_id: str) -> Exists:
+    """
+    Expression that is true for script versions that include the character.
+    """
+    return Exists(
+        models.ScriptVersionCharacter.objects.filter(script_version=OuterRef("pk"), character_id=character_id)
+    )
+
+
 def include_characters(queryset, value):
     for character in re.split(",|;|:|/", value):
         character = script_json.strip_special_characters(character.strip())
         if character in ",;:/":
             continue
-        queryset = queryset.filter(content__contains=[{"id": name_to_id(character)}])
+        queryset = queryset.filter(has_character(name_to_id(character)))
     return queryset
 
 
@@ -41,7 +51,7 @@ def exclude_characters(queryset, value):
         character = script_json.strip_special_characters(character.strip())
         if character in ",;:/":
             continue
-        queryset = queryset.exclude(content__contains=[{"id": name_to_id(character)}])
+        queryset = queryset.filter(~has_character(name_to_id(character)))
     return queryset
 
 
@@ -4,11 +4,7 @@ from django.core.validators import FileExtensionValidator
 import jsonschema.exceptions
 from versionfield import Version
 
-from scripts import constants, models, validators, widgets, script_json
-import json as js
-import requests
-import os
-import jsonschema
+from scripts import constants, models, script_schema, validators, widgets, script_json
 
 
 def tagOptions():
@@ -51,30 +47,15 @@ class ScriptForm(forms.Form):
         except script_json.JSONError as e:
             raise ValidationError(f"Invalid JSON content: {e}")
 
-        try:
-            schema_version = str(os.environ.get("JSON_SCHEMA_VERSION", "v3.52.0"))
-            schema_url = f"https://raw.githubusercontent.com/ThePandemoniumInstitute/botc-release/refs/tags/{schema_version}/script-schema.json"
-            schema = requests.get(schema_url, timeout=2)
+        validator = script_schema.get_validator()
+        if validator is not None:
             try:
-                schema = js.loads(schema.content)
-                # Update the additionalProperties field on the Script Character object. The app doesn't enforce this and bloodstar
-                # adds additional properties here.
-                schema["items"]["oneOf"][0]["additionalProperties"] = True
-                jsonschema.validate(json, schema)
+                validator.validate(json)
             except jsonschema.exceptions.ValidationError as e:
                 raise ValidationError(
-                    f"This is not a valid script JSON. It does not conform to the schema at {schema_url}. \
-                    Error message: {e.message}"
+                    "This is not a valid script JSON. It does not conform to the schema at "
+                    f"{script_schema.get_schema_url()}. Error message: {e.message}"
                 )
-            except jsonschema.exceptions.SchemaError:
-                # The schema is invalid, just continue and assume it's valid
-                pass
-            except KeyError:
-                # Our attempt to edit the schema has failed, just continue and assume it's valid
-                pass
-        except requests.exceptions.Timeout:
-            # We couldn't fetch the schema, just continue and assume it's valid
-            pass
 
         if not isinstance(json, list):
             raise ValidationError("This is not a valid script JSON. Script JSONs are lists of character objects.")
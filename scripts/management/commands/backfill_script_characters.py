@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from scripts.models import ScriptVersion
+from scripts.views import update_script_version_characters
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalised ScriptVersionCharacter rows from the content of each script version"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Number of script versions per transaction")
+        parser.add_argument(
+            "--missing-only",
+            action="store_true",
+            help="Only process script versions that don't have any character rows",
+        )
+
+    def handle(self, *args, **options):
+        scripts = ScriptVersion.plain_objects.only("pk", "content").order_by("pk")
+        if options["missing_only"]:
+            scripts = scripts.filter(characters__isnull=True)
+        total = scripts.count()
+        batch_size = options["batch_size"]
+
+        self.stdout.write(f"Processing {total} script versions...")
+
+        batch = []
+        for i, script in enumerate(scripts.iterator(chunk_size=batch_size), 1):
+            batch.append(script)
+            if len(batch) == batch_size:
+                update_script_version_characters(batch)
+                batch = []
+                self.stdout.write(f"Progress: {i}/{total}")
+
+        if batch:
+            update_script_version_characters(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Successfully updated {total} script versions"))
@@ -0,0 +1,32 @@
+from django.db.models import Count
+from django.core.management.base import BaseCommand
+from scripts.models import Script, ScriptVersion
+from scripts.versions import update_version_diffs
+
+
+class Command(BaseCommand):
+    help = "Store the diff between each script version and the previous version of the script"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--recompute",
+            action="store_true",
+            help="Recompute every diff rather than only those that are missing or out of date",
+        )
+
+    def handle(self, *args, **options):
+        scripts = Script.objects.annotate(num_versions=Count("versions")).filter(num_versions__gt=1).order_by("pk")
+        total = scripts.count()
+
+        self.stdout.write(f"Processing {total} scripts with more than one version...")
+
+        updated_count = 0
+        for i, script in enumerate(scripts.iterator(), 1):
+            changed = ()
+            if options["recompute"]:
+                changed = ScriptVersion.plain_objects.filter(script=script).values_list("pk", flat=True)
+            updated_count += update_version_diffs(script, changed=changed)
+            if i % 100 == 0:
+                self.stdout.write(f"Progress: {i}/{total} ({updated_count} diffs updated)")
+
+        self.stdout.write(self.style.SUCCESS(f"Successfully updated {updated_count} script version diff(s)"))
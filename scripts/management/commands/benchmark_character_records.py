@@ -0,0 +1,59 @@
+import pickle
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from scripts import cache, models
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the memory footprint and load time of the cached character maps as CharacterRecords "
+        "against model instances"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20, help="Number of times to unpickle each map")
+
+    def handle(self, *args, **options):
+        for model in [models.ClocktowerCharacter, models.HomebrewCharacter]:
+            self.stdout.write(self.style.MIGRATE_HEADING(model.__name__))
+            self.compare(
+                "Model instances",
+                lambda model=model: {character.character_id: character for character in model.objects.all()},
+                options,
+            )
+            self.compare(
+                "CharacterRecords", lambda model=model: cache.load_character_records(model.objects.all()), options
+            )
+
+    def compare(self, label, load, options):
+        start = time.perf_counter()
+        characters = load()
+        load_time = time.perf_counter() - start
+        if not characters:
+            self.stdout.write(f"  {label}: no characters")
+            return
+
+        data = pickle.dumps(characters)
+        start = time.perf_counter()
+        for _ in range(options["repeat"]):
+            pickle.loads(data)
+        unpickle_time = (time.perf_counter() - start) / options["repeat"]
+
+        # Measure the memory held by a freshly unpickled copy, as each worker holds one.
+        tracemalloc.start()
+        snapshot_before = tracemalloc.take_snapshot()
+        copy = pickle.loads(data)
+        snapshot_after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        memory = sum(stat.size_diff for stat in snapshot_after.compare_to(snapshot_before, "filename"))
+        del copy
+
+        count = len(characters)
+        self.stdout.write(
+            f"  {label}: {count} characters, load {load_time * 1000:.1f}ms, "
+            f"unpickle {unpickle_time * 1000:.2f}ms, pickled {len(data) / count:.0f} bytes/character, "
+            f"in memory {memory / count:.0f} bytes/character"
+        )
@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.template import Context, Template
+
+from scripts import cache, models
+from scripts.character_resolver import CharacterResolver
+
+# The character list and meta description from script.html.
+TEMPLATE = Template(
+    """{% load botc_script_tags %}
+<meta property="og:description" content="{% get_characters script_version %}" />
+{% for role in script_version.content %}
+    {% if role.id != "_meta" %}
+        {% character_type_change script_version.content forloop.counter0 as newline %}
+        {% if newline %}<br>{% endif %}
+        {% character_colourisation role.id as character_colour %}
+        <li><span {{ character_colour }}>{% convert_id_to_friendly_text role.id %}</span></li>
+    {% endif %}
+{% endfor %}"""
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark rendering the characters of a script page with a per-request character resolver against "
+        "fetching the characters from the cache in every template tag"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--characters", type=int, default=25, help="Characters on the rendered script")
+        parser.add_argument("--renders", type=int, default=200, help="Number of times to render the page")
+
+    def handle(self, *args, **options):
+        clocktower_characters = cache.get_clocktower_characters()
+        character_ids = sorted(
+            clocktower_characters,
+            key=lambda character_id: (clocktower_characters[character_id].character_type, character_id),
+        )[: options["characters"]]
+        if len(character_ids) < options["characters"]:
+            self.stdout.write(self.style.WARNING(f"Only {len(character_ids)} characters in the database"))
+        script_version = models.ScriptVersion(
+            content=[{"id": "_meta", "name": "Benchmark"}] + [{"id": character_id} for character_id in character_ids]
+        )
+        self.stdout.write(f"Rendering {len(character_ids)} characters {options['renders']} times")
+
+        # Without a resolver in the context each tag looks the characters up in the cache itself.
+        per_tag = self.time(
+            "Cache lookup per tag", lambda: TEMPLATE.render(Context({"script_version": script_version})), options
+        )
+        per_request = self.time(
+            "Resolver per request",
+            lambda: TEMPLATE.render(
+                Context({"script_version": script_version, "character_resolver": CharacterResolver()})
+            ),
+            options,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Speedup: {per_tag / per_request:.1f}x"))
+
+    def time(self, label, render, options) -> float:
+        render()
+        start = time.perf_counter()
+        for _ in range(options["renders"]):
+            render()
+        elapsed = (time.perf_counter() - start) / options["renders"]
+        self.stdout.write(f"{label}: {elapsed * 1000:.2f}ms per render")
+        return elapsed
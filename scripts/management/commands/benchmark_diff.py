@@ -0,0 +1,106 @@
+import json as js
+import timeit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from scripts import script_json
+
+# The script pairs covered by tests/test_additions.py and tests/test_changes.py.
+PAIRS = [
+    ("trouble_brewing.json", "strings_pulling.json"),
+    ("trouble_brewing.json", "strings_pulling_with_meta.json"),
+    ("trouble_brewing_with_meta.json", "strings_pulling.json"),
+    ("trouble_brewing_with_meta.json", "strings_pulling_with_meta.json"),
+    ("trouble_brewing.json", "half_of_the_108.json"),
+    ("trouble_brewing.json", "pies_baking.json"),
+    ("trouble_brewing.json", "hybrid1.json"),
+    ("hybrid1.json", "hybrid2.json"),
+]
+
+
+def legacy_json_additions(old_json, new_json):
+    for old_id in old_json:
+        if old_id["id"] == "_meta":
+            continue
+        for new_id in new_json:
+            if new_id["id"] == "_meta":
+                continue
+            if old_id["id"] == new_id["id"]:
+                new_json.remove(new_id)
+                continue
+
+    for new_id in new_json:
+        if new_id["id"] == "_meta":
+            new_json.remove(new_id)
+            break
+
+    return new_json
+
+
+def legacy_json_changes(old_json, new_json):
+    changed_json = []
+    for old_id in old_json:
+        if old_id["id"] == "_meta":
+            continue
+        for new_id in new_json:
+            if new_id["id"] == "_meta":
+                continue
+            if old_id["id"] == new_id["id"]:
+                if old_id.get("ability", "UNKNOWN_ABILITY") != new_id.get("ability", "UNKNOWN_ABILITY"):
+                    changed_json.append({"id": new_id["id"]})
+                    continue
+
+    return changed_json
+
+
+def legacy_json_diff(old_json, new_json):
+    return (
+        legacy_json_additions(old_json.copy(), new_json.copy()),
+        legacy_json_additions(new_json.copy(), old_json.copy()),
+        legacy_json_changes(old_json.copy(), new_json.copy()),
+    )
+
+
+def json_diff(old_json, new_json):
+    diff = script_json.get_json_diff(old_json, new_json)
+    return diff.additions, diff.deletions, diff.changes
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark diffing the test script pairs with get_json_diff against the previous nested loop "
+        "implementation, checking both produce the same additions, deletions and changes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=10000, help="Number of times to diff each pair")
+
+    def handle(self, *args, **options):
+        input_dir = settings.BASE_DIR / "tests" / "input"
+        iterations = options["iterations"]
+        legacy_total = diff_total = 0.0
+        for old_file, new_file in PAIRS:
+            with open(input_dir / old_file, "r") as f:
+                old_json = script_json.revert_to_old_format(js.load(f))
+            with open(input_dir / new_file, "r") as f:
+                new_json = script_json.revert_to_old_format(js.load(f))
+
+            if legacy_json_diff(old_json, new_json) != json_diff(old_json, new_json):
+                self.stdout.write(self.style.ERROR(f"{old_file} -> {new_file}: results differ"))
+
+            legacy_time = timeit.timeit(
+                lambda old=old_json, new=new_json: legacy_json_diff(old, new), number=iterations
+            )
+            diff_time = timeit.timeit(lambda old=old_json, new=new_json: json_diff(old, new), number=iterations)
+            legacy_total += legacy_time
+            diff_total += diff_time
+            self.stdout.write(
+                f"{old_file} -> {new_file}: legacy {legacy_time / iterations * 1e6:.1f}us, "
+                f"get_json_diff {diff_time / iterations * 1e6:.1f}us"
+            )
+
+        self.stdout.write(
+            f"Total: legacy {legacy_total * 1000:.1f}ms, get_json_diff {diff_total * 1000:.1f}ms "
+            f"({legacy_total / diff_total:.1f}x)"
+        )
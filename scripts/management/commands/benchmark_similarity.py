@@ -0,0 +1,95 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from scripts import character_index, minhash, models, script_json
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark MinHash LSH similar script search against an exact comparison with every script version, "
+        "reporting the mean query latency of each and the recall of the LSH results."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--queries", type=int, default=20, help="Number of script versions to query")
+        parser.add_argument("--k", type=int, default=10, help="Number of similar scripts to find")
+        parser.add_argument("--permutations", type=int, default=128)
+        parser.add_argument("--bands", type=int, default=32)
+        parser.add_argument(
+            "--max-candidates",
+            type=int,
+            default=character_index.MAX_APPROXIMATE_CANDIDATES,
+            help="Most LSH candidates to compare against",
+        )
+        parser.add_argument("--latest-only", action="store_true", help="Only search the latest script versions")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        queryset = models.ScriptVersion.plain_objects.all()
+        if options["latest_only"]:
+            queryset = queryset.filter(latest=True)
+        versions = {
+            pk: (content, script_type)
+            for pk, content, script_type in queryset.values_list("pk", "content", "script_type")
+        }
+        if not versions:
+            self.stdout.write(self.style.WARNING("No script versions to benchmark"))
+            return
+
+        start = time.perf_counter()
+        index = character_index.CharacterIndex()
+        for pk, (content, script_type) in versions.items():
+            index.add(pk, content, script_type=script_type)
+        index.build_lsh(minhash.MinHashLSH(options["permutations"], options["bands"]))
+        self.stdout.write(f"Indexed {len(versions)} script versions in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+        k = options["k"]
+        queries = random.Random(options["seed"]).sample(sorted(versions), min(options["queries"], len(versions)))
+        exact_time = lsh_time = 0.0
+        num_candidates = found = expected = 0
+        for query_pk in queries:
+            content, script_type = versions[query_pk]
+
+            start = time.perf_counter()
+            exact = sorted(
+                (
+                    script_json.get_similarity(content, other_content, script_type == other_type)
+                    for pk, (other_content, other_type) in versions.items()
+                    if pk != query_pk
+                ),
+                reverse=True,
+            )[:k]
+            exact_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            candidates = index.approximate_candidates(
+                content, index.versions() & ~index.mask([query_pk]), options["max_candidates"]
+            )
+            approximate = []
+            for candidate_type in models.ScriptTypes.values:
+                approximate.extend(
+                    index.most_similar(
+                        content,
+                        candidates & index.versions(script_type=candidate_type),
+                        script_type == candidate_type,
+                        k,
+                    )
+                )
+            approximate = sorted((score for _, score in approximate), reverse=True)[:k]
+            lsh_time += time.perf_counter() - start
+
+            num_candidates += candidates.bit_count()
+            if exact:
+                # A result counts towards recall if it is at least as similar as the exact k-th best.
+                found += sum(score >= exact[-1] for score in approximate)
+                expected += len(exact)
+
+        self.stdout.write(f"Exact search: {exact_time / len(queries) * 1000:.1f}ms per query")
+        self.stdout.write(
+            f"LSH search: {lsh_time / len(queries) * 1000:.1f}ms per query, "
+            f"{num_candidates / len(queries):.0f} candidates on average"
+        )
+        if expected:
+            self.stdout.write(f"Recall@{k}: {found / expected:.3f}")
@@ -0,0 +1,83 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from scripts import models
+from scripts.aggregation import count_characters_postgres, count_characters_streaming
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark character statistics aggregation against the per-character count loop on a synthetic dataset. "
+        "The synthetic scripts are created inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scripts", type=int, default=50000, help="Number of synthetic scripts to create")
+        parser.add_argument("--characters", type=int, default=22, help="Characters per synthetic script")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        character_ids = list(models.ClocktowerCharacter.objects.values_list("character_id", flat=True))
+        if not character_ids:
+            character_ids = [f"character{i}" for i in range(180)]
+            self.stdout.write(self.style.WARNING("No characters in the database, using synthetic character IDs"))
+
+        with transaction.atomic():
+            self.create_dataset(character_ids, options["scripts"], options["characters"], options["seed"])
+            queryset = models.ScriptVersion.plain_objects.filter(latest=True)
+            total = queryset.count()
+            self.stdout.write(f"Benchmarking {total} script versions against {len(character_ids)} characters")
+
+            loop_counts = self.time("Per-character count loop", lambda: self.count_loop(queryset, character_ids))
+            results = {"Streaming aggregation": lambda: count_characters_streaming(queryset)}
+            if connections[queryset.db].vendor == "postgresql":
+                results["PostgreSQL aggregation"] = lambda: count_characters_postgres(queryset)
+
+            for label, function in results.items():
+                counts = self.time(label, function)
+                mismatches = [c for c in character_ids if counts.get(c, 0) != loop_counts[c]]
+                if mismatches:
+                    self.stdout.write(self.style.ERROR(f"  {len(mismatches)} counts differ from the loop"))
+
+            transaction.set_rollback(True)
+
+    def create_dataset(self, character_ids, num_scripts, num_characters, seed):
+        rng = random.Random(seed)
+        scripts = models.Script.objects.bulk_create(
+            [models.Script(name=f"Benchmark Script {i}") for i in range(num_scripts)], batch_size=2000
+        )
+        versions = []
+        for script in scripts:
+            content = [{"id": "_meta", "name": script.name}]
+            content.extend({"id": character_id} for character_id in rng.sample(character_ids, num_characters))
+            versions.append(
+                models.ScriptVersion(
+                    script=script,
+                    version="1",
+                    content=content,
+                    num_townsfolk=0,
+                    num_outsiders=0,
+                    num_minions=0,
+                    num_demons=0,
+                    num_fabled=0,
+                    num_loric=0,
+                    num_travellers=0,
+                )
+            )
+        models.ScriptVersion.plain_objects.bulk_create(versions, batch_size=2000)
+
+    def count_loop(self, queryset, character_ids):
+        return {
+            character_id: queryset.filter(content__contains=[{"id": character_id}]).count()
+            for character_id in character_ids
+        }
+
+    def time(self, label, function):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"  {label}: {elapsed * 1000:.1f}ms")
+        return result
@@ -0,0 +1,73 @@
+import json as js
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from scripts import bulk_import
+
+
+class Command(BaseCommand):
+    help = "Import scripts in bulk from a JSON array or NDJSON file, such as one produced by the export API"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="JSON array or NDJSON file of scripts to import")
+        parser.add_argument("--owner", help="Username of the user to own newly created scripts")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=bulk_import.DEFAULT_CHUNK_SIZE,
+            help="Number of scripts saved in each transaction",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Validate the scripts without saving them")
+
+    def handle(self, *args, **options):
+        owner = None
+        if options["owner"]:
+            try:
+                owner = User.objects.get(username=options["owner"])
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['owner']}' does not exist")
+
+        self.start = time.perf_counter()
+        self.processed = 0
+        results = bulk_import.import_scripts(
+            self.read_scripts(options["path"]),
+            user=owner,
+            chunk_size=options["chunk_size"],
+            dry_run=options["dry_run"],
+            progress=self.report_progress,
+        )
+
+        failed = [result for result in results if result.status == "error"]
+        for result in failed:
+            self.stdout.write(
+                self.style.WARNING(f"  #{result.index} '{result.name}' v{result.version}: {'; '.join(result.errors)}")
+            )
+        succeeded = len(results) - len(failed)
+        if options["dry_run"]:
+            self.stdout.write(self.style.SUCCESS(f"{succeeded} of {len(results)} scripts would be imported"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Successfully imported {succeeded} of {len(results)} scripts"))
+
+    def read_scripts(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            first = f.read(1)
+            while first.isspace():
+                first = f.read(1)
+            f.seek(0)
+            if first == "[":
+                yield from js.load(f)
+                return
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield js.loads(line)
+                except ValueError as e:
+                    raise CommandError(f"Invalid JSON on line {line_number}: {e}")
+
+    def report_progress(self, results):
+        self.processed += len(results)
+        elapsed = time.perf_counter() - self.start
+        rate = self.processed / elapsed if elapsed else 0
+        self.stdout.write(f"Progress: {self.processed} scripts ({rate:.0f} scripts/s)")
@@ -0,0 +1,23 @@
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from scripts import script_schema
+
+
+class Command(BaseCommand):
+    help = "Download a version of the script JSON schema and pin it on disk so uploads can be validated offline"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--version", dest="schema_version", help="Schema version to pin, defaults to JSON_SCHEMA_VERSION"
+        )
+        parser.add_argument("--url", help="URL to fetch the schema from, which may be a file:// URL")
+
+    def handle(self, *args, **options):
+        version = options["schema_version"] or script_schema.get_schema_version()
+        try:
+            path = script_schema.pin_schema(version, url=options["url"])
+        except (requests.RequestException, OSError, ValueError) as e:
+            raise CommandError(f"Failed to pin schema {version}: {e}")
+        if script_schema.get_validator(version) is None:
+            raise CommandError(f"Schema {version} was pinned to {path} but is not a valid script schema")
+        self.stdout.write(self.style.SUCCESS(f"Pinned schema {version} to {path}"))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from scripts.worldcup import rebuild_world_cup_statistics
+
+
+class Command(BaseCommand):
+    help = "Recount the characters added to and removed from World Cup scripts across their versions"
+
+    def handle(self, *args, **options):
+        num_characters = rebuild_world_cup_statistics()
+        self.stdout.write(
+            self.style.SUCCESS(f"Successfully rebuilt World Cup statistics for {num_characters} characters")
+        )
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from scripts.counters import COUNTERS, reconcile_counters
+
+
+class Command(BaseCommand):
+    help = "Recount the likes, favourites and comments of every script and correct any drifted counters"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Report the drifted counters without fixing them")
+
+    def handle(self, *args, **options):
+        wrong = reconcile_counters(dry_run=options["dry_run"])
+        for script in wrong:
+            drifted = ", ".join(
+                f"{field} {script[field]} -> {script[f'actual_{field}']}"
+                for field in COUNTERS
+                if script[field] != script[f"actual_{field}"]
+            )
+            self.stdout.write(f"  '{script['name']}' (ID: {script['pk']}): {drifted}")
+
+        if options["dry_run"]:
+            self.stdout.write(self.style.SUCCESS(f"{len(wrong)} script(s) have drifted counters"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Successfully reconciled {len(wrong)} script(s)"))
@@ -0,0 +1,25 @@
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from scripts import official_roles
+
+
+class Command(BaseCommand):
+    help = "Refresh the local snapshot of the official script tool's roles, only downloading them if they've changed"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", help="URL to fetch the roles from, which may be a file:// URL")
+        parser.add_argument("--path", help="Path to store the snapshot at")
+        parser.add_argument("--force", action="store_true", help="Download the roles even if they haven't changed")
+
+    def handle(self, *args, **options):
+        path = options["path"] or official_roles.get_snapshot_path()
+        try:
+            updated = official_roles.refresh(url=options["url"], path=path, force=options["force"])
+        except (requests.RequestException, OSError, ValueError) as e:
+            raise CommandError(f"Failed to refresh the official roles: {e}")
+
+        num_roles = len(official_roles.read_snapshot(path)["role_ids"])
+        if updated:
+            self.stdout.write(self.style.SUCCESS(f"Updated the official roles snapshot with {num_roles} roles"))
+        else:
+            self.stdout.write(f"The official roles are unchanged ({num_roles} roles)")
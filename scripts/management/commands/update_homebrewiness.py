@@ -1,36 +1,138 @@
+import contextlib
+import functools
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import django
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from scripts import cache, official_roles
 from scripts.models import ScriptVersion
-from scripts.views import create_characters_and_determine_homebrew_status
+from scripts.views import (
+    classify_script_characters,
+    get_homebrew_character,
+    save_homebrew_characters,
+    update_script_version_characters,
+)
 
 
 class Command(BaseCommand):
     help = "Update homebrewiness field for all script versions (Clocktower/Hybrid/Homebrew)"
 
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Number of script versions per batch")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of processes to classify scripts with, or 1 to classify them in this process",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            default=".update_homebrewiness_checkpoint",
+            help="File recording the last script version processed, so an interrupted run can be resumed",
+        )
+        parser.add_argument("--restart", action="store_true", help="Ignore any checkpoint and start from the beginning")
+        parser.add_argument(
+            "--classify-only",
+            action="store_true",
+            help="Only update the homebrewiness field, without creating or updating homebrew characters",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Report the changes without saving anything")
+
     def handle(self, *args, **options):
-        scripts = ScriptVersion.objects.all()
+        checkpoint = Path(options["checkpoint"])
+        since_pk = 0
+        if not options["restart"] and checkpoint.exists():
+            since_pk = int(checkpoint.read_text().strip() or 0)
+            self.stdout.write(f"Resuming after script version {since_pk}")
+
+        scripts = (
+            ScriptVersion.plain_objects.filter(pk__gt=since_pk)
+            .select_related("script")
+            .only("pk", "content", "homebrewiness", "version", "script__name")
+            .order_by("pk")
+        )
         total = scripts.count()
-        updated_count = 0
+        batch_size = options["batch_size"]
         self.stdout.write(f"Processing {total} script versions...")
 
-        for i, script_version in enumerate(scripts, 1):
-            old_homebrewiness = script_version.homebrewiness
+        classify = functools.partial(
+            classify_script_characters,
+            clocktower_character_ids=frozenset(cache.get_clocktower_characters()),
+            official_role_ids=official_roles.get_official_role_ids(),
+        )
+        # Classifying is CPU bound pure Python, so a thread pool would be serialised by the GIL.
+        executor = None
+        if options["workers"] > 1:
+            executor = ProcessPoolExecutor(max_workers=options["workers"], initializer=django.setup)
 
-            # Calculate the new homebrewiness value
-            new_homebrewiness = create_characters_and_determine_homebrew_status(
-                script_version.content, script_version.script
-            )
+        start = time.perf_counter()
+        processed = 0
+        updated_count = 0
+        with executor or contextlib.nullcontext():
+            batch = []
+            for script_version in scripts.iterator(chunk_size=batch_size):
+                batch.append(script_version)
+                if len(batch) == batch_size:
+                    updated_count += self.update_batch(batch, executor, classify, options)
+                    processed += len(batch)
+                    self.report_progress(processed, total, updated_count, start, batch[-1].pk, checkpoint, options)
+                    batch = []
 
-            if old_homebrewiness != new_homebrewiness:
-                updated_count += 1
-                script_version.homebrewiness = new_homebrewiness
-                script_version.save(update_fields=["homebrewiness"])
+            if batch:
+                updated_count += self.update_batch(batch, executor, classify, options)
+                processed += len(batch)
+                self.report_progress(processed, total, updated_count, start, batch[-1].pk, checkpoint, options)
 
+        if not options["dry_run"]:
+            checkpoint.unlink(missing_ok=True)
+        self.stdout.write(self.style.SUCCESS(f"\nSuccessfully updated {updated_count} script versions"))
+
+    def update_batch(self, batch, executor, classify, options) -> int:
+        contents = [script_version.content for script_version in batch]
+        if executor is None:
+            results = map(classify, contents)
+        else:
+            results = executor.map(classify, contents, chunksize=max(1, len(batch) // (options["workers"] * 4)))
+
+        changed = []
+        homebrew_characters = {}
+        for script_version, (new_homebrewiness, script_homebrew_characters) in zip(batch, results):
+            # Later script versions overwrite the homebrew characters of earlier ones, as they would
+            # if each script version was processed in turn.
+            for character_id, item in script_homebrew_characters.items():
+                homebrew_characters[character_id] = get_homebrew_character(item, script_version.script)
+
+            if script_version.homebrewiness != new_homebrewiness:
                 self.stdout.write(
-                    f"  [{i}/{total}] {script_version.script.name} v{script_version.version}: "
-                    f"{old_homebrewiness} -> {new_homebrewiness}"
+                    f"  {script_version.script.name} v{script_version.version}: "
+                    f"{script_version.homebrewiness} -> {new_homebrewiness}"
                 )
+                script_version.homebrewiness = new_homebrewiness
+                # bulk_update doesn't set the modified time, which the character index syncs by.
+                script_version.modified = timezone.now()
+                changed.append(script_version)
 
-            if i % 100 == 0:
-                self.stdout.write(f"Progress: {i}/{total} ({updated_count} updates)")
+        if options["dry_run"]:
+            return len(changed)
 
-        self.stdout.write(self.style.SUCCESS(f"\nSuccessfully updated {updated_count} script versions"))
+        with transaction.atomic():
+            if not options["classify_only"]:
+                save_homebrew_characters(list(homebrew_characters.values()))
+                # Homebrew characters may have been created, so refresh the character types.
+                update_script_version_characters(batch)
+            if changed:
+                ScriptVersion.plain_objects.bulk_update(changed, ["homebrewiness", "modified"])
+        return len(changed)
+
+    def report_progress(self, processed, total, updated_count, start, last_pk, checkpoint, options):
+        if not options["dry_run"]:
+            checkpoint.write_text(str(last_pk))
+        elapsed = time.perf_counter() - start
+        rate = processed / elapsed if elapsed else 0
+        self.stdout.write(
+            f"Progress: {processed}/{total} ({updated_count} updates, {rate:.0f} scripts/s, up to pk {last_pk})"
+        )
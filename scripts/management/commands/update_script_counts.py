@@ -1,28 +1,90 @@
+import time
+
 from django.core.management.base import BaseCommand
+from scripts import cache
 from scripts.models import ScriptVersion, CharacterType
-from scripts.views import count_character
+from scripts.views import count_characters_by_type, get_scripts_homebrew_characters, update_script_version_characters
+
+COUNT_FIELDS = {
+    "num_townsfolk": CharacterType.TOWNSFOLK,
+    "num_outsiders": CharacterType.OUTSIDER,
+    "num_minions": CharacterType.MINION,
+    "num_demons": CharacterType.DEMON,
+    "num_fabled": CharacterType.FABLED,
+    "num_loric": CharacterType.LORIC,
+    "num_travellers": CharacterType.TRAVELLER,
+}
 
 
 class Command(BaseCommand):
     help = "Update character count fields for all script versions"
 
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Number of script versions per batch")
+        parser.add_argument("--since-pk", type=int, default=0, help="Only update script versions after this pk")
+        parser.add_argument("--dry-run", action="store_true", help="Report the changes without saving them")
+
     def handle(self, *args, **options):
-        scripts = ScriptVersion.objects.all()
+        scripts = (
+            ScriptVersion.plain_objects.filter(pk__gt=options["since_pk"])
+            .only("pk", "content", *COUNT_FIELDS)
+            .order_by("pk")
+        )
         total = scripts.count()
+        batch_size = options["batch_size"]
+        dry_run = options["dry_run"]
+
+        self.stdout.write(f"Updating {total} script versions{' (dry run)' if dry_run else ''}...")
+
+        clocktower_characters = cache.get_clocktower_characters()
+        start = time.perf_counter()
+        processed = 0
+        updated = 0
+        batch = []
+        for script in scripts.iterator(chunk_size=batch_size):
+            batch.append(script)
+            if len(batch) == batch_size:
+                updated += self.update_batch(batch, clocktower_characters, dry_run)
+                processed += len(batch)
+                self.report_progress(processed, total, updated, start, batch[-1].pk)
+                batch = []
+
+        if batch:
+            updated += self.update_batch(batch, clocktower_characters, dry_run)
+            processed += len(batch)
+            self.report_progress(processed, total, updated, start, batch[-1].pk)
 
-        self.stdout.write(f"Updating {total} script versions...")
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS(f"{updated} of {total} script versions would be updated"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Successfully updated {updated} of {total} script versions"))
 
-        for i, script in enumerate(scripts, 1):
-            script.num_townsfolk = count_character(script.content, CharacterType.TOWNSFOLK)
-            script.num_outsiders = count_character(script.content, CharacterType.OUTSIDER)
-            script.num_minions = count_character(script.content, CharacterType.MINION)
-            script.num_demons = count_character(script.content, CharacterType.DEMON)
-            script.num_fabled = count_character(script.content, CharacterType.FABLED)
-            script.num_loric = count_character(script.content, CharacterType.LORIC)
-            script.num_travellers = count_character(script.content, CharacterType.TRAVELLER)
-            script.save()
+    def update_batch(self, batch, clocktower_characters, dry_run) -> int:
+        homebrew_characters = get_scripts_homebrew_characters(
+            [script.content for script in batch], clocktower_characters
+        )
+        changed = []
+        for script in batch:
+            character_counts = count_characters_by_type(script.content, clocktower_characters, homebrew_characters)
+            is_changed = False
+            for field, character_type in COUNT_FIELDS.items():
+                if getattr(script, field) != character_counts[character_type]:
+                    setattr(script, field, character_counts[character_type])
+                    is_changed = True
+            if is_changed:
+                changed.append(script)
+                if dry_run:
+                    self.stdout.write(f"  {script.pk}: {', '.join(f'{f}={getattr(script, f)}' for f in COUNT_FIELDS)}")
 
-            if i % 100 == 0:
-                self.stdout.write(f"Progress: {i}/{total}")
+        if not dry_run:
+            if changed:
+                ScriptVersion.plain_objects.bulk_update(changed, list(COUNT_FIELDS))
+            update_script_version_characters(batch)
+        return len(changed)
 
-        self.stdout.write(self.style.SUCCESS(f"Successfully updated {total} script versions"))
+    def report_progress(self, processed, total, updated, start, last_pk):
+        elapsed = time.perf_counter() - start
+        rate = processed / elapsed if elapsed else 0
+        self.stdout.write(
+            f"Progress: {processed}/{total} ({updated} updated, {rate:.0f} scripts/s, up to pk {last_pk})"
+        )
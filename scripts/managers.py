@@ -7,8 +7,9 @@ class ScriptViewManager(models.Manager):
             super(ScriptViewManager, self)
             .get_queryset()
             .annotate(
-                score=models.Count("script__votes", distinct=True),
-                num_favs=models.Count("script__favourites", distinct=True),
+                score=models.F("script__num_likes"),
+                num_favs=models.F("script__num_favourites"),
+                num_comments=models.F("script__num_comments"),
             )
         )
         return qs
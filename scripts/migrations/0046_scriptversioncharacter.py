@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_script_version_characters(apps, _):
+    ClocktowerCharacter = apps.get_model("scripts", "clocktowercharacter")
+    HomebrewCharacter = apps.get_model("scripts", "homebrewcharacter")
+    ScriptVersion = apps.get_model("scripts", "scriptversion")
+    ScriptVersionCharacter = apps.get_model("scripts", "scriptversioncharacter")
+
+    character_types = dict(HomebrewCharacter.objects.values_list("character_id", "character_type"))
+    character_types.update(ClocktowerCharacter.objects.values_list("character_id", "character_type"))
+
+    rows = []
+    for pk, content in ScriptVersion.objects.values_list("pk", "content").iterator(chunk_size=1000):
+        position = 0
+        for item in content:
+            character_id = item if isinstance(item, str) else item.get("id", "")
+            # IDs longer than the column can't match any known character, so they're not indexed.
+            if not character_id or character_id == "_meta" or len(character_id) > 50:
+                continue
+            rows.append(
+                ScriptVersionCharacter(
+                    script_version_id=pk,
+                    character_id=character_id,
+                    character_type=character_types.get(character_id, "Unknown"),
+                    position=position,
+                )
+            )
+            position += 1
+        if len(rows) >= 5000:
+            ScriptVersionCharacter.objects.bulk_create(rows)
+            rows = []
+    ScriptVersionCharacter.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scripts', '0045_alter_scripttag_style'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScriptVersionCharacter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('character_id', models.CharField(max_length=50)),
+                ('character_type', models.CharField(choices=[('Townsfolk', 'Townsfolk'), ('Outsider', 'Outsider'), ('Minion', 'Minion'), ('Demon', 'Demon'), ('Traveller', 'Traveller'), ('Fabled', 'Fabled'), ('Loric', 'Loric'), ('Unknown', 'Unknown')], default='Unknown', max_length=30)),
+                ('position', models.IntegerField()),
+                ('script_version', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='characters', to='scripts.scriptversion')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['character_id', 'script_version'], name='svc_character_idx'), models.Index(fields=['character_type'], name='svc_character_type_idx')],
+                'constraints': [models.UniqueConstraint(fields=('script_version', 'position'), name='svc_script_version_position')],
+            },
+        ),
+        migrations.RunPython(
+            populate_script_version_characters,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
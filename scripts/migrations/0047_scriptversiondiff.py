@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scripts', '0046_scriptversioncharacter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScriptVersionDiff',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('additions', models.JSONField(default=list)),
+                ('deletions', models.JSONField(default=list)),
+                ('changes', models.JSONField(default=list)),
+                ('previous_version', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='scripts.scriptversion')),
+                ('script_version', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='diff', to='scripts.scriptversion')),
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scripts', '0047_scriptversiondiff'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorldCupStatistic',
+            fields=[
+                ('character', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='world_cup_statistic', serialize=False, to='scripts.clocktowercharacter')),
+                ('additions', models.IntegerField(default=0)),
+                ('deletions', models.IntegerField(default=0)),
+            ],
+        ),
+    ]
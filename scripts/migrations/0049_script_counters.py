@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:54
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_related(model, script_field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{script_field: OuterRef("pk")})
+            .order_by()
+            .values(script_field)
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        0,
+    )
+
+
+def backfill_counters(apps, _):
+    Script = apps.get_model("scripts", "script")
+    Vote = apps.get_model("scripts", "vote")
+    Favourite = apps.get_model("scripts", "favourite")
+    Comment = apps.get_model("scripts", "comment")
+
+    Script.objects.update(
+        num_likes=count_related(Vote, "parent"),
+        num_favourites=count_related(Favourite, "parent"),
+        num_comments=count_related(Comment, "script"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scripts', '0048_worldcupstatistic'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='script',
+            name='num_comments',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='script',
+            name='num_favourites',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='script',
+            name='num_likes',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(
+            backfill_counters,
+            reverse_code=migrations.RunPython.noop,  # The fields are removed when reversing
+        ),
+        migrations.AddIndex(
+            model_name='script',
+            index=models.Index(fields=['num_likes'], name='script_num_likes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='script',
+            index=models.Index(fields=['num_favourites'], name='script_num_favourites_idx'),
+        ),
+    ]
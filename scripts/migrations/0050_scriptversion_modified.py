@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scripts', '0049_script_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scriptversion',
+            name='modified',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='scriptversion',
+            index=models.Index(fields=['modified'], name='sv_modified_idx'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+from collections import Counter
+
+from django.db import migrations
+
+WORLD_CUP_TAG_PK = 3
+
+
+def get_character_ids(content):
+    return [item["id"] for item in content if item.get("id", "_meta") != "_meta"]
+
+
+def get_diff_ids(previous_content, content):
+    """
+    Returns the character IDs added and removed between two versions of a script, as
+    script_json.get_json_diff did when this migration was written.
+    """
+    previous_ids = get_character_ids(previous_content)
+    ids = get_character_ids(content)
+    previous_id_set = set(previous_ids)
+    id_set = set(ids)
+    return {
+        "additions": [character_id for character_id in ids if character_id not in previous_id_set],
+        "deletions": [character_id for character_id in previous_ids if character_id not in id_set],
+    }
+
+
+def backfill_world_cup_statistics(apps, _):
+    ClocktowerCharacter = apps.get_model("scripts", "clocktowercharacter")
+    ScriptVersion = apps.get_model("scripts", "scriptversion")
+    WorldCupStatistic = apps.get_model("scripts", "worldcupstatistic")
+
+    script_ids = set(
+        ScriptVersion.objects.filter(tags=WORLD_CUP_TAG_PK, latest=True).values_list("script_id", flat=True)
+    )
+    additions = Counter()
+    deletions = Counter()
+    for script_id in script_ids:
+        contents = list(
+            ScriptVersion.objects.filter(script_id=script_id).order_by("version").values_list("content", flat=True)
+        )
+        for previous_content, content in zip(contents, contents[1:]):
+            diff_ids = get_diff_ids(previous_content, content)
+            additions.update(diff_ids["additions"])
+            deletions.update(diff_ids["deletions"])
+
+    character_ids = ClocktowerCharacter.objects.filter(
+        character_id__in=set(additions).union(deletions)
+    ).values_list("character_id", flat=True)
+    WorldCupStatistic.objects.all().delete()
+    WorldCupStatistic.objects.bulk_create(
+        [
+            WorldCupStatistic(
+                character_id=character_id,
+                additions=additions[character_id],
+                deletions=deletions[character_id],
+            )
+            for character_id in character_ids
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scripts', '0050_scriptversion_modified'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            backfill_world_cup_statistics,
+            reverse_code=migrations.RunPython.noop,  # The statistics are rebuilt when migrating forward again
+        ),
+    ]
@@ -0,0 +1,106 @@
+import hashlib
+import random
+from array import array
+from collections import Counter
+from collections.abc import Iterable
+
+# A Mersenne prime larger than any 32-bit hash, used for the universal hash family.
+_PRIME = (1 << 61) - 1
+
+
+class MinHashLSH:
+    """
+    Approximate nearest neighbour index over the character sets of scripts.
+
+    Each script's character set is reduced to a MinHash signature, the probability of two
+    signatures agreeing at any position being the Jaccard similarity of the two sets. The
+    signature is split into bands and scripts sharing any band are candidates for one
+    another, so scripts with many characters in common are found without comparing against
+    the whole catalogue. More bands finds more distant scripts at the cost of more candidates.
+
+    Only a hash of each band is kept rather than the signature itself, which keeps each script
+    to a couple of kilobytes rather than the eight or so a signature takes.
+    """
+
+    def __init__(self, num_permutations: int = 128, bands: int = 32, seed: int = 1):
+        if num_permutations % bands:
+            raise ValueError("The number of permutations must be divisible by the number of bands")
+        rng = random.Random(seed)
+        self.num_permutations = num_permutations
+        self.bands = bands
+        self.rows = num_permutations // bands
+        self._coefficients = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_permutations)]
+        # The hashes fit in a signed 64-bit int as they're less than the prime.
+        self._character_hashes: dict[str, array] = {}
+        # Most bands are unique to one script, so a bucket holds just the key until it is shared.
+        self._buckets: list[dict[int, int | set[int]]] = [{} for _ in range(bands)]
+        self._band_hashes: dict[int, array] = {}
+
+    def __len__(self):
+        return len(self._band_hashes)
+
+    def _hash_character(self, character_id: str) -> array:
+        hashes = self._character_hashes.get(character_id)
+        if hashes is None:
+            value = int.from_bytes(hashlib.blake2b(character_id.encode("utf-8"), digest_size=8).digest(), "little")
+            hashes = array("q", [(a * value + b) % _PRIME for a, b in self._coefficients])
+            self._character_hashes[character_id] = hashes
+        return hashes
+
+    def signature(self, characters: Iterable[str]) -> tuple[int, ...]:
+        """
+        Returns the MinHash signature of a set of characters, or an empty tuple for an empty set.
+        """
+        hashes = [self._hash_character(character_id) for character_id in set(characters)]
+        if not hashes:
+            return ()
+        return tuple(map(min, *hashes)) if len(hashes) > 1 else tuple(hashes[0])
+
+    def band_hashes(self, characters: Iterable[str]) -> array:
+        """
+        Returns a hash of each band of the MinHash signature of a set of characters.
+        """
+        signature = self.signature(characters)
+        if not signature:
+            return array("q")
+        return array("q", [hash(signature[band * self.rows : (band + 1) * self.rows]) for band in range(self.bands)])
+
+    def add(self, key: int, characters: Iterable[str]) -> None:
+        self.remove(key)
+        band_hashes = self.band_hashes(characters)
+        if not band_hashes:
+            return
+        self._band_hashes[key] = band_hashes
+        for band, band_hash in enumerate(band_hashes):
+            bucket = self._buckets[band].setdefault(band_hash, key)
+            if isinstance(bucket, set):
+                bucket.add(key)
+            elif bucket != key:
+                self._buckets[band][band_hash] = {bucket, key}
+
+    def remove(self, key: int) -> None:
+        band_hashes = self._band_hashes.pop(key, None)
+        if band_hashes is None:
+            return
+        for band, band_hash in enumerate(band_hashes):
+            bucket = self._buckets[band][band_hash]
+            if not isinstance(bucket, set):
+                del self._buckets[band][band_hash]
+                continue
+            bucket.discard(key)
+            if len(bucket) == 1:
+                self._buckets[band][band_hash] = bucket.pop()
+
+    def candidates(self, characters: Iterable[str]) -> Counter[int]:
+        """
+        Returns the keys of every script sharing at least one band with the set of characters,
+        counting the number of bands each shares.
+        """
+        found = Counter()
+        for band, band_hash in enumerate(self.band_hashes(characters)):
+            bucket = self._buckets[band].get(band_hash)
+            if isinstance(bucket, set):
+                found.update(bucket)
+            elif bucket is not None:
+                found[bucket] += 1
+        return found
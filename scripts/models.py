@@ -88,6 +88,11 @@ class Script(models.Model):
     name = models.CharField(max_length=constants.MAX_SCRIPT_NAME_LENGTH)
     owner = models.ForeignKey(User, blank=True, null=True, on_delete=models.SET_NULL, related_name="+")
     num_downloads = models.IntegerField(default=0)
+    # Denormalised counts of the votes, favourites and comments on the script, kept up to date by
+    # scripts.counters so listings can sort by them without aggregating.
+    num_likes = models.IntegerField(default=0)
+    num_favourites = models.IntegerField(default=0)
+    num_comments = models.IntegerField(default=0)
 
     def __str__(self):
         return f"{self.pk}. {self.name}"
@@ -99,6 +104,8 @@ class Script(models.Model):
         indexes = [
             models.Index(fields=["name"], name="script_name_idx"),
             models.Index(fields=["owner"], name="script_owner_idx"),
+            models.Index(fields=["num_likes"], name="script_num_likes_idx"),
+            models.Index(fields=["num_favourites"], name="script_num_favourites_idx"),
         ]
 
 
@@ -123,6 +130,7 @@ class ScriptVersion(models.Model):
     version = VersionField()
     content = models.JSONField()
     created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
     notes = models.TextField(blank=True)
     num_townsfolk = models.IntegerField()
     num_outsiders = models.IntegerField()
@@ -160,9 +168,50 @@ class ScriptVersion(models.Model):
             models.Index(fields=["num_demons"], name="sv_num_demons_idx"),
             models.Index(fields=["script", "version"], name="sv_script_and_version_idx"),
             models.Index(fields=["latest", "homebrewiness"], name="sv_latest_and_homebrew_idx"),
+            models.Index(fields=["modified"], name="sv_modified_idx"),
         ]
 
 
+class ScriptVersionCharacter(models.Model):
+    """
+    A character on a script version, denormalised from the JSON content so that scripts can be
+    filtered by character with an indexed join rather than by searching the content.
+    """
+
+    script_version = models.ForeignKey(ScriptVersion, on_delete=models.CASCADE, related_name="characters")
+    character_id = models.CharField(max_length=constants.MAX_CHARACTER_ID_LENGTH)
+    character_type = models.CharField(max_length=30, choices=CharacterType.choices, default=CharacterType.UNKNOWN)
+    position = models.IntegerField()
+
+    def __str__(self):
+        return f"{self.script_version_id}. {self.character_id}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["script_version", "position"], name="svc_script_version_position")
+        ]
+        indexes = [
+            models.Index(fields=["character_id", "script_version"], name="svc_character_idx"),
+            models.Index(fields=["character_type"], name="svc_character_type_idx"),
+        ]
+
+
+class ScriptVersionDiff(models.Model):
+    """
+    The character IDs added, removed and with changed abilities in a script version compared with
+    the previous version of the script, stored so the version history doesn't need to diff the JSON.
+    """
+
+    script_version = models.OneToOneField(ScriptVersion, on_delete=models.CASCADE, related_name="diff")
+    previous_version = models.ForeignKey(ScriptVersion, on_delete=models.SET_NULL, null=True, related_name="+")
+    additions = models.JSONField(default=list)
+    deletions = models.JSONField(default=list)
+    changes = models.JSONField(default=list)
+
+    def __str__(self):
+        return f"{self.previous_version_id} -> {self.script_version_id}"
+
+
 class Comment(models.Model):
     """
     Model for commenting on scripts. Comments are only allowed by authenticated users.
@@ -332,6 +381,22 @@ class ClocktowerCharacter(BaseCharacter):
         ]
 
 
+class WorldCupStatistic(models.Model):
+    """
+    The number of times a character has been added to or removed from a World Cup script across its
+    versions, maintained as versions are uploaded so the statistics don't walk every script version.
+    """
+
+    character = models.OneToOneField(
+        ClocktowerCharacter, on_delete=models.CASCADE, primary_key=True, related_name="world_cup_statistic"
+    )
+    additions = models.IntegerField(default=0)
+    deletions = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.character_id}: +{self.additions} -{self.deletions}"
+
+
 class HomebrewCharacter(BaseCharacter):
     """
     Model for characters.
@@ -0,0 +1,216 @@
+import hashlib
+import json as js
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+import requests
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+ROLES_URL = "https://script.bloodontheclocktower.com/data/roles.json"
+REQUEST_TIMEOUT = 10
+RETRY_INTERVAL = 60 * 5
+
+_lock = threading.Lock()
+_role_ids: frozenset = frozenset()
+_snapshot_key: Optional[tuple] = None
+_refresh_thread: Optional[threading.Thread] = None
+_first_load_lock = threading.Lock()
+_first_load_thread: Optional[threading.Thread] = None
+_first_load_failed_at: Optional[float] = None
+
+
+def get_roles_url() -> str:
+    return getattr(settings, "OFFICIAL_ROLES_URL", ROLES_URL)
+
+
+def get_snapshot_path() -> Path:
+    path = getattr(settings, "OFFICIAL_ROLES_PATH", None)
+    if not path:
+        path = Path(tempfile.gettempdir()) / "botc_official_roles.json"
+    return Path(path)
+
+
+def get_refresh_interval() -> int:
+    return getattr(settings, "OFFICIAL_ROLES_REFRESH_INTERVAL", 0)
+
+
+def read_snapshot(path: Optional[Path] = None) -> dict:
+    """
+    Returns the stored snapshot of the official roles, or an empty snapshot if there isn't one.
+    """
+    path = Path(path or get_snapshot_path())
+    try:
+        with open(path, "r") as f:
+            return js.load(f)
+    except (OSError, ValueError):
+        return {"etag": None, "last_modified": None, "role_ids": []}
+
+
+def get_official_role_ids(path: Optional[Path] = None) -> frozenset:
+    """
+    Returns the IDs of the roles known to the official script tool from the on-disk snapshot.
+
+    The snapshot is only re-read when the file changes, and is kept up to date by refresh() from
+    the refresh_official_roles command or the background refresh thread. This never makes a
+    network request. If there's no snapshot yet, e.g. on a fresh deploy, it is fetched in the
+    background and scripts are classified without the official roles until it arrives.
+    """
+    global _role_ids, _snapshot_key
+    path = Path(path or get_snapshot_path())
+    start_background_refresh()
+    try:
+        stat = os.stat(path)
+    except OSError:
+        start_first_load(path)
+        return frozenset()
+
+    # The snapshot is replaced rather than rewritten, so a new inode also means a new snapshot.
+    key = (str(path), stat.st_ino, stat.st_mtime_ns)
+    with _lock:
+        if key != _snapshot_key:
+            _role_ids = frozenset(read_snapshot(path).get("role_ids", []))
+            _snapshot_key = key
+        return _role_ids
+
+
+def start_first_load(path: Optional[Path] = None) -> None:
+    """
+    Fetches the first snapshot of the official roles on a background thread if there isn't one yet.
+    A failed fetch isn't retried for a few minutes.
+    """
+    global _first_load_thread
+    path = Path(path or get_snapshot_path())
+    with _first_load_lock:
+        if path.exists() or (_first_load_thread is not None and _first_load_thread.is_alive()):
+            return
+        if _first_load_failed_at is not None and time.monotonic() - _first_load_failed_at < RETRY_INTERVAL:
+            return
+        _first_load_thread = threading.Thread(
+            target=_load_first_snapshot, args=(path,), name="official-roles-first-load", daemon=True
+        )
+        _first_load_thread.start()
+
+
+def _load_first_snapshot(path: Path) -> None:
+    global _first_load_failed_at
+    try:
+        refresh(path=path)
+    except (requests.RequestException, OSError, ValueError):
+        logger.exception("Failed to fetch the official roles")
+        with _first_load_lock:
+            _first_load_failed_at = time.monotonic()
+
+
+def warm_up() -> None:
+    """
+    Starts fetching the official roles if there's no snapshot yet, and refreshing them in the
+    background, so the first upload doesn't find them missing. Called when the app starts.
+    """
+    start_first_load()
+    start_background_refresh()
+
+
+def refresh(url: Optional[str] = None, path: Optional[Path] = None, force: bool = False) -> bool:
+    """
+    Fetches the official roles and updates the snapshot if they have changed since it was taken.
+
+    HTTP(S) URLs are requested conditionally using the ETag and Last-Modified headers from the
+    previous response. file:// URLs are read directly, which is useful for tests and for
+    environments without access to the script tool.
+
+    Returns whether the snapshot was updated. Network and file errors are raised to the caller.
+    """
+    url = url or get_roles_url()
+    path = Path(path or get_snapshot_path())
+    snapshot = {"etag": None, "last_modified": None, "role_ids": []} if force else read_snapshot(path)
+
+    parsed_url = urlparse(url)
+    if parsed_url.scheme == "file":
+        with open(url2pathname(parsed_url.path), "rb") as f:
+            content = f.read()
+        etag = f'"{hashlib.sha1(content).hexdigest()}"'
+        last_modified = None
+        if etag == snapshot.get("etag"):
+            _touch(path)
+            return False
+    else:
+        headers = {}
+        if snapshot.get("etag"):
+            headers["If-None-Match"] = snapshot["etag"]
+        if snapshot.get("last_modified"):
+            headers["If-Modified-Since"] = snapshot["last_modified"]
+        response = requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        if response.status_code == 304:
+            _touch(path)
+            return False
+        response.raise_for_status()
+        content = response.content
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+
+    role_ids = sorted({role.get("id", "UNKNOWN CHARACTER") for role in js.loads(content)})
+    _write_snapshot(path, {"etag": etag, "last_modified": last_modified, "role_ids": role_ids})
+    return True
+
+
+def _touch(path: Path) -> None:
+    # Record that the snapshot was checked, so other processes don't check it again straight away.
+    if os.path.exists(path):
+        os.utime(path)
+
+
+def _write_snapshot(path: Path, snapshot: dict) -> None:
+    # Write to a temporary file and move it into place so readers never see a partial snapshot.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temporary_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "w") as f:
+            js.dump(snapshot, f)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+def start_background_refresh(interval: Optional[int] = None) -> None:
+    """
+    Starts a daemon thread that refreshes the snapshot whenever it is older than the refresh
+    interval. Does nothing if the interval is 0 or the thread is already running.
+    """
+    global _refresh_thread
+    interval = interval if interval is not None else get_refresh_interval()
+    if not interval:
+        return
+    with _lock:
+        if _refresh_thread is not None and _refresh_thread.is_alive():
+            return
+        _refresh_thread = threading.Thread(
+            target=_refresh_periodically, args=(interval,), name="official-roles-refresh", daemon=True
+        )
+        _refresh_thread.start()
+
+
+def _refresh_periodically(interval: int) -> None:
+    while True:
+        path = get_snapshot_path()
+        try:
+            age = time.time() - os.stat(path).st_mtime
+        except OSError:
+            age = interval
+        if age >= interval:
+            try:
+                refresh(path=path)
+                age = 0
+            except Exception:
+                logger.exception("Failed to refresh the official roles")
+                age = max(interval - RETRY_INTERVAL, 0)
+        time.sleep(interval - age)
@@ -0,0 +1,114 @@
+import base64
+import binascii
+import json as js
+from typing import Optional
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class ScriptPagination(PageNumberPagination):
+    """
+    Page number pagination by default, or keyset pagination when a cursor parameter is given.
+
+    Keyset pages are found by filtering on the sort key of the last row of the previous page rather
+    than by an OFFSET, so every page costs the same however deep into the results it is. Pass an
+    empty cursor for the first page and follow the next links after that. Results are ordered by
+    pk, or by score and then pk, in the direction given by the ordering parameter.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    ordering_query_param = "ordering"
+    # The keys each allowed ordering pages by.
+    keyset_orderings = {
+        "pk": ("pk",),
+        "-pk": ("-pk",),
+        "score": ("score", "pk"),
+        "-score": ("-score", "-pk"),
+    }
+    default_ordering = "-pk"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        ordering = request.query_params.get(self.ordering_query_param, self.default_ordering)
+        self.ordering = self.keyset_orderings.get(ordering, self.keyset_orderings[self.default_ordering])
+        page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request.query_params[self.cursor_query_param])
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(position))
+
+        results = list(queryset[: page_size + 1])
+        self.next_position = None
+        if len(results) > page_size:
+            results = results[:page_size]
+            self.next_position = [getattr(results[-1], key.lstrip("-")) for key in self.ordering]
+        return results
+
+    def get_keyset_filter(self, position: list) -> Q:
+        """
+        Returns a filter for the rows after position, e.g. for ("-score", "-pk") the rows with a
+        lower score, or the same score and a lower pk.
+        """
+        keyset_filter = Q()
+        equal = Q()
+        for key, value in zip(self.ordering, position):
+            field = key.lstrip("-")
+            lookup = "lt" if key.startswith("-") else "gt"
+            keyset_filter |= equal & Q(**{f"{field}__{lookup}": value})
+            equal &= Q(**{field: value})
+        return keyset_filter
+
+    def decode_cursor(self, cursor: str) -> Optional[list]:
+        if not cursor:
+            return None
+        try:
+            position = js.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        except (ValueError, binascii.Error):
+            raise NotFound("Invalid cursor")
+        if (
+            not isinstance(position, list)
+            or len(position) != len(self.ordering)
+            or not all(isinstance(value, int) for value in position)
+        ):
+            raise NotFound("Invalid cursor")
+        return position
+
+    def encode_cursor(self, position: list) -> str:
+        return base64.urlsafe_b64encode(js.dumps(position).encode("ascii")).decode("ascii")
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if self.next_position is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        parameters.append(
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Use keyset pagination, starting after this cursor. Empty for the first page.",
+                "schema": {"type": "string"},
+            }
+        )
+        return parameters
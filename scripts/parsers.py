@@ -0,0 +1,19 @@
+import json as js
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parses newline delimited JSON into a list with an item for each line.
+    """
+
+    media_type = "application/x-ndjson"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", "utf-8")
+        try:
+            return [js.loads(line) for line in stream.read().decode(encoding).splitlines() if line.strip()]
+        except ValueError as e:
+            raise ParseError(f"NDJSON parse error - {e}")
@@ -2,6 +2,7 @@ import gzip
 import json as js
 import base64 as b64
 from scripts import constants
+from dataclasses import dataclass, field
 from typing import List
 from django.core.files.base import File
 from urllib.parse import quote
@@ -29,6 +30,21 @@ def get_metadata_field_from_json(json, field):
     return None
 
 
+def get_character_ids(json) -> List[str]:
+    """
+    Returns the IDs of every character in the script, ignoring the _meta entry.
+    """
+    character_ids = []
+    for item in json:
+        if isinstance(item, str):
+            character_ids.append(item)
+            continue
+        character_id = item.get("id", "")
+        if character_id and character_id != "_meta":
+            character_ids.append(character_id)
+    return character_ids
+
+
 def revert_to_old_format(json):
     old_format_json = []
 
@@ -87,48 +103,53 @@ def get_json_content(data):
     return json
 
 
-# Determine the characters that are in the new JSON but not in the old JSON
-# This
-def get_json_additions(old_json, new_json):
-    for old_id in old_json:
-        if old_id["id"] == "_meta":
-            continue
-        for new_id in new_json:
-            if new_id["id"] == "_meta":
-                continue
+@dataclass
+class JSONDiff:
+    additions: List[dict] = field(default_factory=list)
+    deletions: List[dict] = field(default_factory=list)
+    changes: List[dict] = field(default_factory=list)
 
-            # Check if the IDs are unchanged.
-            # This is imperfect because this will detect a change from an Official
-            # to a Homebrew character of the same name, but we only have the JSON to do this check
-            # and official characters have limited information in the JSON.
-            if old_id["id"] == new_id["id"]:
-                new_json.remove(new_id)
-                continue
 
-    for new_id in new_json:
-        if new_id["id"] == "_meta":
-            new_json.remove(new_id)
-            break
+def get_json_diff(old_json, new_json) -> JSONDiff:
+    """
+    Determines the characters added to, removed from and with changed abilities between two scripts.
 
-    return new_json
+    Characters are matched by ID. This is imperfect because this will detect a change from an Official
+    to a Homebrew character of the same name, but we only have the JSON to do this check and official
+    characters have limited information in the JSON. Neither script is modified.
+    """
+    old_characters = {}
+    for item in old_json:
+        if item.get("id", "_meta") != "_meta":
+            old_characters.setdefault(item["id"], item)
+    new_characters = {}
+    for item in new_json:
+        if item.get("id", "_meta") != "_meta":
+            new_characters.setdefault(item["id"], item)
+
+    diff = JSONDiff()
+    for item in new_json:
+        if item.get("id", "_meta") != "_meta" and item["id"] not in old_characters:
+            diff.additions.append(item)
+    for item in old_json:
+        if item.get("id", "_meta") == "_meta":
+            continue
+        new_item = new_characters.get(item["id"])
+        if new_item is None:
+            diff.deletions.append(item)
+        elif item.get("ability", "UNKNOWN_ABILITY") != new_item.get("ability", "UNKNOWN_ABILITY"):
+            diff.changes.append({"id": item["id"]})
+    return diff
 
 
-# Determine changes to character abilities where the character ID is unchanged
-def get_json_changes(old_json, new_json):
-    changed_json = []
-    for old_id in old_json:
-        if old_id["id"] == "_meta":
-            continue
-        for new_id in new_json:
-            if new_id["id"] == "_meta":
-                continue
+# Determine the characters that are in the new JSON but not in the old JSON
+def get_json_additions(old_json, new_json):
+    return get_json_diff(old_json, new_json).additions
 
-            if old_id["id"] == new_id["id"]:
-                if old_id.get("ability", "UNKNOWN_ABILITY") != new_id.get("ability", "UNKNOWN_ABILITY"):
-                    changed_json.append({"id": new_id["id"]})
-                    continue
 
-    return changed_json
+# Determine changes to character abilities where the character ID is unchanged
+def get_json_changes(old_json, new_json):
+    return get_json_diff(old_json, new_json).changes
 
 
 def get_similarity(json1: List, json2: List, same_type: bool) -> int:
@@ -149,6 +170,16 @@ def get_similarity(json1: List, json2: List, same_type: bool) -> int:
 
     json1_len = len(json1) - json1_metadata_count
     json2_len = len(json2) - json2_metadata_count
+    return get_similarity_score(similarity, json1_len, json2_len, same_type)
+
+
+def get_similarity_score(shared: int, json1_len: int, json2_len: int, same_type: bool) -> int:
+    """
+    Converts the number of characters two scripts share into a percentage similarity.
+
+    Scripts of the same type are compared against the larger script, otherwise against the smaller
+    script (but at least a Teensyville's worth of characters).
+    """
     similarity_max = max(json1_len, json2_len)
     similarity_min = max(min(json1_len, json2_len), constants.STANDARD_TEENSYVILLE_CHARACTER_COUNT)
 
@@ -156,7 +187,7 @@ def get_similarity(json1: List, json2: List, same_type: bool) -> int:
     if similarity_comp == 0:
         return 0
 
-    return round((similarity / similarity_comp) * 100)
+    return round((shared / similarity_comp) * 100)
 
 
 def compress_json(json_data):
@@ -0,0 +1,157 @@
+import json as js
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+import jsonschema
+import jsonschema.exceptions
+import requests
+from django.conf import settings
+
+DEFAULT_SCHEMA_VERSION = "v3.52.0"
+# How long to wait for the schema when it hasn't been pinned and has to be fetched to validate a script.
+FETCH_TIMEOUT = 2
+SCHEMA_URL = (
+    "https://raw.githubusercontent.com/ThePandemoniumInstitute/botc-release/refs/tags/{version}/script-schema.json"
+)
+logger = logging.getLogger(__name__)
+
+_lock = threading.RLock()
+_validators: dict = {}
+
+
+def get_schema_version() -> str:
+    return str(os.environ.get("JSON_SCHEMA_VERSION", DEFAULT_SCHEMA_VERSION))
+
+
+def get_schema_url(version: Optional[str] = None) -> str:
+    return SCHEMA_URL.format(version=version or get_schema_version())
+
+
+def get_schema_dir() -> Path:
+    return Path(getattr(settings, "JSON_SCHEMA_DIR", Path(__file__).resolve().parent / "schemas"))
+
+
+def get_schema_path(version: str, schema_dir: Optional[Path] = None) -> Path:
+    return Path(schema_dir or get_schema_dir()) / f"script-schema-{version}.json"
+
+
+def fetch_schema(url: str, timeout: int) -> dict:
+    """
+    Downloads the script schema from url, which may be a file:// URL.
+
+    Network errors and invalid JSON are raised to the caller.
+    """
+    parsed_url = urlparse(url)
+    if parsed_url.scheme == "file":
+        with open(url2pathname(parsed_url.path), "rb") as f:
+            content = f.read()
+    else:
+        response = requests.get(url, timeout=timeout)
+        response.raise_for_status()
+        content = response.content
+    return js.loads(content)
+
+
+def write_schema(schema: dict, path: Path) -> None:
+    # Write to a temporary file and move it into place so readers never see a partial schema.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temporary_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "w") as f:
+            js.dump(schema, f, indent=2)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+def pin_schema(
+    version: Optional[str] = None, url: Optional[str] = None, schema_dir: Optional[Path] = None, timeout: int = 10
+) -> Path:
+    """
+    Downloads a version of the script schema and stores it on disk, replacing any pinned copy.
+
+    file:// URLs are read directly. Network errors and invalid JSON are raised to the caller.
+    """
+    version = version or get_schema_version()
+    schema = fetch_schema(url or get_schema_url(version), timeout)
+    path = get_schema_path(version, schema_dir)
+    write_schema(schema, path)
+
+    with _lock:
+        _validators.pop((version, str(path.parent)), None)
+    return path
+
+
+def compile_schema(schema):
+    """
+    Returns a validator for the script schema, or None if the schema is invalid.
+    """
+    try:
+        # Update the additionalProperties field on the Script Character object. The app doesn't enforce this
+        # and bloodstar adds additional properties here.
+        schema["items"]["oneOf"][0]["additionalProperties"] = True
+        validator_class = jsonschema.validators.validator_for(schema)
+        validator_class.check_schema(schema)
+        return validator_class(schema)
+    except (KeyError, TypeError, IndexError, jsonschema.exceptions.SchemaError):
+        # The schema is invalid, just continue and assume scripts are valid
+        return None
+
+
+def get_validator(version: Optional[str] = None, schema_dir: Optional[Path] = None):
+    """
+    Returns the compiled validator for a version of the script schema, or None if the schema is
+    invalid or can't be fetched, in which case scripts should be assumed to be valid.
+
+    Validators are compiled once per process from the pinned copy of the schema in the repository.
+    If the schema hasn't been pinned it is fetched as it used to be on every upload, and pinned
+    so later uploads don't have to, logging an error as uploads are unvalidated until it has been.
+    """
+    version = version or get_schema_version()
+    schema_dir = Path(schema_dir or get_schema_dir())
+    key = (version, str(schema_dir))
+    validator = _validators.get(key)
+    if validator is not None:
+        return validator
+
+    with _lock:
+        if key in _validators:
+            return _validators[key]
+        path = get_schema_path(version, schema_dir)
+        if path.exists():
+            try:
+                with open(path, "r") as f:
+                    schema = js.load(f)
+            except (OSError, ValueError):
+                schema = None
+        else:
+            logger.error("Script schema %s hasn't been pinned to %s, run the pin_script_schema command", version, path)
+            try:
+                schema = fetch_schema(get_schema_url(version), FETCH_TIMEOUT)
+            except (requests.RequestException, OSError, ValueError) as e:
+                # Try again next time rather than remembering the failure.
+                logger.error("Couldn't fetch script schema %s, scripts won't be validated: %s", version, e)
+                return None
+            try:
+                write_schema(schema, path)
+            except OSError as e:
+                logger.warning("Couldn't pin script schema %s to %s: %s", version, path, e)
+
+        validator = compile_schema(schema) if schema is not None else None
+        _validators[key] = validator
+        return validator
+
+
+def warm_up() -> None:
+    """
+    Compiles the validator for the configured schema version, fetching the schema if it hasn't been
+    pinned, so the first upload doesn't have to. Called when the app starts.
+    """
+    get_validator()
@@ -1,7 +1,19 @@
-from rest_framework import serializers
+from typing import Optional
+
+from rest_framework import permissions, serializers
 from scripts import models, constants, script_json
 
 
+def get_requested_fields(request) -> Optional[set]:
+    """
+    Returns the fields asked for by a comma separated fields query parameter, or None if every
+    field should be returned. Fields are only left out of reads, never of the data being written.
+    """
+    if request is None or request.method not in permissions.SAFE_METHODS or not request.query_params.get("fields"):
+        return None
+    return {field.strip() for field in request.query_params["fields"].split(",") if field.strip()}
+
+
 # Serializers define the API representation.
 class ScriptSerializer(serializers.ModelSerializer):
     name = serializers.CharField(source="script.name")
@@ -12,6 +24,17 @@ class ScriptSerializer(serializers.ModelSerializer):
         model = models.ScriptVersion
         fields = ["pk", "script_id", "name", "version", "script_type", "author", "content", "score"]
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Only include the fields asked for, so bulk consumers can leave out the content.
+        requested_fields = get_requested_fields(self.context.get("request"))
+        if requested_fields is not None:
+            unknown_fields = requested_fields - set(self.fields)
+            if unknown_fields:
+                raise serializers.ValidationError({"fields": f"Unknown fields: {', '.join(sorted(unknown_fields))}"})
+            for field in set(self.fields) - requested_fields:
+                self.fields.pop(field)
+
 
 class TranslationSerializer(serializers.ModelSerializer):
     class Meta:
@@ -0,0 +1,21 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from scripts import cache, models
+
+
+@receiver(post_save, sender=models.ClocktowerCharacter)
+@receiver(post_delete, sender=models.ClocktowerCharacter)
+def character_changed(**kwargs):
+    # Characters edited individually, e.g. in the admin, are reloaded by every worker once saved.
+    transaction.on_commit(cache.bump_character_catalogue_version)
+
+
+@receiver(post_save, sender=models.HomebrewCharacter)
+def homebrew_character_saved(instance, **kwargs):
+    cache.update_homebrew_characters([instance])
+
+
+@receiver(post_delete, sender=models.HomebrewCharacter)
+def homebrew_character_deleted(instance, **kwargs):
+    cache.remove_homebrew_characters([instance.character_id])
@@ -0,0 +1,95 @@
+import math
+import random
+import time
+import uuid
+from typing import Any, Callable, NamedTuple, Optional
+
+# How long a rebuild may hold the lock before others give up waiting and rebuild themselves.
+LOCK_TIMEOUT = 30
+# How often requests waiting for a rebuild check whether it has finished.
+POLL_INTERVAL = 0.05
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    # How long the value took to compute, in seconds.
+    delta: float
+    # When the value expires, as a Unix timestamp.
+    expires: float
+
+
+def should_refresh(
+    entry: CacheEntry, beta: float = 1.0, now: Optional[float] = None, rand: Optional[float] = None
+) -> bool:
+    """
+    Decides whether to recompute a value before it expires, with a chance that rises as it gets
+    closer to expiring and the longer it takes to compute, so a hot value is usually recomputed by a
+    single request before it expires rather than by every request once it has. A higher beta
+    recomputes earlier.
+    """
+    if now is None:
+        now = time.time()
+    if rand is None:
+        rand = random.random()
+    # 1 - random() is never 0, so the log is always defined.
+    return now - entry.delta * beta * math.log(1 - rand) >= entry.expires
+
+
+def get_or_compute(
+    cache,
+    key: str,
+    compute: Callable[[], Any],
+    timeout: int,
+    force: bool = False,
+    beta: float = 1.0,
+    lock_timeout: int = LOCK_TIMEOUT,
+    poll_interval: float = POLL_INTERVAL,
+) -> Any:
+    """
+    Returns the value cached under key, computing and caching it with compute if it's missing.
+
+    However many requests miss at once, only the one that takes the lock computes the value while
+    the others wait for it. Values may also be recomputed early by a single request, see
+    should_refresh, while the others carry on using the cached value. Pass force to recompute the
+    value regardless.
+    """
+    lock_key = f"{key}:lock"
+    deadline = time.monotonic() + lock_timeout
+    while True:
+        entry = None if force else cache.get(key)
+        if not isinstance(entry, CacheEntry):
+            entry = None
+        if entry is not None and not should_refresh(entry, beta):
+            return entry.value
+
+        token = uuid.uuid4().hex
+        if cache.add(lock_key, token, timeout=lock_timeout):
+            try:
+                # Another request may have cached the value and released the lock since it was
+                # checked above.
+                latest = None if force else cache.get(key)
+                if isinstance(latest, CacheEntry) and latest != entry:
+                    return latest.value
+                return _compute(cache, key, compute, timeout)
+            finally:
+                # The lock may have expired and been taken by another request while computing, in
+                # which case it's theirs to release.
+                if cache.get(lock_key) == token:
+                    cache.delete(lock_key)
+
+        # Another request is computing the value.
+        if entry is not None:
+            return entry.value
+        if time.monotonic() >= deadline:
+            # Whoever took the lock has taken too long, so don't wait for them any longer.
+            return _compute(cache, key, compute, timeout)
+        force = False
+        time.sleep(poll_interval)
+
+
+def _compute(cache, key: str, compute: Callable[[], Any], timeout: int) -> Any:
+    start = time.time()
+    value = compute()
+    end = time.time()
+    cache.set(key, CacheEntry(value, end - start, end + timeout), timeout=timeout)
+    return value
@@ -1,6 +1,8 @@
 from django import template
 from django.utils.safestring import mark_safe
-from scripts import models, cache, script_json
+from scripts import models, script_json
+from scripts.character_resolver import get_character_resolver
+from scripts.user_scripts import UserScriptLookup, get_user_script_lookup
 from babel.core import Locale, UnknownLocaleError
 
 register = template.Library()
@@ -8,24 +10,21 @@ register = template.Library()
 
 @register.simple_tag(takes_context=True)
 def user_voted(context, script_version):
-    user = context["user"]
-    if user.votes.filter(parent=script_version.script).exists():
+    if get_user_script_lookup(context).has_voted(script_version):
         return "btn-danger"
     return "btn-success"
 
 
 @register.simple_tag(takes_context=True)
 def user_voted_icon(context, script_version):
-    user = context["user"]
-    if user.votes.filter(parent=script_version.script).exists():
+    if get_user_script_lookup(context).has_voted(script_version):
         return "hand-thumbs-down-fill"
     return "hand-thumbs-up-fill"
 
 
 @register.simple_tag(takes_context=True)
 def user_favourite(context, script_version):
-    user = context["user"]
-    if user.favourites.filter(parent=script_version.script).exists():
+    if get_user_script_lookup(context).has_favourited(script_version):
         return "star-fill"
     return "star"
 
@@ -38,23 +37,24 @@ def script_has_tag(tag, initial):
     return False
 
 
-@register.simple_tag()
-def script_in_collection(collection, script_version):
-    if script_version in collection.scripts.all():
-        return True
-    return False
+@register.simple_tag(takes_context=True)
+def script_in_collection(context, collection, script_version):
+    lookup = get_user_script_lookup(context)
+    if collection.owner_id != lookup.user.pk:
+        return collection.scripts.filter(pk=script_version.pk).exists()
+    return lookup.in_collection(collection, script_version)
 
 
-@register.simple_tag()
-def script_not_in_user_collection(user, script_version):
-    for collection in user.collections.all():
-        if script_version not in collection.scripts.all():
-            return True
-    return False
+@register.simple_tag(takes_context=True)
+def script_not_in_user_collection(context, user, script_version):
+    lookup = get_user_script_lookup(context)
+    if lookup.user != user:
+        lookup = UserScriptLookup(user)
+    return not lookup.in_all_collections(script_version)
 
 
-@register.simple_tag()
-def get_characters(script_version):
+@register.simple_tag(takes_context=True)
+def get_characters(context, script_version):
     type_order = [
         models.CharacterType.TOWNSFOLK,
         models.CharacterType.OUTSIDER,
@@ -67,14 +67,13 @@ def get_characters(script_version):
     ]
     characters_by_type = {t: [] for t in type_order}
 
-    clocktower_characters = cache.get_clocktower_characters()
-    homebrew_characters = cache.get_homebrew_characters()
-
+    resolver = get_character_resolver(context)
+    resolver.prefetch(script_version.content)
     for character in script_version.content:
         char_id = character.get("id", "_meta")
         if char_id == "_meta":
             continue
-        char_obj = clocktower_characters.get(char_id) or homebrew_characters.get(char_id)
+        char_obj = resolver.get(char_id)
         if char_obj:
             char_name = char_obj.character_name
             char_type = char_obj.character_type
@@ -113,37 +112,21 @@ def get_colour_from_character_type(character_type):
             return "style=color:#000000"
 
 
-@register.simple_tag()
-def character_colourisation(character_id):
-    clocktower_characters = cache.get_clocktower_characters()
-    character = clocktower_characters.get(character_id)
-    if character:
-        return get_colour_from_character_type(character.character_type)
-
-    homebrew_characters = cache.get_homebrew_characters()
-    character = homebrew_characters.get(character_id)
+@register.simple_tag(takes_context=True)
+def character_colourisation(context, character_id):
+    character = get_character_resolver(context).get(character_id)
     if character:
         return get_colour_from_character_type(character.character_type)
     return "style=color:#000000"
 
 
-@register.simple_tag()
-def character_type_change(content, counter):
+@register.simple_tag(takes_context=True)
+def character_type_change(context, content, counter):
     if counter > 0:
-        prev_character_id = content[counter - 1].get("id", None)
-        curr_character_id = content[counter].get("id", None)
-
-        clocktower_characters = cache.get_clocktower_characters()
-
-        prev_character = clocktower_characters.get(prev_character_id)
-        curr_character = clocktower_characters.get(curr_character_id)
-
-        if not prev_character or not curr_character:
-            homebrew_characters = cache.get_homebrew_characters()
-            if not prev_character:
-                prev_character = homebrew_characters.get(prev_character_id)
-            if not curr_character:
-                curr_character = homebrew_characters.get(curr_character_id)
+        resolver = get_character_resolver(context)
+        resolver.prefetch(content)
+        prev_character = resolver.get(content[counter - 1].get("id", None))
+        curr_character = resolver.get(content[counter].get("id", None))
 
         if not prev_character or not curr_character:
             return False
@@ -154,18 +137,11 @@ def character_type_change(content, counter):
     return False
 
 
-@register.simple_tag()
-def convert_id_to_friendly_text(character_id):
-    clocktower_characters = cache.get_clocktower_characters()
-    text = clocktower_characters.get(character_id)
-    if text:
-        return text.character_name
-
-    homebrew_characters = cache.get_homebrew_characters()
-    text = homebrew_characters.get(character_id)
-    if text:
-        return text.character_name
-
+@register.simple_tag(takes_context=True)
+def convert_id_to_friendly_text(context, character_id):
+    character = get_character_resolver(context).get(character_id)
+    if character:
+        return character.character_name
     return character_id
 
 
@@ -19,6 +19,7 @@ urlpatterns = [
     path("api/", include(router.urls)),
     path("api/characters", api_views.CharactersAPI.as_view()),
     path("api/statistics", api_views.StatisticsAPI.as_view()),
+    path("api/export", api_views.ExportAPI.as_view()),
     path("api/translations/<str:language>/<str:character_id>/", translation_detail),
     path("api/translate/<int:script_version>/<str:language>", translate),
     path("collections", views.CollectionListView.as_view()),
@@ -0,0 +1,71 @@
+from collections import defaultdict
+from functools import cached_property
+
+from django.contrib.auth.models import AnonymousUser, User
+
+from scripts import models
+
+
+class UserScriptLookup:
+    """
+    The scripts a user has voted for, favourited or added to their collections, loaded at most
+    once per request so that rendering a page of scripts doesn't query for every row.
+    """
+
+    def __init__(self, user: User | AnonymousUser):
+        self.user = user
+
+    @cached_property
+    def voted_script_ids(self) -> frozenset[int]:
+        if not self.user.is_authenticated:
+            return frozenset()
+        return frozenset(models.Vote.objects.filter(user=self.user).values_list("parent_id", flat=True))
+
+    @cached_property
+    def favourite_script_ids(self) -> frozenset[int]:
+        if not self.user.is_authenticated:
+            return frozenset()
+        return frozenset(models.Favourite.objects.filter(user=self.user).values_list("parent_id", flat=True))
+
+    @cached_property
+    def collections(self) -> list[models.Collection]:
+        if not self.user.is_authenticated:
+            return []
+        return list(models.Collection.objects.filter(owner=self.user))
+
+    @cached_property
+    def script_version_collection_ids(self) -> dict[int, set[int]]:
+        """
+        The pks of the user's collections containing each script version, loaded in one query.
+        """
+        script_version_collection_ids = defaultdict(set)
+        if self.user.is_authenticated:
+            memberships = models.Collection.scripts.through.objects.filter(collection__owner=self.user).values_list(
+                "scriptversion_id", "collection_id"
+            )
+            for script_version_pk, collection_pk in memberships:
+                script_version_collection_ids[script_version_pk].add(collection_pk)
+        return script_version_collection_ids
+
+    def has_voted(self, script_version: models.ScriptVersion) -> bool:
+        return script_version.script_id in self.voted_script_ids
+
+    def has_favourited(self, script_version: models.ScriptVersion) -> bool:
+        return script_version.script_id in self.favourite_script_ids
+
+    def in_collection(self, collection: models.Collection, script_version: models.ScriptVersion) -> bool:
+        return collection.pk in self.script_version_collection_ids.get(script_version.pk, ())
+
+    def in_all_collections(self, script_version: models.ScriptVersion) -> bool:
+        return len(self.script_version_collection_ids.get(script_version.pk, ())) == len(self.collections)
+
+
+def get_user_script_lookup(context) -> UserScriptLookup:
+    """
+    Returns the lookup the user_scripts context processor added to a template context, or a new one
+    for the context's user if the template is rendered without it.
+    """
+    lookup = context.get("user_scripts")
+    if lookup is None:
+        lookup = UserScriptLookup(context["user"])
+    return lookup
@@ -0,0 +1,159 @@
+from collections.abc import Iterable
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Now
+
+from scripts import models, script_json
+
+
+def get_diff_ids(previous_content, content) -> dict:
+    """
+    Returns the character IDs added, removed and with changed abilities between two versions of a script.
+    """
+    diff = script_json.get_json_diff(previous_content, content)
+    return {
+        "additions": [item["id"] for item in diff.additions],
+        "deletions": [item["id"] for item in diff.deletions],
+        "changes": [item["id"] for item in diff.changes],
+    }
+
+
+def update_version_diffs(script: models.Script, changed: Iterable[int] = ()) -> int:
+    """
+    Brings the stored diffs between adjacent versions of a script up to date, e.g. after a version
+    has been uploaded or deleted. Only the diffs whose previous version has changed, or which involve
+    one of the changed script versions, are recomputed.
+
+    Returns the number of diffs created or updated.
+    """
+    pks = list(
+        models.ScriptVersion.plain_objects.filter(script=script).order_by("version").values_list("pk", flat=True)
+    )
+    expected = dict(zip(pks[1:], pks))
+    existing = dict(
+        models.ScriptVersionDiff.objects.filter(script_version__script=script).values_list(
+            "script_version_id", "previous_version_id"
+        )
+    )
+    changed = set(changed)
+    stale = [
+        pk
+        for pk, previous_pk in expected.items()
+        if existing.get(pk) != previous_pk or pk in changed or previous_pk in changed
+    ]
+
+    with transaction.atomic():
+        models.ScriptVersionDiff.objects.filter(
+            script_version_id__in=[pk for pk in existing if pk not in expected]
+        ).delete()
+        if not stale:
+            return 0
+
+        content = dict(
+            models.ScriptVersion.plain_objects.filter(
+                pk__in=set(stale).union(expected[pk] for pk in stale)
+            ).values_list("pk", "content")
+        )
+        models.ScriptVersionDiff.objects.bulk_create(
+            [
+                models.ScriptVersionDiff(
+                    script_version_id=pk,
+                    previous_version_id=expected[pk],
+                    **get_diff_ids(content[expected[pk]], content[pk]),
+                )
+                for pk in stale
+            ],
+            update_conflicts=True,
+            unique_fields=["script_version"],
+            update_fields=["previous_version", "additions", "deletions", "changes"],
+        )
+    return len(stale)
+
+
+def get_version_history(script: models.Script, version) -> dict:
+    """
+    Returns the changes made in each version of a script up to and including the given version,
+    keyed by version. Diffs are read from the ScriptVersionDiff table, with any that haven't
+    been stored yet computed from the JSON.
+    """
+    script_versions = list(
+        models.ScriptVersion.plain_objects.filter(script=script, version__lte=version)
+        .order_by("-version")
+        .values_list("pk", "version")
+    )
+    stored_diffs = models.ScriptVersionDiff.objects.filter(
+        script_version_id__in=[pk for pk, _ in script_versions]
+    ).in_bulk(field_name="script_version_id")
+
+    pairs = list(zip(script_versions, script_versions[1:]))
+    missing = [
+        (pk, previous_pk)
+        for (pk, _), (previous_pk, _) in pairs
+        if pk not in stored_diffs or stored_diffs[pk].previous_version_id != previous_pk
+    ]
+    content = {}
+    if missing:
+        content = dict(
+            models.ScriptVersion.plain_objects.filter(pk__in={pk for pair in missing for pk in pair}).values_list(
+                "pk", "content"
+            )
+        )
+
+    history = {}
+    for (pk, script_version), (previous_pk, previous_version) in pairs:
+        diff = stored_diffs.get(pk)
+        if diff is not None and diff.previous_version_id == previous_pk:
+            diff_ids = {"additions": diff.additions, "deletions": diff.deletions, "changes": diff.changes}
+        else:
+            diff_ids = get_diff_ids(content[previous_pk], content[pk])
+        history[script_version] = {
+            "additions": [{"id": character_id} for character_id in diff_ids["additions"]],
+            "deletions": [{"id": character_id} for character_id in diff_ids["deletions"]],
+            "changes": [{"id": character_id} for character_id in diff_ids["changes"]],
+            "previous_version": previous_version,
+        }
+    return history
+
+
+def update_latest_flags(scripts: Optional[Iterable[models.Script]] = None) -> list[dict]:
+    """
+    Ensures the highest version of each script, and only that version, is flagged as the latest.
+
+    The highest version of every script is found with a single correlated subquery and the
+    flags are fixed with two bulk updates, rather than querying each script in turn. Pass scripts
+    to only check those scripts, e.g. after uploading or deleting a version.
+
+    Returns the script versions whose flag was changed, with their new flag.
+    """
+    script_versions = models.ScriptVersion.plain_objects.all()
+    if scripts is not None:
+        script_versions = script_versions.filter(script__in=scripts)
+    highest_version = (
+        models.ScriptVersion.plain_objects.filter(script=OuterRef("script"))
+        .order_by("-version", "-pk")
+        .values("pk")[:1]
+    )
+    script_versions = script_versions.alias(highest_version_pk=Subquery(highest_version))
+
+    fields = ["pk", "script_id", "script__name", "version", "latest"]
+    to_set = list(script_versions.filter(latest=False, pk=F("highest_version_pk")).values(*fields))
+    to_clear = list(script_versions.filter(latest=True).exclude(pk=F("highest_version_pk")).values(*fields))
+
+    # The modified time is updated too, so the character index picks up the new flags.
+    with transaction.atomic():
+        if to_set:
+            models.ScriptVersion.plain_objects.filter(pk__in=[row["pk"] for row in to_set]).update(
+                latest=True, modified=Now()
+            )
+        if to_clear:
+            models.ScriptVersion.plain_objects.filter(pk__in=[row["pk"] for row in to_clear]).update(
+                latest=False, modified=Now()
+            )
+
+    changed = []
+    for row in to_set + to_clear:
+        row["latest"] = not row["latest"]
+        changed.append(row)
+    return sorted(changed, key=lambda row: (row["script_id"], row["version"]))
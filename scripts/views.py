@@ -7,6 +7,7 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.models import User
 from django.contrib.auth import logout
 from django.contrib.auth.decorators import permission_required
+from django.db import transaction
 from django.db.models import Case, When, Count, Prefetch, F
 from django.http import (
     FileResponse,
@@ -25,17 +26,22 @@ from versionfield import Version
 
 from scripts import (
     cache,
+    character_index,
     constants,
+    counters,
     filters,
     forms,
     models,
+    official_roles,
     script_json,
     tables,
+    versions,
+    worldcup,
 )
 from collections import Counter
 from django.contrib.postgres.search import TrigramSimilarity
 from dataclasses import dataclass
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterable, List, Optional
 import requests
 
 
@@ -121,11 +127,26 @@ def get_comments(script: models.Script) -> Dict:
 
 
 def count_character(script_content, character_type: models.CharacterType) -> int:
-    count = 0
-    clocktower_characters = cache.get_clocktower_characters()
+    return count_characters_by_type(script_content)[character_type]
+
+
+def count_characters_by_type(
+    script_content,
+    clocktower_characters: Optional[dict] = None,
+    homebrew_characters: Optional[dict] = None,
+) -> Counter:
+    """
+    Counts the characters of each type in a script in a single pass over the content.
+
+    The character maps can be passed in when counting many scripts to avoid fetching them from
+    the cache for each one. The homebrew characters only need to include those on the scripts.
+    """
+    if clocktower_characters is None:
+        clocktower_characters = cache.get_clocktower_characters()
+    counts = Counter()
+    homebrew_character_ids = []
     for json_entry in script_content:
         character = None
-        character_id = ""
         if isinstance(json_entry, str):
             character = clocktower_characters.get(json_entry, None)
         elif isinstance(json_entry, dict):
@@ -134,11 +155,19 @@ def count_character(script_content, character_type: models.CharacterType) -> int
                 continue
             character = clocktower_characters.get(character_id, None)
             if not character:
-                character = cache.get_homebrew_characters().get(character_id, None)
+                homebrew_character_ids.append(character_id)
+
+        if character:
+            counts[character.character_type] += 1
 
-        if character and character.character_type == character_type:
-            count += 1
-    return count
+    if homebrew_character_ids:
+        if homebrew_characters is None:
+            homebrew_characters = cache.get_homebrew_characters(homebrew_character_ids)
+        for character_id in homebrew_character_ids:
+            character = homebrew_characters.get(character_id, None)
+            if character:
+                counts[character.character_type] += 1
+    return counts
 
 
 def calculate_edition(script_content: Dict) -> int:
@@ -168,6 +197,68 @@ def calculate_edition(script_content: Dict) -> int:
     return edition
 
 
+def get_scripts_homebrew_characters(script_contents: Iterable, clocktower_characters: dict) -> dict:
+    """
+    Returns the homebrew characters on any of the scripts, fetched from the cache in a single call.
+    """
+    return cache.get_homebrew_characters(
+        character_id
+        for script_content in script_contents
+        for character_id in script_json.get_character_ids(script_content)
+        if character_id not in clocktower_characters
+    )
+
+
+def get_script_version_characters(
+    script_version_pk: int,
+    script_content,
+    clocktower_characters: Optional[dict] = None,
+    homebrew_characters: Optional[dict] = None,
+) -> List[models.ScriptVersionCharacter]:
+    if clocktower_characters is None:
+        clocktower_characters = cache.get_clocktower_characters()
+    if homebrew_characters is None:
+        homebrew_characters = get_scripts_homebrew_characters([script_content], clocktower_characters)
+    characters = []
+    for character_id in script_json.get_character_ids(script_content):
+        # IDs longer than the column can't match any known character, so they're not indexed.
+        if len(character_id) > constants.MAX_CHARACTER_ID_LENGTH:
+            continue
+        character = clocktower_characters.get(character_id) or homebrew_characters.get(character_id)
+        characters.append(
+            models.ScriptVersionCharacter(
+                script_version_id=script_version_pk,
+                character_id=character_id,
+                character_type=character.character_type if character else models.CharacterType.UNKNOWN,
+                position=len(characters),
+            )
+        )
+    return characters
+
+
+def update_script_version_characters(script_versions: List[models.ScriptVersion]) -> None:
+    """
+    Replaces the denormalised character rows of the script versions with those in their content.
+    """
+    clocktower_characters = cache.get_clocktower_characters()
+    homebrew_characters = get_scripts_homebrew_characters(
+        [script_version.content for script_version in script_versions], clocktower_characters
+    )
+    characters = []
+    for script_version in script_versions:
+        characters.extend(
+            get_script_version_characters(
+                script_version.pk, script_version.content, clocktower_characters, homebrew_characters
+            )
+        )
+
+    with transaction.atomic():
+        models.ScriptVersionCharacter.objects.filter(
+            script_version__in=[script_version.pk for script_version in script_versions]
+        ).delete()
+        models.ScriptVersionCharacter.objects.bulk_create(characters, batch_size=1000)
+
+
 class ScriptView(generic.DetailView):
     template_name = "script.html"
     model = models.Script
@@ -176,9 +267,7 @@ class ScriptView(generic.DetailView):
         return models.Script.objects.select_related("owner").prefetch_related(
             Prefetch(
                 "versions",
-                queryset=models.ScriptVersion.objects.prefetch_related("tags")
-                .annotate(num_comments=Count("script__comments", distinct=True))
-                .order_by("-version"),
+                queryset=models.ScriptVersion.objects.prefetch_related("tags").order_by("-version"),
             ),
             Prefetch(
                 "comments",
@@ -213,31 +302,7 @@ class ScriptView(generic.DetailView):
             current_script = self.object.versions.order_by("-version").first()
         context["script_version"] = current_script
 
-        changes = {}
-        diff_script_version = None
-        for script_version in self.object.versions.all().order_by("-version"):
-            # If we're looking at an older script, don't show changes future to that.
-            if script_version.version > current_script.version:
-                continue
-
-            if diff_script_version:
-                changes[diff_script_version.version] = {}
-                changes[diff_script_version.version]["additions"] = script_json.get_json_additions(
-                    script_version.content.copy(),
-                    diff_script_version.content.copy(),
-                )
-                changes[diff_script_version.version]["deletions"] = script_json.get_json_additions(
-                    diff_script_version.content.copy(),
-                    script_version.content.copy(),
-                )
-                changes[diff_script_version.version]["changes"] = script_json.get_json_changes(
-                    script_version.content.copy(),
-                    diff_script_version.content.copy(),
-                )
-                changes[diff_script_version.version]["previous_version"] = script_version.version
-            diff_script_version = script_version
-
-        context["changes"] = changes
+        context["changes"] = versions.get_version_history(self.object, current_script.version)
         context["script_version"] = current_script
         context["comments"] = get_comments(current_script.script)
         context["languages"] = (
@@ -317,6 +382,7 @@ def update_script(script_version: models.ScriptVersion, cleaned_data, author, us
             script_version.pdf.delete(save=False)
         script_version.pdf = cleaned_data["pdf"]
 
+    was_in_world_cup = worldcup.is_world_cup_script_version(script_version)
     if user.is_staff:
         # Staff members can see all the tags in the form, so any changes they make
         # should actually me made.
@@ -326,6 +392,7 @@ def update_script(script_version: models.ScriptVersion, cleaned_data, author, us
         current_tags = script_version.tags.filter(public=False)
         script_version.tags.set(cleaned_data["tags"] | current_tags)
     script_version.save()
+    worldcup.record_world_cup_script_version_edit(script_version, was_in_world_cup)
 
 
 class BaseScriptUploadView(generic.FormView):
@@ -485,12 +552,9 @@ class ScriptUploadView(BaseScriptUploadView):
                         return HttpResponseRedirect(self.get_success_url())
 
                     if Version(form.cleaned_data["version"]) > script.latest_version().version:
-                        # This is newer than the latest version, so set that
-                        # version to not be latest.
+                        # This is newer than the latest version, so inherit its tags. The latest
+                        # flags are updated once this version has been created.
                         current_tags = script.latest_version().tags
-                        latest_version = script.latest_version()
-                        latest_version.latest = False
-                        latest_version.save()
                     else:
                         # We're uploading an older version than the latest, so don't mark this version
                         # as the latest, that's still the current latest.
@@ -498,13 +562,14 @@ class ScriptUploadView(BaseScriptUploadView):
 
         homebrewiness = create_characters_and_determine_homebrew_status(json, script)
 
-        num_townsfolk = count_character(json, models.CharacterType.TOWNSFOLK)
-        num_outsiders = count_character(json, models.CharacterType.OUTSIDER)
-        num_minions = count_character(json, models.CharacterType.MINION)
-        num_demons = count_character(json, models.CharacterType.DEMON)
-        num_fabled = count_character(json, models.CharacterType.FABLED)
-        num_loric = count_character(json, models.CharacterType.LORIC)
-        num_travellers = count_character(json, models.CharacterType.TRAVELLER)
+        character_counts = count_characters_by_type(json)
+        num_townsfolk = character_counts[models.CharacterType.TOWNSFOLK]
+        num_outsiders = character_counts[models.CharacterType.OUTSIDER]
+        num_minions = character_counts[models.CharacterType.MINION]
+        num_demons = character_counts[models.CharacterType.DEMON]
+        num_fabled = character_counts[models.CharacterType.FABLED]
+        num_loric = character_counts[models.CharacterType.LORIC]
+        num_travellers = character_counts[models.CharacterType.TRAVELLER]
         edition = calculate_edition(json)
 
         # Create the Script Version object from the form.
@@ -526,6 +591,10 @@ class ScriptUploadView(BaseScriptUploadView):
             edition=edition,
             homebrewiness=homebrewiness,
         )
+        versions.update_latest_flags([script])
+        character_index.index_script_version(self.script_version)
+        update_script_version_characters([self.script_version])
+        versions.update_version_diffs(script)
         if form.cleaned_data.get("notes", None):
             self.script_version.notes = form.cleaned_data["notes"]
             self.script_version.save()
@@ -556,6 +625,8 @@ class ScriptUploadView(BaseScriptUploadView):
             except models.ScriptTag.DoesNotExist:
                 pass
 
+        worldcup.record_world_cup_script_version(self.script_version)
+
         return HttpResponseRedirect(self.get_success_url())
 
 
@@ -576,16 +647,20 @@ class ScriptDeleteView(LoginRequiredMixin, generic.edit.BaseDeleteView):
 
         if script.owner != self.request.user:
             return HttpResponseForbidden()
+        in_world_cup = worldcup.is_world_cup_script(script)
+        character_index.remove_script_version(script_version.pk)
         script_version.delete()
 
         if script.versions.count() > 0:
-            latest_version = script.latest_version()
-            latest_version.latest = True
-            latest_version.save()
+            versions.update_latest_flags([script])
+            versions.update_version_diffs(script)
+            in_world_cup = in_world_cup or worldcup.is_world_cup_script(script)
             self.success_url = self.determine_success_url(script)
         else:
             script.delete()
             self.success_url = "/"
+        if in_world_cup:
+            worldcup.rebuild_world_cup_statistics()
 
         return HttpResponseRedirect(self.get_success_url())
 
@@ -605,9 +680,9 @@ class StatisticsView(generic.ListView, FilterView):
         characters_to_display = 25
 
         if "all" in self.request.GET:
-            queryset = models.ScriptVersion.objects.all()
+            queryset = models.ScriptVersion.plain_objects.all()
         else:
-            queryset = models.ScriptVersion.objects.filter(latest=True)
+            queryset = models.ScriptVersion.plain_objects.filter(latest=True)
         queryset = queryset.filter(homebrewiness=models.Homebrewiness.CLOCKTOWER)
 
         if self.request.user.is_authenticated:
@@ -618,13 +693,13 @@ class StatisticsView(generic.ListView, FilterView):
         if "character" in self.kwargs:
             try:
                 stats_character = models.ClocktowerCharacter.objects.get(character_id=self.kwargs.get("character"))
-                queryset = queryset.filter(content__contains=[{"id": stats_character.character_id}])
+                queryset = queryset.filter(filters.has_character(stats_character.character_id))
             except models.ClocktowerCharacter.DoesNotExist:
                 raise Http404()
         elif "tags" in self.kwargs:
             tags = models.ScriptTag.objects.get(pk=self.kwargs.get("tags"))
             if tags:
-                queryset = models.ScriptVersion.objects.filter(tags__in=[tags])
+                queryset = models.ScriptVersion.plain_objects.filter(tags__in=[tags])
 
         if "tags" in self.request.GET:
             try:
@@ -650,7 +725,12 @@ class StatisticsView(generic.ListView, FilterView):
             except ValueError:
                 pass
 
-        total = queryset.count()
+        # Resolve the filters to a set of script versions once, then count every character
+        # against that set using the in-memory index.
+        index = character_index.get_character_index()
+        scripts = index.mask(queryset.values_list("pk", flat=True))
+
+        total = scripts.bit_count()
         context["total"] = total
         if total == 0:
             return context
@@ -666,9 +746,7 @@ class StatisticsView(generic.ListView, FilterView):
             if character == stats_character:
                 continue
 
-            character_count[character.character_type][character] = queryset.filter(
-                content__contains=[{"id": character.character_id}]
-            ).count()
+            character_count[character.character_type][character] = index.count(character.character_id, scripts)
 
         for type in models.CharacterType:
             context[type.value] = character_count[type.value].most_common(characters_to_display)
@@ -713,7 +791,9 @@ class UserDeleteView(LoginRequiredMixin, generic.TemplateView):
     def post(self, request):
         user = request.user
         logout(request)
-        user.delete()
+        with transaction.atomic():
+            counters.remove_user_counters(user)
+            user.delete()
         return HttpResponseRedirect("/")
 
 
@@ -727,11 +807,7 @@ def get_script(request, pk: int) -> models.Script:
 
 def update_user_related_script(model, user: User, script: models.Script) -> None:
     if user.is_authenticated:
-        if model.objects.filter(user=user, parent=script).exists():
-            object = model.objects.get(user=user, parent=script)
-            object.delete()
-        else:
-            model.objects.create(user=user, parent=script)
+        counters.toggle_user_related_script(model, user, script)
 
 
 def vote_for_script(request, pk: int) -> None:
@@ -755,40 +831,35 @@ def get_similar_scripts(request, pk: int, version: str) -> JsonResponse:
     if request.method != "GET":
         raise Http404()
 
-    current_script = models.ScriptVersion.objects.filter(script=pk, version=version)[0]
+    current_script = models.ScriptVersion.plain_objects.filter(script=pk, version=version)[0]
 
+    index = character_index.get_character_index()
+    candidates = index.versions(latest=True, homebrewiness=models.Homebrewiness.CLOCKTOWER)
+    candidates &= ~index.mask([current_script.pk])
     similarity = {}
-    similarity[models.ScriptTypes.TEENSYVILLE.value] = {}
-    similarity[models.ScriptTypes.FULL.value] = {}
-    for script_version in (
-        models.ScriptVersion.objects.filter(latest=True, homebrewiness=models.Homebrewiness.CLOCKTOWER)
-        .select_related("script")
-        .order_by("pk")
-    ):
-        if current_script == script_version:
-            continue
-
-        similarity[script_version.script_type][script_version] = script_json.get_similarity(
+    for script_type in models.ScriptTypes:
+        similarity[script_type] = index.most_similar(
             current_script.content,
-            script_version.content,
-            current_script.script_type == script_version.script_type,
+            candidates & index.versions(script_type=script_type),
+            current_script.script_type == script_type,
         )
+
+    script_versions = models.ScriptVersion.plain_objects.select_related("script").in_bulk(
+        [script_version_pk for scores in similarity.values() for script_version_pk, _ in scores]
+    )
+
     teensville_scripts = map(
         map_similar_scripts,
-        sorted(
-            similarity[models.ScriptTypes.TEENSYVILLE].items(),
-            key=lambda x: x[1],
-            reverse=True,
-        )[:10],
+        [
+            (script_versions[pk], score)
+            for pk, score in similarity[models.ScriptTypes.TEENSYVILLE]
+            if pk in script_versions
+        ],
     )
 
     full_scripts = map(
         map_similar_scripts,
-        sorted(
-            similarity[models.ScriptTypes.FULL].items(),
-            key=lambda x: x[1],
-            reverse=True,
-        )[:10],
+        [(script_versions[pk], score) for pk, score in similarity[models.ScriptTypes.FULL] if pk in script_versions],
     )
 
     return JsonResponse({"full": list(full_scripts), "teensyville": list(teensville_scripts)})
@@ -1039,15 +1110,17 @@ class CommentCreateView(LoginRequiredMixin, generic.View):
                 return HttpResponseRedirect(redirect_url)
 
         if request.POST["comment"]:
-            if parent:
-                models.Comment.objects.create(
-                    user=request.user,
-                    comment=request.POST["comment"],
-                    script=script,
-                    parent=parent,
-                )
-            else:
-                models.Comment.objects.create(user=request.user, comment=request.POST["comment"], script=script)
+            with transaction.atomic():
+                if parent:
+                    models.Comment.objects.create(
+                        user=request.user,
+                        comment=request.POST["comment"],
+                        script=script,
+                        parent=parent,
+                    )
+                else:
+                    models.Comment.objects.create(user=request.user, comment=request.POST["comment"], script=script)
+                counters.adjust_counter(models.Comment, script.pk, 1)
         messages.success(request, "comments-tab")
         return HttpResponseRedirect(redirect_url)
 
@@ -1091,8 +1164,10 @@ class CommentDeleteView(LoginRequiredMixin, generic.View):
                 child.parent = comment.parent
                 child.save()
 
-        success_url = f"/script/{comment.script.pk}"
-        comment.delete()
+        success_url = f"/script/{comment.script_id}"
+        with transaction.atomic():
+            comment.delete()
+            counters.adjust_counter(models.Comment, comment.script_id, -1)
         messages.success(request, "comments-tab")
         return HttpResponseRedirect(success_url)
 
@@ -1223,16 +1298,15 @@ class AdvancedSearchView(generic.FormView, SingleTableMixin):
             queryset = queryset.filter(num_loric__in=form.cleaned_data.get("number_of_loric"))
 
         if form.cleaned_data.get("minimum_number_of_likes"):
-            queryset = queryset.annotate(score=Count("script__votes"))
-            queryset = queryset.filter(score__gte=form.cleaned_data.get("minimum_number_of_likes"))
+            queryset = queryset.filter(script__num_likes__gte=form.cleaned_data.get("minimum_number_of_likes"))
 
         if form.cleaned_data.get("minimum_number_of_favourites"):
-            queryset = queryset.annotate(num_favs=Count("script__favourites"))
-            queryset = queryset.filter(num_favs__gte=form.cleaned_data.get("minimum_number_of_favourites"))
+            queryset = queryset.filter(
+                script__num_favourites__gte=form.cleaned_data.get("minimum_number_of_favourites")
+            )
 
         if form.cleaned_data.get("minimum_number_of_comments"):
-            queryset = queryset.annotate(num_comments=Count("script__comments"))
-            queryset = queryset.filter(num_comments__gte=form.cleaned_data.get("minimum_number_of_comments"))
+            queryset = queryset.filter(script__num_comments__gte=form.cleaned_data.get("minimum_number_of_comments"))
 
         queryset = queryset.order_by("-pk")
         pk_list = list(queryset.values_list("pk", flat=True))
@@ -1272,6 +1346,9 @@ class UpdateDatabaseView(LoginRequiredMixin, generic.FormView):
                 script = models.ScriptVersion.objects.get(pk=i)
                 script.content = script_json.strip_special_characters_from_json(script.content)
                 script.save()
+                character_index.index_script_version(script)
+                update_script_version_characters([script])
+                versions.update_version_diffs(script.script, changed=[script.pk])
             except models.ScriptVersion.DoesNotExist:
                 # It's quite possible some script numbers don't exist, so just continue
                 continue
@@ -1299,108 +1376,107 @@ def get_character_type_from_team(team):
             return models.CharacterType.UNKNOWN
 
 
-def character_missing_from_database(character_id, roles):
-    for role in roles:
-        if character_id == role.get("id", "UNKNOWN CHARACTER"):
-            return True
-    return False
-
+def classify_script_characters(
+    script_content: Dict, clocktower_character_ids, official_role_ids
+) -> tuple[models.Homebrewiness, Dict[str, Dict]]:
+    """
+    Determines whether a script is Clocktower, Hybrid or Homebrew without touching the database.
 
-def create_characters_and_determine_homebrew_status(script_content: Dict, script: models.Script):
+    Returns the homebrewiness and the JSON of each homebrew character on the script by ID. If a
+    character appears more than once, the last definition wins.
+    """
     homebrewiness = models.Homebrewiness.CLOCKTOWER
     non_clocktower_characters = 0
     entries_to_ignore = 0
-    roles = []
-    try:
-        roles = requests.get("https://script.bloodontheclocktower.com/data/roles.json", timeout=2)
-    except requests.exceptions.Timeout:
-        pass
+    homebrew_characters = {}
 
     for item in script_content:
-        if item.get("id", "") == "_meta":
+        character_id = item.get("id", "")
+        if character_id == "_meta":
             entries_to_ignore += 1
             continue
 
-        try:
-            character = models.ClocktowerCharacter.objects.get(character_id=item.get("id", ""))
+        if character_id in clocktower_character_ids:
             # Ignore the use of the official Bootlegger character, this indicates the script
             # hybrid/homebrew already but shouldn't count against homebrew status.
-            if character.character_id == "bootlegger":
+            if character_id == "bootlegger":
                 entries_to_ignore += 1
-        except models.ClocktowerCharacter.DoesNotExist:
-            if roles.ok and character_missing_from_database(item.get("id", ""), js.loads(roles.content)):
-                # It's possible we don't know about this character because it has just been released
-                # and it's not been added to the database. In this case check the script tool for roles
-                # and if it present, don't mark this as a homebrew character.
-                continue
-            if len(item.keys()) == 1:
-                # If the character element has more than 1 key then it is almost certainly an attempt at a
-                # homebrew/hybrid character, otherwise it's probably official.
-                continue
+            continue
 
-            non_clocktower_characters += 1
+        # It's possible we don't know about this character because it has just been released
+        # and it's not been added to the database. In this case check the script tool for roles
+        # and if it present, don't mark this as a homebrew character.
+        if character_id in official_role_ids:
+            continue
+        if len(item.keys()) == 1:
+            # If the character element has more than 1 key then it is almost certainly an attempt at a
+            # homebrew/hybrid character, otherwise it's probably official.
+            continue
 
-            image_url = item.get("image")
-            if isinstance(image_url, list):
-                image_url = ",".join(image_url)
-            try:
-                homebrew_character = models.HomebrewCharacter.objects.get(character_id=item.get("id"))
-                if homebrew_character.script and homebrew_character.script == script:
-                    models.HomebrewCharacter.objects.update_or_create(
-                        character_id=item.get("id"),
-                        script=script,
-                        defaults={
-                            "character_name": item.get("name"),
-                            "image_url": image_url,
-                            "character_type": get_character_type_from_team(item.get("team")).value,
-                            "ability": item.get("ability"),
-                            "first_night_position": item.get("firstNight", None),
-                            "other_night_position": item.get("otherNight", None),
-                            "first_night_reminder": item.get("firstNightReminder", None),
-                            "other_night_reminder": item.get("otherNightReminder", None),
-                            "global_reminders": ",".join(item.get("remindersGlobal", [])),
-                            "reminders": ",".join(item.get("reminders", [])),
-                            "modifies_setup": item.get("setup", False),
-                        },
-                    )
-                else:
-                    models.HomebrewCharacter.objects.update_or_create(
-                        character_id=item.get("id"),
-                        defaults={
-                            "script": script,
-                            "character_name": item.get("name"),
-                            "image_url": image_url,
-                            "character_type": get_character_type_from_team(item.get("team")).value,
-                            "ability": item.get("ability"),
-                            "first_night_position": item.get("firstNight", None),
-                            "other_night_position": item.get("otherNight", None),
-                            "first_night_reminder": item.get("firstNightReminder", None),
-                            "other_night_reminder": item.get("otherNightReminder", None),
-                            "global_reminders": ",".join(item.get("remindersGlobal", [])),
-                            "reminders": ",".join(item.get("reminders", [])),
-                            "modifies_setup": item.get("setup", False),
-                        },
-                    )
-            except models.HomebrewCharacter.DoesNotExist:
-                models.HomebrewCharacter.objects.create(
-                    character_id=item.get("id"),
-                    script=script,
-                    character_name=item.get("name"),
-                    image_url=image_url,
-                    character_type=get_character_type_from_team(item.get("team")).value,
-                    ability=item.get("ability"),
-                    first_night_position=item.get("firstNight", None),
-                    other_night_position=item.get("otherNight", None),
-                    first_night_reminder=item.get("firstNightReminder", None),
-                    other_night_reminder=item.get("otherNightReminder", None),
-                    global_reminders=",".join(item.get("remindersGlobal", [])),
-                    reminders=",".join(item.get("reminders", [])),
-                    modifies_setup=item.get("setup", False),
-                )
+        non_clocktower_characters += 1
+        homebrew_characters[item.get("id")] = item
 
     if non_clocktower_characters == len(script_content) - entries_to_ignore:
         homebrewiness = models.Homebrewiness.HOMEBREW
     elif non_clocktower_characters > 0:
         homebrewiness = models.Homebrewiness.HYBRID
 
+    return homebrewiness, homebrew_characters
+
+
+def get_homebrew_character(item: Dict, script: models.Script) -> models.HomebrewCharacter:
+    image_url = item.get("image")
+    if isinstance(image_url, list):
+        image_url = ",".join(image_url)
+    return models.HomebrewCharacter(
+        character_id=item.get("id"),
+        script=script,
+        character_name=item.get("name"),
+        image_url=image_url,
+        character_type=get_character_type_from_team(item.get("team")).value,
+        ability=item.get("ability"),
+        first_night_position=item.get("firstNight", None),
+        other_night_position=item.get("otherNight", None),
+        first_night_reminder=item.get("firstNightReminder", None),
+        other_night_reminder=item.get("otherNightReminder", None),
+        global_reminders=",".join(item.get("remindersGlobal", [])),
+        reminders=",".join(item.get("reminders", [])),
+        modifies_setup=item.get("setup", False),
+    )
+
+
+def save_homebrew_characters(homebrew_characters: List[models.HomebrewCharacter]) -> None:
+    """
+    Creates or updates homebrew characters in a single query. Character IDs must be unique.
+    """
+    if not homebrew_characters:
+        return
+    with transaction.atomic():
+        models.HomebrewCharacter.objects.bulk_create(
+            homebrew_characters,
+            update_conflicts=True,
+            unique_fields=["character_id"],
+            update_fields=[
+                "script",
+                "character_name",
+                "image_url",
+                "character_type",
+                "ability",
+                "first_night_position",
+                "other_night_position",
+                "first_night_reminder",
+                "other_night_reminder",
+                "global_reminders",
+                "reminders",
+                "modifies_setup",
+            ],
+        )
+    cache.update_homebrew_characters(homebrew_characters)
+
+
+def create_characters_and_determine_homebrew_status(script_content: Dict, script: models.Script):
+    homebrewiness, homebrew_characters = classify_script_characters(
+        script_content, cache.get_clocktower_characters(), official_roles.get_official_role_ids()
+    )
+    save_homebrew_characters([get_homebrew_character(item, script) for item in homebrew_characters.values()])
     return homebrewiness
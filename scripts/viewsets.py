@@ -1,18 +1,25 @@
-from django.db.models import Count
+import heapq
+
+from django.conf import settings
+from django.db.models import F
 from rest_framework import filters, viewsets
 from rest_framework.authentication import BasicAuthentication
+from rest_framework.parsers import JSONParser
 from rest_framework.permissions import BasePermission, IsAuthenticated
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.decorators import action, authentication_classes
 from rest_framework import status
-from scripts import models, serializers, script_json
+from scripts import bulk_import, character_index, models, serializers, script_json, versions, worldcup
 from scripts import filters as filtersets
+from scripts.pagination import ScriptPagination
+from scripts.parsers import NDJSONParser
 from scripts.views import (
     translate_json_content,
     create_characters_and_determine_homebrew_status,
-    count_character,
+    count_characters_by_type,
     calculate_edition,
+    update_script_version_characters,
 )
 from django_filters.rest_framework import DjangoFilterBackend
 from django.http import Http404
@@ -31,27 +38,105 @@ class ScriptApiPermissions(BasePermission):
         return False
 
 
+def get_script_version_queryset(request):
+    queryset = models.ScriptVersion.plain_objects.select_related("script").annotate(score=F("script__num_likes"))
+    latest = request.query_params.get("latest")
+    if latest:
+        queryset = queryset.filter(latest=True)
+    requested_fields = serializers.get_requested_fields(request)
+    if requested_fields is not None and "content" not in requested_fields:
+        queryset = queryset.defer("content")
+    return queryset
+
+
 class ScriptViewSet(viewsets.ModelViewSet):
     queryset = models.ScriptVersion.objects.all()
     serializer_class = serializers.ScriptSerializer
+    pagination_class = ScriptPagination
     filter_backends = [filters.OrderingFilter, DjangoFilterBackend]
     filterset_class = filtersets.ScriptVersionFilter
     ordering_fields = ["pk", "score"]
     ordering = ["-pk"]
 
     def get_queryset(self):
-        queryset = models.ScriptVersion.plain_objects.annotate(score=Count("script__votes", distinct=True))
-        latest = self.request.query_params.get("latest")
-        if latest:
-            queryset = queryset.filter(latest=True)
-        return queryset
+        return get_script_version_queryset(self.request)
 
     @action(methods=["get"], detail=True)
     def json(self, _, pk=None):
         return Response(models.ScriptVersion.objects.get(pk=pk).content)
 
+    @action(methods=["get"], detail=True)
+    def similar(self, request, pk=None):
+        """
+        Approximate nearest scripts to this script version across all versions in the database.
+
+        MinHash LSH narrows down the scripts compared unless SIMILAR_SCRIPTS_USE_LSH is off or
+        ?exact=true is given, in which case every script is compared.
+        """
+        try:
+            script_version = models.ScriptVersion.plain_objects.get(pk=pk)
+        except models.ScriptVersion.DoesNotExist:
+            raise Http404
+        try:
+            k = min(max(int(request.query_params.get("k", 10)), 1), 100)
+        except ValueError:
+            return Response({"error": "k must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+
+        script_type = request.query_params.get("script_type")
+        if script_type and script_type not in models.ScriptTypes.values:
+            return Response({"error": "Invalid script type."}, status=status.HTTP_400_BAD_REQUEST)
+
+        homebrewiness = request.query_params.get("homebrewiness")
+        if homebrewiness:
+            homebrewiness_values = {label.lower(): value for value, label in models.Homebrewiness.choices}
+            homebrewiness_values.update({str(value): value for value in models.Homebrewiness.values})
+            if homebrewiness.lower() not in homebrewiness_values:
+                return Response({"error": "Invalid homebrewiness."}, status=status.HTTP_400_BAD_REQUEST)
+            homebrewiness = homebrewiness_values[homebrewiness.lower()]
+        else:
+            homebrewiness = None
+
+        index = character_index.get_character_index()
+        candidates = index.versions(script_type=script_type or None, homebrewiness=homebrewiness)
+        candidates &= ~index.mask([script_version.pk])
+        if settings.SIMILAR_SCRIPTS_USE_LSH and request.query_params.get("exact", "").lower() not in ("true", "1"):
+            # Until the LSH index is ready every candidate is compared instead.
+            approximate = index.approximate_candidates(script_version.content, candidates)
+            if approximate is not None:
+                candidates = approximate
+
+        similarity = []
+        for candidate_type in [script_type] if script_type else models.ScriptTypes.values:
+            similarity.extend(
+                index.most_similar(
+                    script_version.content,
+                    candidates & index.versions(script_type=candidate_type),
+                    script_version.script_type == candidate_type,
+                    k,
+                )
+            )
+        similarity = heapq.nlargest(k, similarity, key=lambda result: (result[1], -result[0]))
+
+        script_versions = models.ScriptVersion.plain_objects.select_related("script").in_bulk(
+            [similar_pk for similar_pk, _ in similarity]
+        )
+        return Response(
+            [
+                {
+                    "pk": similar_pk,
+                    "script_id": script_versions[similar_pk].script.pk,
+                    "name": script_versions[similar_pk].script.name,
+                    "version": str(script_versions[similar_pk].version),
+                    "script_type": script_versions[similar_pk].script_type,
+                    "similarity": score,
+                }
+                for similar_pk, score in similarity
+                if similar_pk in script_versions
+            ]
+        )
+
     def get_permissions(self):
-        if self.action in ["create", "update", "partial_update", "destroy"]:
+        if self.action in ["create", "bulk_import", "update", "partial_update", "destroy"]:
             permission_classes = [IsAuthenticated, ScriptApiPermissions]
         else:
             permission_classes = []
@@ -85,12 +170,9 @@ class ScriptViewSet(viewsets.ModelViewSet):
                 # We need to protect this code against instances where a script doesn't
                 # have a latest version.
                 if Version(serializer.validated_data.get("version")) > script.latest_version().version:
-                    # This is newer than the latest version, so set that
-                    # version to not be latest.
+                    # This is newer than the latest version, so inherit its tags. The latest
+                    # flags are updated once this version has been created.
                     current_tags = script.latest_version().tags
-                    latest_version = script.latest_version()
-                    latest_version.latest = False
-                    latest_version.save()
                 else:
                     # We're uploading an older version than the latest, so don't mark this version
                     # as the latest, that's still the current latest.
@@ -99,13 +181,14 @@ class ScriptViewSet(viewsets.ModelViewSet):
         json = script_json.get_json_content(serializer.validated_data)
         homebrewiness = create_characters_and_determine_homebrew_status(json, script)
 
-        num_townsfolk = count_character(json, models.CharacterType.TOWNSFOLK)
-        num_outsiders = count_character(json, models.CharacterType.OUTSIDER)
-        num_minions = count_character(json, models.CharacterType.MINION)
-        num_demons = count_character(json, models.CharacterType.DEMON)
-        num_fabled = count_character(json, models.CharacterType.FABLED)
-        num_loric = count_character(json, models.CharacterType.LORIC)
-        num_travellers = count_character(json, models.CharacterType.TRAVELLER)
+        character_counts = count_characters_by_type(json)
+        num_townsfolk = character_counts[models.CharacterType.TOWNSFOLK]
+        num_outsiders = character_counts[models.CharacterType.OUTSIDER]
+        num_minions = character_counts[models.CharacterType.MINION]
+        num_demons = character_counts[models.CharacterType.DEMON]
+        num_fabled = character_counts[models.CharacterType.FABLED]
+        num_loric = character_counts[models.CharacterType.LORIC]
+        num_travellers = character_counts[models.CharacterType.TRAVELLER]
         edition = calculate_edition(json)
 
         # Create the Script Version object from the form.
@@ -127,6 +210,10 @@ class ScriptViewSet(viewsets.ModelViewSet):
             edition=edition,
             homebrewiness=homebrewiness,
         )
+        versions.update_latest_flags([script])
+        character_index.index_script_version(self.script_version)
+        update_script_version_characters([self.script_version])
+        versions.update_version_diffs(script)
         if serializer.validated_data.get("notes", None):
             self.script_version.notes = serializer.validated_data.get("notes")
             self.script_version.save()
@@ -148,8 +235,28 @@ class ScriptViewSet(viewsets.ModelViewSet):
             except models.ScriptTag.DoesNotExist:
                 pass
 
+        worldcup.record_world_cup_script_version(self.script_version)
+
         return Response(status=status.HTTP_201_CREATED, data={"pk": self.script_version.pk})
 
+    @authentication_classes([BasicAuthentication])
+    @action(methods=["post"], detail=False, url_path="import", parser_classes=[JSONParser, NDJSONParser])
+    def bulk_import(self, request):
+        """
+        Creates many scripts at once from a JSON array or NDJSON of scripts, each in the format
+        accepted when creating a single script. Reports whether each script was created.
+        """
+        if not isinstance(request.data, list):
+            return Response({"error": "Expected a list of scripts."}, status=status.HTTP_400_BAD_REQUEST)
+        results = bulk_import.import_scripts(request.data, user=request.user, dry_run="dry_run" in request.query_params)
+        return Response(
+            {
+                "created": sum(result.created for result in results),
+                "failed": sum(result.status == "error" for result in results),
+                "results": [result.as_dict() for result in results],
+            }
+        )
+
     @authentication_classes([BasicAuthentication])
     def update(self, request, *args, **kwargs):
         pk = kwargs.pop("pk")
@@ -205,31 +312,32 @@ class ScriptViewSet(viewsets.ModelViewSet):
             )
 
         script = instance.script
+        in_world_cup = worldcup.is_world_cup_script(script)
+        character_index.remove_script_version(instance.pk)
         instance.delete()
 
         if script.versions.count() > 0:
-            latest_version = script.latest_version()
-            latest_version.latest = True
-            latest_version.save()
+            versions.update_latest_flags([script])
+            versions.update_version_diffs(script)
+            in_world_cup = in_world_cup or worldcup.is_world_cup_script(script)
         else:
             script.delete()
+        if in_world_cup:
+            worldcup.rebuild_world_cup_statistics()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class TranslateScriptViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = models.ScriptVersion.objects.all()
     serializer_class = serializers.ScriptSerializer
+    pagination_class = ScriptPagination
     filter_backends = [filters.OrderingFilter, DjangoFilterBackend]
     filterset_class = filtersets.ScriptVersionFilter
     ordering_fields = ["pk", "score"]
     ordering = ["-pk"]
 
     def get_queryset(self):
-        queryset = models.ScriptVersion.plain_objects.annotate(score=Count("script__votes", distinct=True))
-        latest = self.request.query_params.get("latest")
-        if latest:
-            queryset = queryset.filter(latest=True)
-        return queryset
+        return get_script_version_queryset(self.request)
 
     def get_object(self, pk: int):
         try:
@@ -1,5 +1,8 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce
 from django.views import generic
-from scripts import models, script_json
+from scripts import constants, models, versions
 from typing import Dict, Any
 from collections import Counter
 
@@ -8,9 +11,7 @@ class WorldCupView(generic.TemplateView):
     template_name = "worldcup/fixtures.html"
 
     def get_world_cup_script(self, script: models.Script):
-        for version in script.versions.all():
-            if models.ScriptTag.objects.get(pk=3) in version.tags.all():
-                return version
+        return models.ScriptVersion.plain_objects.filter(script=script, tags=constants.WORLD_CUP_TAG_PK).first()
 
     def get_context_data(self, **kwargs: Any) -> Dict[str, Any]:
         context = super().get_context_data(**kwargs)
@@ -33,8 +34,7 @@ class WorldCupStatisticsView(generic.TemplateView):
         context = super().get_context_data(**kwargs)
         characters_to_display = 5
 
-        queryset = models.ScriptVersion.objects.filter(tags=3)
-        queryset = queryset.filter(latest=True)
+        queryset = models.ScriptVersion.plain_objects.filter(tags=constants.WORLD_CUP_TAG_PK, latest=True)
 
         if "num" in self.request.GET:
             try:
@@ -48,55 +48,124 @@ class WorldCupStatisticsView(generic.TemplateView):
 
         context["total"] = queryset.count()
 
-        character_count = {}
-        character_count["additions"] = {}
-        character_count["deletions"] = {}
+        characters = models.ClocktowerCharacter.objects.annotate(
+            num_additions=Coalesce("world_cup_statistic__additions", 0),
+            num_deletions=Coalesce("world_cup_statistic__deletions", 0),
+        ).order_by("character_id")
         for type in models.CharacterType:
-            character_count["additions"][type.value] = Counter()
-            character_count["deletions"][type.value] = Counter()
-            for character in models.ClocktowerCharacter.objects.all():
+            additions = Counter()
+            deletions = Counter()
+            for character in characters:
                 if character.character_type != type:
                     continue
-                character_count["additions"][character.character_type][character] = 0
-                character_count["deletions"][character.character_type][character] = 0
-
-        for script_version in queryset:
-            versions = script_version.script.versions.order_by("version")
-            previous_version = None
-            for version in versions:
-                if previous_version:
-                    additions = script_json.get_json_additions(version.content.copy(), previous_version.content.copy())
-                    for addition in additions:
-                        if addition.get("id", "_meta") == "_meta":
-                            pass
-                        try:
-                            character = models.ClocktowerCharacter.objects.get(character_id=addition.get("id"))
-                        except models.ClocktowerCharacter.DoesNotExist:
-                            continue
-
-                        character_count["additions"][character.character_type][character] = (
-                            character_count["additions"][character.character_type][character] + 1
-                        )
-                    deletions = script_json.get_json_additions(previous_version.content.copy(), version.content.copy())
-                    for deletion in deletions:
-                        if deletion.get("id", "_meta") == "_meta":
-                            pass
-                        try:
-                            character = models.ClocktowerCharacter.objects.get(character_id=deletion.get("id"))
-                        except models.ClocktowerCharacter.DoesNotExist:
-                            continue
-
-                        character_count["deletions"][character.character_type][character] = (
-                            character_count["deletions"][character.character_type][character] + 1
-                        )
-                previous_version = version
-
-        for type in models.CharacterType:
-            context[type.value + "addition"] = character_count["additions"][type.value].most_common(
-                characters_to_display
-            )
-            context[type.value + "deletion"] = character_count["deletions"][type.value].most_common(
-                characters_to_display
-            )
+                additions[character] = character.num_additions
+                deletions[character] = character.num_deletions
+            context[type.value + "addition"] = additions.most_common(characters_to_display)
+            context[type.value + "deletion"] = deletions.most_common(characters_to_display)
 
         return context
+
+
+def is_world_cup_script_version(script_version: models.ScriptVersion) -> bool:
+    return script_version.tags.filter(pk=constants.WORLD_CUP_TAG_PK).exists()
+
+
+def is_world_cup_script(script: models.Script) -> bool:
+    return models.ScriptVersion.plain_objects.filter(
+        script=script, latest=True, tags=constants.WORLD_CUP_TAG_PK
+    ).exists()
+
+
+def rebuild_world_cup_statistics() -> int:
+    """
+    Recounts the characters added to and removed from every World Cup script from the stored version
+    diffs, bringing the diffs of those scripts up to date first.
+
+    Returns the number of characters with statistics.
+    """
+    scripts = models.Script.objects.filter(versions__tags=constants.WORLD_CUP_TAG_PK, versions__latest=True).distinct()
+    for script in scripts:
+        versions.update_version_diffs(script)
+
+    additions = Counter()
+    deletions = Counter()
+    for script_additions, script_deletions in models.ScriptVersionDiff.objects.filter(
+        script_version__script__in=scripts
+    ).values_list("additions", "deletions"):
+        additions.update(script_additions)
+        deletions.update(script_deletions)
+
+    character_ids = models.ClocktowerCharacter.objects.filter(
+        character_id__in=set(additions).union(deletions)
+    ).values_list("character_id", flat=True)
+    with transaction.atomic():
+        models.WorldCupStatistic.objects.all().delete()
+        statistics = models.WorldCupStatistic.objects.bulk_create(
+            [
+                models.WorldCupStatistic(
+                    character_id=character_id,
+                    additions=additions[character_id],
+                    deletions=deletions[character_id],
+                )
+                for character_id in character_ids
+            ]
+        )
+    return len(statistics)
+
+
+def record_world_cup_script_version(script_version: models.ScriptVersion) -> None:
+    """
+    Updates the World Cup statistics after a script version has been uploaded, once its tags and
+    version diff have been saved.
+
+    A new latest version of a script that was already in the World Cup only adds its own diff.
+    Anything else that changes a World Cup script, such as a script entering or leaving the World
+    Cup or an older version being uploaded, is rare enough to recount everything.
+    """
+    if not script_version.latest:
+        if is_world_cup_script(script_version.script):
+            rebuild_world_cup_statistics()
+        return
+
+    diff = (
+        models.ScriptVersionDiff.objects.filter(script_version=script_version)
+        .select_related("previous_version")
+        .first()
+    )
+    in_world_cup = is_world_cup_script_version(script_version)
+    was_in_world_cup = (
+        diff is not None and diff.previous_version is not None and is_world_cup_script_version(diff.previous_version)
+    )
+
+    if in_world_cup and was_in_world_cup:
+        _increment_world_cup_statistics("additions", diff.additions)
+        _increment_world_cup_statistics("deletions", diff.deletions)
+    elif in_world_cup or was_in_world_cup:
+        rebuild_world_cup_statistics()
+
+
+def record_world_cup_script_version_edit(
+    script_version: models.ScriptVersion, was_in_world_cup: bool, content_changed: bool = False
+) -> None:
+    """
+    Updates the World Cup statistics after the tags or content of an existing script version have
+    been edited, given whether it had the World Cup tag beforehand.
+    """
+    if content_changed:
+        versions.update_version_diffs(script_version.script, changed=[script_version.pk])
+    in_world_cup = is_world_cup_script_version(script_version)
+    if in_world_cup != was_in_world_cup or (content_changed and in_world_cup):
+        rebuild_world_cup_statistics()
+
+
+def _increment_world_cup_statistics(field: str, character_ids) -> None:
+    character_ids = models.ClocktowerCharacter.objects.filter(character_id__in=character_ids).values_list(
+        "character_id", flat=True
+    )
+    with transaction.atomic():
+        for character_id in character_ids:
+            statistic, created = models.WorldCupStatistic.objects.get_or_create(
+                character_id=character_id, defaults={field: 1}
+            )
+            if not created:
+                models.WorldCupStatistic.objects.filter(pk=statistic.pk).update(**{field: F(field) + 1})
@@ -0,0 +1,10 @@
+import pytest
+from django.core.cache import cache
+from scripts import cache as character_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Cached characters and search results would otherwise outlive the test database rows.
+    cache.clear()
+    character_cache.bump_character_catalogue_version()
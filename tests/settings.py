@@ -0,0 +1,29 @@
+import os
+from pathlib import Path
+
+from botc.settings import *  # noqa: F403
+
+# Tests that use the database need a PostgreSQL server, configured with these environment variables.
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": os.getenv("TEST_DBNAME", "postgres"),
+        "HOST": os.getenv("TEST_DBHOST", "localhost"),
+        "PORT": os.getenv("TEST_DBPORT", "5432"),
+        "USER": os.getenv("TEST_DBUSER", "postgres"),
+        "PASSWORD": os.getenv("TEST_DBPASS", "postgres"),
+    }
+}
+
+SECRET_KEY = "tests"
+UPLOAD_DISABLED = False
+BANNER = None
+STATIC_URL = "/static/"
+PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+# Never reach out to the script tool from the tests.
+OFFICIAL_ROLES_PATH = Path(__file__).resolve().parent / "input" / "official_roles_snapshot.json"
+OFFICIAL_ROLES_REFRESH_INTERVAL = 0
+
+# A minimal stand-in for the pinned script schema, so the tests never fetch the real one.
+JSON_SCHEMA_DIR = Path(__file__).resolve().parent / "input" / "schemas"
@@ -0,0 +1,228 @@
+import random
+
+import pytest
+from django.test import Client
+from scripts import character_index, minhash, models, versions
+from scripts.character_index import CharacterIndex, iter_bits
+
+TROUBLE_BREWING = ["washerwoman", "librarian", "investigator", "chef", "empath", "drunk", "poisoner", "imp"]
+
+
+def characters(*character_ids):
+    return [{"id": character_id} for character_id in character_ids]
+
+
+@pytest.fixture
+def index():
+    index = CharacterIndex()
+    index.add(1, characters(*TROUBLE_BREWING), script_type=models.ScriptTypes.FULL)
+    index.add(2, characters(*TROUBLE_BREWING[:-1], "vortox"), script_type=models.ScriptTypes.FULL)
+    index.add(3, characters(*TROUBLE_BREWING[:4]), script_type=models.ScriptTypes.TEENSYVILLE, latest=False)
+    index.add(4, characters("vortox"), script_type=models.ScriptTypes.FULL, homebrewiness=models.Homebrewiness.HYBRID)
+    return index
+
+
+def test_iter_bits():
+    assert list(iter_bits(0)) == []
+    assert list(iter_bits(0b1011)) == [0, 1, 3]
+    assert list(iter_bits(1 << 200)) == [200]
+
+
+def test_versions(index):
+    assert index.pks(index.versions()) == [1, 2, 3, 4]
+    assert index.pks(index.versions(script_type=models.ScriptTypes.FULL)) == [1, 2, 4]
+    assert index.pks(index.versions(latest=True, script_type=models.ScriptTypes.FULL)) == [1, 2, 4]
+    assert index.pks(index.versions(latest=False)) == [3]
+    assert index.pks(index.versions(homebrewiness=models.Homebrewiness.HYBRID)) == [4]
+    assert index.versions(script_type="Unknown") == 0
+
+
+def test_remove_frees_ordinal(index):
+    index.remove(3)
+    assert index.versions(latest=False) == 0
+    assert index.pks(index.versions()) == [1, 2, 4]
+    index.add(5, characters("imp"), latest=False)
+    assert index.pks(index.versions(latest=False)) == [5]
+
+
+def test_most_similar(index):
+    content = characters(*TROUBLE_BREWING)
+    candidates = index.versions(script_type=models.ScriptTypes.FULL) & ~index.mask([1])
+    # Script 2 shares 7 of 8 characters, script 4 none but makes up the numbers.
+    assert index.most_similar(content, candidates, True, k=2) == [(2, 88), (4, 0)]
+    assert index.most_similar(content, candidates, True, k=1) == [(2, 88)]
+    assert index.most_similar(content, index.versions(latest=False), False, k=5) == [(3, 33)]
+
+
+def test_most_similar_breaks_ties_by_lowest_pk(index):
+    content = characters(*TROUBLE_BREWING[:4])
+    assert index.most_similar(content, index.versions(), True, k=2) == [(3, 100), (1, 50)]
+    index.add(0, characters(*TROUBLE_BREWING), script_type=models.ScriptTypes.FULL)
+    assert index.most_similar(content, index.mask([0, 1]), True, k=1) == [(0, 50)]
+
+
+def create_script_version(script, version, content, script_type=models.ScriptTypes.FULL):
+    return models.ScriptVersion.objects.create(
+        script=script,
+        version=version,
+        content=content,
+        script_type=script_type,
+        num_townsfolk=0,
+        num_outsiders=0,
+        num_minions=0,
+        num_demons=0,
+        num_fabled=0,
+        num_loric=0,
+        num_travellers=0,
+    )
+
+
+@pytest.mark.django_db
+def test_similar_scripts_are_latest_versions(monkeypatch):
+    monkeypatch.setattr(character_index, "_index", CharacterIndex())
+    script = models.Script.objects.create(name="Trouble Brewing")
+    create_script_version(script, "1.0.0", characters(*TROUBLE_BREWING))
+    other = models.Script.objects.create(name="Other")
+    create_script_version(other, "1.0.0", characters(*TROUBLE_BREWING))
+    create_script_version(other, "2.0.0", characters(*TROUBLE_BREWING[:-1], "vortox"))
+    teensyville = create_script_version(
+        models.Script.objects.create(name="Teensy"),
+        "1.0.0",
+        characters(*TROUBLE_BREWING[:4]),
+        script_type=models.ScriptTypes.TEENSYVILLE,
+    )
+    character_index.get_character_index()
+
+    # Flagging the old version as no longer the latest is picked up when the index syncs.
+    versions.update_latest_flags()
+    response = Client().get(f"/script/{script.pk}/1.0.0/similar").json()
+
+    # The old version of Other shares every character but is no longer the latest.
+    assert response == {
+        "full": [{"value": 88, "name": "Other", "scriptPK": other.pk}],
+        "teensyville": [{"value": 33, "name": "Teensy", "scriptPK": teensyville.script.pk}],
+    }
+
+
+def test_approximate_candidates_wait_for_lsh(index):
+    content = characters(*TROUBLE_BREWING)
+    assert index.approximate_candidates(content, index.versions()) is None
+    index._lsh_thread.join(timeout=10)
+    # Scripts sharing many characters share bands, unlike a script with a single character.
+    assert index.pks(index.approximate_candidates(content, index.versions())) == [1, 2, 3]
+    assert index.pks(index.approximate_candidates(content, index.versions(latest=False))) == [3]
+
+
+def test_approximate_candidates_are_capped_by_bands_shared(index):
+    index.build_lsh()
+    content = characters(*TROUBLE_BREWING)
+    assert index.pks(index.approximate_candidates(content, index.versions(), limit=1)) == [1]
+
+
+def test_lsh_catches_up_with_changes_while_building(index):
+    def add_while_building(pk, characters):
+        # Another request changed the index while the LSH index was being built.
+        index.remove(2)
+        index.add(5, characters, script_type=models.ScriptTypes.FULL)
+        lsh.add = original_add
+        original_add(pk, characters)
+
+    lsh = minhash.MinHashLSH()
+    original_add = lsh.add
+    lsh.add = add_while_building
+    index.build_lsh(lsh)
+
+    candidates = index.approximate_candidates(characters(*TROUBLE_BREWING), index.versions())
+    assert sorted(index.pks(candidates)) == [1, 3, 5]
+
+
+@pytest.fixture
+def similar_versions(monkeypatch):
+    monkeypatch.setattr(character_index, "_index", CharacterIndex())
+    versions = {}
+    for name, content, script_type, homebrewiness in [
+        ("Trouble Brewing", TROUBLE_BREWING, models.ScriptTypes.FULL, models.Homebrewiness.CLOCKTOWER),
+        ("Vortox Brewing", [*TROUBLE_BREWING[:-1], "vortox"], models.ScriptTypes.FULL, models.Homebrewiness.CLOCKTOWER),
+        ("Homebrewing", [*TROUBLE_BREWING[:-2], "fanmade"], models.ScriptTypes.FULL, models.Homebrewiness.HYBRID),
+        ("Teensy", TROUBLE_BREWING[:4], models.ScriptTypes.TEENSYVILLE, models.Homebrewiness.CLOCKTOWER),
+    ]:
+        script_version = create_script_version(
+            models.Script.objects.create(name=name), "1.0.0", characters(*content), script_type
+        )
+        script_version.homebrewiness = homebrewiness
+        script_version.save()
+        versions[name] = script_version
+    return versions
+
+
+def get_similar(script_version, **params):
+    response = Client().get(f"/api/scripts/{script_version.pk}/similar/", params)
+    assert response.status_code == 200
+    return [(result["name"], result["similarity"]) for result in response.json()]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("lsh_built", [False, True])
+def test_similar_endpoint(similar_versions, lsh_built):
+    if lsh_built:
+        character_index.get_character_index().build_lsh()
+    trouble_brewing = similar_versions["Trouble Brewing"]
+
+    assert get_similar(trouble_brewing) == [("Vortox Brewing", 88), ("Homebrewing", 75), ("Teensy", 33)]
+    assert get_similar(trouble_brewing, k=1) == [("Vortox Brewing", 88)]
+    assert get_similar(trouble_brewing, script_type="Teensyville") == [("Teensy", 33)]
+    assert get_similar(trouble_brewing, homebrewiness="hybrid") == [("Homebrewing", 75)]
+    assert get_similar(trouble_brewing, homebrewiness="0") == [("Vortox Brewing", 88), ("Teensy", 33)]
+    assert get_similar(trouble_brewing, script_type="Full", homebrewiness="Clocktower") == [("Vortox Brewing", 88)]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "params, error",
+    [
+        ({"k": "ten"}, "k must be an integer."),
+        ({"script_type": "Huge"}, "Invalid script type."),
+        ({"homebrewiness": "official"}, "Invalid homebrewiness."),
+    ],
+)
+def test_similar_endpoint_rejects_invalid_parameters(similar_versions, params, error):
+    response = Client().get(f"/api/scripts/{similar_versions['Trouble Brewing'].pk}/similar/", params)
+    assert response.status_code == 400
+    assert response.json() == {"error": error}
+
+
+@pytest.mark.django_db
+def test_similar_endpoint_clamps_k(similar_versions):
+    assert len(get_similar(similar_versions["Trouble Brewing"], k=0)) == 1
+    assert len(get_similar(similar_versions["Trouble Brewing"], k=1000)) == 3
+
+
+@pytest.mark.django_db
+def test_similar_endpoint_lsh_matches_exact(monkeypatch):
+    monkeypatch.setattr(character_index, "_index", CharacterIndex())
+    rng = random.Random(0)
+    pool = [f"character{number}" for number in range(200)]
+    script_versions = []
+    for base_number in range(3):
+        base = rng.sample(pool, 20)
+        for variant in range(4):
+            content = base[: 20 - variant] + rng.sample(pool, variant)
+            script = models.Script.objects.create(name=f"Script {base_number}.{variant}")
+            script_versions.append(create_script_version(script, "1.0.0", characters(*content)))
+    character_index.get_character_index().build_lsh()
+
+    for script_version in script_versions:
+        assert get_similar(script_version, k=3) == get_similar(script_version, k=3, exact="true")
+
+
+@pytest.mark.django_db
+def test_similar_endpoint_without_lsh(similar_versions, settings, monkeypatch):
+    index = character_index.get_character_index()
+    index.build_lsh()
+    monkeypatch.setattr(index, "approximate_candidates", lambda *args, **kwargs: pytest.fail("used LSH"))
+    trouble_brewing = similar_versions["Trouble Brewing"]
+    expected = [("Vortox Brewing", 88), ("Homebrewing", 75), ("Teensy", 33)]
+
+    assert get_similar(trouble_brewing, exact="true") == expected
+    settings.SIMILAR_SCRIPTS_USE_LSH = False
+    assert get_similar(trouble_brewing) == expected
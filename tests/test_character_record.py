@@ -0,0 +1,48 @@
+import pickle
+from types import SimpleNamespace
+
+import pytest
+from scripts.character_record import CharacterRecord
+
+
+def test_create_splits_reminders():
+    record = CharacterRecord.create("washerwoman", "Washerwoman", "Townsfolk", reminders="Townsfolk,Wrong,")
+    assert record.reminders == ("Townsfolk", "Wrong")
+
+
+def test_create_without_reminders():
+    assert CharacterRecord.create("virgin", "Virgin", "Townsfolk").reminders == ()
+    assert CharacterRecord.create("virgin", "Virgin", "Townsfolk", reminders=None).reminders == ()
+
+
+def test_create_interns_character_type():
+    # Decoding builds a new string each time, where a literal would already be interned.
+    first = CharacterRecord.create("imp", "Imp", b"Demon".decode())
+    second = CharacterRecord.create("po", "Po", b"Demon".decode())
+    assert first.character_type is second.character_type
+
+
+def test_from_character_without_edition():
+    character = SimpleNamespace(
+        character_id="homebrew",
+        character_name="Homebrew",
+        character_type="Minion",
+        first_night_position=12.0,
+        other_night_position=None,
+        reminders="Poisoned",
+    )
+    record = CharacterRecord.from_character(character)
+    assert record.edition is None
+    assert record.first_night_position == 12.0
+    assert record.reminders == ("Poisoned",)
+
+
+def test_record_is_immutable():
+    record = CharacterRecord.create("imp", "Imp", "Demon", edition=0)
+    with pytest.raises(AttributeError):
+        record.character_name = "Not the Imp"
+
+
+def test_pickle_round_trip():
+    records = {"imp": CharacterRecord.create("imp", "Imp", "Demon", edition=0, other_night_position=24.0)}
+    assert pickle.loads(pickle.dumps(records)) == records
@@ -0,0 +1,30 @@
+import copy
+import json as js
+import os
+from scripts.script_json import get_json_diff
+
+current_dir = os.path.dirname(os.path.realpath(__file__))
+
+
+def test_diff():
+    with open(os.path.join(current_dir, "input/trouble_brewing_with_meta.json"), "r") as f:
+        v1 = js.load(f)
+    with open(os.path.join(current_dir, "input/pies_baking.json"), "r") as f:
+        v2 = js.load(f)
+    diff = get_json_diff(v1, v2)
+    assert diff.additions == [{"id": "noble"}, {"id": "cannibal"}, {"id": "marionette"}]
+    assert diff.deletions == [{"id": "investigator"}, {"id": "undertaker"}]
+    assert diff.changes == []
+
+
+def test_diff_does_not_modify_scripts():
+    with open(os.path.join(current_dir, "input/hybrid1.json"), "r") as f:
+        v1 = js.load(f)
+    with open(os.path.join(current_dir, "input/hybrid2.json"), "r") as f:
+        v2 = js.load(f)
+    v1_copy = copy.deepcopy(v1)
+    v2_copy = copy.deepcopy(v2)
+    diff = get_json_diff(v1, v2)
+    assert diff.changes == [{"id": "custom_imp"}]
+    assert v1 == v1_copy
+    assert v2 == v2_copy
@@ -0,0 +1,49 @@
+import gzip
+import json as js
+from datetime import datetime, timezone
+
+import pytest
+from scripts import export
+
+
+def test_parse_since_pk():
+    assert export.parse_since("1234") == {"pk__gt": 1234}
+
+
+def test_parse_since_timestamp():
+    assert export.parse_since("2025-01-02T03:04:05+01:00") == {
+        "created__gt": datetime.fromisoformat("2025-01-02T03:04:05+01:00")
+    }
+
+
+def test_parse_since_naive_timestamp_is_utc():
+    assert export.parse_since("2025-01-02T03:04:05") == {
+        "created__gt": datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    }
+
+
+def test_parse_since_date():
+    assert export.parse_since("2025-01-02") == {"created__gt": datetime(2025, 1, 2, tzinfo=timezone.utc)}
+
+
+@pytest.mark.parametrize("since", ["yesterday", "-5", "2025-13-01"])
+def test_parse_since_invalid(since):
+    with pytest.raises(ValueError):
+        export.parse_since(since)
+
+
+def test_encode_ndjson_chunks():
+    rows = [{"pk": pk, "name": f"Script {pk}", "content": [{"id": "imp"}]} for pk in range(100)]
+    chunks = list(export.encode_ndjson(rows, chunk_size=1024))
+
+    assert len(chunks) > 1
+    assert all(chunk.endswith(b"\n") for chunk in chunks)
+    assert [js.loads(line) for line in b"".join(chunks).splitlines()] == rows
+
+
+def test_gzip_chunks():
+    rows = [{"pk": pk, "created": datetime(2025, 1, 2, tzinfo=timezone.utc)} for pk in range(10)]
+    data = gzip.decompress(b"".join(export.gzip_chunks(export.encode_ndjson(rows))))
+    lines = [js.loads(line) for line in data.splitlines()]
+    assert lines[0] == {"pk": 0, "created": "2025-01-02T00:00:00Z"}
+    assert len(lines) == 10
@@ -0,0 +1,94 @@
+import pytest
+from django.core.cache import cache as shared_cache
+from django.db import transaction
+from scripts import cache, models
+
+pytestmark = pytest.mark.django_db
+
+
+def create_character(character_id, character_name, **kwargs):
+    return models.HomebrewCharacter.objects.create(
+        character_id=character_id,
+        character_name=character_name,
+        ability="",
+        character_type=models.CharacterType.TOWNSFOLK,
+        **kwargs,
+    )
+
+
+def test_characters_cached_once_committed(django_capture_on_commit_callbacks):
+    # Bring this worker's local copies up to date, so it can add the character to them.
+    cache.get_homebrew_characters([])
+    with django_capture_on_commit_callbacks(execute=True):
+        create_character("hb_cook", "Cook")
+        assert cache._local_homebrew_characters.get("hb_cook") is None
+        assert shared_cache.get(cache.get_homebrew_character_cache_key("hb_cook")) is None
+
+    assert cache._local_homebrew_characters.get("hb_cook").character_name == "Cook"
+    assert shared_cache.get(cache.get_homebrew_character_cache_key("hb_cook")).character_name == "Cook"
+    assert cache.get_homebrew_characters(["hb_cook", "hb_unknown"])["hb_cook"].character_name == "Cook"
+
+
+def test_rolled_back_characters_not_cached(django_capture_on_commit_callbacks):
+    cache.get_homebrew_characters([])
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        try:
+            with transaction.atomic():
+                create_character("hb_cook", "Cook")
+                raise ValueError
+        except ValueError:
+            pass
+
+    assert callbacks == []
+    assert cache._local_homebrew_characters.get("hb_cook") is None
+    assert cache.get_homebrew_characters(["hb_cook"]) == {}
+
+
+def test_change_drops_only_changed_characters(django_capture_on_commit_callbacks):
+    create_character("hb_cook", "Cook")
+    create_character("hb_baker", "Baker")
+    assert set(cache.get_homebrew_characters(["hb_cook", "hb_baker"])) == {"hb_cook", "hb_baker"}
+
+    # Another worker renames the cook.
+    version = shared_cache.incr(cache.HOMEBREW_CHARACTERS_VERSION_CACHE_KEY)
+    shared_cache.set(f"{cache.HOMEBREW_CHARACTERS_CHANGE_CACHE_KEY_PREFIX}:{version}", ["hb_cook"])
+    models.HomebrewCharacter.objects.filter(character_id="hb_cook").update(character_name="Chef")
+    shared_cache.delete(cache.get_homebrew_character_cache_key("hb_cook"))
+
+    characters = cache.get_homebrew_characters(["hb_cook", "hb_baker"])
+    assert characters["hb_cook"].character_name == "Chef"
+    assert cache._local_homebrew_characters.get("hb_baker").character_name == "Baker"
+
+
+def test_unknown_changes_drop_every_character():
+    create_character("hb_baker", "Baker")
+    cache.get_homebrew_characters(["hb_baker"])
+
+    # The change wasn't recorded, e.g. it expired before this worker saw it.
+    shared_cache.incr(cache.HOMEBREW_CHARACTERS_VERSION_CACHE_KEY)
+    cache.get_homebrew_characters([])
+
+    assert len(cache._local_homebrew_characters) == 0
+
+
+def test_load_does_not_overwrite_newer_character():
+    create_character("hb_cook", "Cook")
+    # A change committed after the character was read from the database has cached the new name.
+    shared_cache.set(
+        cache.get_homebrew_character_cache_key("hb_cook"),
+        cache.CharacterRecord.create("hb_cook", "Chef", models.CharacterType.TOWNSFOLK),
+    )
+
+    assert cache._load_homebrew_characters({"hb_cook"})["hb_cook"].character_name == "Cook"
+    assert shared_cache.get(cache.get_homebrew_character_cache_key("hb_cook")).character_name == "Chef"
+
+
+def test_deleted_characters_cached_as_missing(django_capture_on_commit_callbacks):
+    character = create_character("hb_cook", "Cook")
+    cache.get_homebrew_characters(["hb_cook"])
+
+    with django_capture_on_commit_callbacks(execute=True):
+        character.delete()
+
+    assert shared_cache.get(cache.get_homebrew_character_cache_key("hb_cook")) is cache.MISSING_CHARACTER
+    assert cache.get_homebrew_characters(["hb_cook"]) == {}
@@ -0,0 +1,40 @@
+from scripts.lru import LRUCache
+
+
+def test_get_many_returns_cached_entries():
+    lru = LRUCache(10)
+    lru.set_many({"imp": 1, "po": 2})
+    assert lru.get_many(["imp", "po", "vortox"]) == {"imp": 1, "po": 2}
+    assert lru.get("vortox", "missing") == "missing"
+
+
+def test_evicts_least_recently_used():
+    lru = LRUCache(2)
+    lru.set_many({"imp": 1, "po": 2})
+    lru.get("imp")
+    lru.set_many({"vortox": 3})
+    assert len(lru) == 2
+    assert lru.get_many(["imp", "po", "vortox"]) == {"imp": 1, "vortox": 3}
+
+
+def test_set_many_larger_than_max_size_keeps_newest():
+    lru = LRUCache(2)
+    lru.set_many({"imp": 1, "po": 2, "vortox": 3})
+    assert lru.get_many(["imp", "po", "vortox"]) == {"po": 2, "vortox": 3}
+
+
+def test_overwriting_updates_value():
+    lru = LRUCache(2)
+    lru.set_many({"imp": 1})
+    lru.set_many({"imp": 2})
+    assert len(lru) == 1
+    assert lru.get("imp") == 2
+
+
+def test_delete_many_and_clear():
+    lru = LRUCache(10)
+    lru.set_many({"imp": 1, "po": 2, "vortox": 3})
+    lru.delete_many(["imp", "legion"])
+    assert lru.get_many(["imp", "po", "vortox"]) == {"po": 2, "vortox": 3}
+    lru.clear()
+    assert len(lru) == 0
@@ -0,0 +1,64 @@
+import json as js
+import os
+import pytest
+from scripts.minhash import MinHashLSH
+from scripts.script_json import get_character_ids
+
+current_dir = os.path.dirname(os.path.realpath(__file__))
+
+
+def load_characters(filename):
+    with open(os.path.join(current_dir, filename), "r") as f:
+        return get_character_ids(js.load(f))
+
+
+def test_identical_scripts_are_candidates():
+    lsh = MinHashLSH()
+    lsh.add(1, load_characters("input/trouble_brewing.json"))
+    lsh.add(2, load_characters("input/pies_baking.json"))
+    # Identical scripts share every band.
+    assert lsh.candidates(load_characters("input/trouble_brewing_with_meta.json"))[1] == lsh.bands
+
+
+def test_near_duplicate_is_candidate():
+    characters = load_characters("input/trouble_brewing.json")
+    lsh = MinHashLSH()
+    lsh.add(1, characters[:-1])
+    assert 1 in lsh.candidates(characters)
+
+
+def test_remove():
+    characters = load_characters("input/trouble_brewing.json")
+    lsh = MinHashLSH()
+    lsh.add(1, characters)
+    lsh.remove(1)
+    assert len(lsh) == 0
+    assert not lsh.candidates(characters)
+
+
+def test_shared_bands():
+    characters = load_characters("input/trouble_brewing.json")
+    lsh = MinHashLSH()
+    lsh.add(1, characters)
+    lsh.add(2, characters)
+    lsh.add(3, characters)
+    assert lsh.candidates(characters) == {1: lsh.bands, 2: lsh.bands, 3: lsh.bands}
+    lsh.remove(2)
+    lsh.remove(1)
+    assert lsh.candidates(characters) == {3: lsh.bands}
+    lsh.add(3, characters)
+    assert lsh.candidates(characters) == {3: lsh.bands}
+
+
+def test_empty_script():
+    lsh = MinHashLSH()
+    assert lsh.signature([]) == ()
+    assert len(lsh.band_hashes([])) == 0
+    lsh.add(1, [])
+    assert len(lsh) == 0
+    assert not lsh.candidates([])
+
+
+def test_bands_must_divide_permutations():
+    with pytest.raises(ValueError):
+        MinHashLSH(num_permutations=100, bands=32)
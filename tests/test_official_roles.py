@@ -0,0 +1,82 @@
+import json as js
+from scripts import official_roles
+
+
+def write_roles(path, role_ids):
+    with open(path, "w") as f:
+        js.dump([{"id": role_id, "name": role_id.title()} for role_id in role_ids], f)
+
+
+def test_refresh_from_file(tmp_path):
+    roles = tmp_path / "roles.json"
+    snapshot = tmp_path / "snapshot.json"
+    write_roles(roles, ["washerwoman", "imp"])
+
+    assert official_roles.refresh(url=roles.as_uri(), path=snapshot)
+    assert official_roles.get_official_role_ids(snapshot) == {"washerwoman", "imp"}
+
+
+def wait_for_first_load():
+    if official_roles._first_load_thread is not None:
+        official_roles._first_load_thread.join(timeout=10)
+
+
+def test_missing_snapshot_is_fetched_in_the_background(tmp_path, settings, monkeypatch):
+    monkeypatch.setattr(official_roles, "_first_load_failed_at", None)
+    roles = tmp_path / "roles.json"
+    snapshot = tmp_path / "snapshot.json"
+    write_roles(roles, ["washerwoman", "imp"])
+    settings.OFFICIAL_ROLES_URL = roles.as_uri()
+
+    # The roles aren't waited for, so there are none until the snapshot has been fetched.
+    assert official_roles.get_official_role_ids(snapshot) == frozenset()
+    wait_for_first_load()
+    assert snapshot.exists()
+    assert official_roles.get_official_role_ids(snapshot) == {"washerwoman", "imp"}
+
+
+def test_failed_first_fetch_is_not_retried_straight_away(tmp_path, settings, monkeypatch):
+    monkeypatch.setattr(official_roles, "_first_load_failed_at", None)
+    roles = tmp_path / "roles.json"
+    snapshot = tmp_path / "snapshot.json"
+    settings.OFFICIAL_ROLES_URL = roles.as_uri()
+
+    assert official_roles.get_official_role_ids(snapshot) == frozenset()
+    wait_for_first_load()
+    write_roles(roles, ["washerwoman", "imp"])
+    assert official_roles.get_official_role_ids(snapshot) == frozenset()
+    wait_for_first_load()
+    assert not snapshot.exists()
+
+    monkeypatch.setattr(official_roles, "_first_load_failed_at", None)
+    official_roles.get_official_role_ids(snapshot)
+    wait_for_first_load()
+    assert official_roles.get_official_role_ids(snapshot) == {"washerwoman", "imp"}
+
+
+def test_refresh_unchanged(tmp_path):
+    roles = tmp_path / "roles.json"
+    snapshot = tmp_path / "snapshot.json"
+    write_roles(roles, ["washerwoman", "imp"])
+
+    assert official_roles.refresh(url=roles.as_uri(), path=snapshot)
+    assert not official_roles.refresh(url=roles.as_uri(), path=snapshot)
+    assert official_roles.refresh(url=roles.as_uri(), path=snapshot, force=True)
+
+
+def test_refresh_changed(tmp_path):
+    roles = tmp_path / "roles.json"
+    snapshot = tmp_path / "snapshot.json"
+    write_roles(roles, ["washerwoman", "imp"])
+    official_roles.refresh(url=roles.as_uri(), path=snapshot)
+    assert "kazali" not in official_roles.get_official_role_ids(snapshot)
+
+    write_roles(roles, ["washerwoman", "imp", "kazali"])
+    assert official_roles.refresh(url=roles.as_uri(), path=snapshot)
+    assert "kazali" in official_roles.get_official_role_ids(snapshot)
+
+
+def test_corrupt_snapshot(tmp_path):
+    snapshot = tmp_path / "snapshot.json"
+    snapshot.write_text("not json")
+    assert official_roles.get_official_role_ids(snapshot) == frozenset()
@@ -0,0 +1,93 @@
+import pytest
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from scripts import models, serializers
+from scripts.pagination import ScriptPagination
+
+
+def get_pagination(ordering):
+    pagination = ScriptPagination()
+    pagination.ordering = ScriptPagination.keyset_orderings[ordering]
+    return pagination
+
+
+def test_cursor_round_trip():
+    pagination = get_pagination("-score")
+    cursor = pagination.encode_cursor([12, 3456])
+    assert pagination.decode_cursor(cursor) == [12, 3456]
+
+
+def test_empty_cursor_is_first_page():
+    assert get_pagination("-pk").decode_cursor("") is None
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", "WzEsIDJd", "eyJwayI6IDF9"])
+def test_invalid_cursor(cursor):
+    # The second cursor has two keys for a one key ordering, the third isn't a list.
+    with pytest.raises(NotFound):
+        get_pagination("-pk").decode_cursor(cursor)
+
+
+@pytest.fixture
+def script_versions():
+    # Scores repeat so that pages have to break ties on the pk.
+    script_versions = []
+    for number in range(7):
+        script = models.Script.objects.create(name=f"Script {number}", num_likes=number % 3)
+        script_versions.append(
+            script.versions.create(
+                version="1.0.0",
+                content=[],
+                num_townsfolk=0,
+                num_outsiders=0,
+                num_minions=0,
+                num_demons=0,
+                num_fabled=0,
+                num_loric=0,
+                num_travellers=0,
+            )
+        )
+    return script_versions
+
+
+def get_all_pages(client, params):
+    pks = []
+    response = client.get("/api/scripts/", {"cursor": "", "page_size": 2, "all_scripts": "true", **params})
+    while True:
+        assert response.status_code == 200, response.data
+        pks.extend(result["pk"] for result in response.data["results"])
+        if response.data["next"] is None:
+            return pks
+        response = client.get(response.data["next"])
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "ordering, key",
+    [
+        ("pk", lambda script_version: script_version.pk),
+        ("-pk", lambda script_version: -script_version.pk),
+        ("score", lambda script_version: (script_version.script.num_likes, script_version.pk)),
+        ("-score", lambda script_version: (-script_version.script.num_likes, -script_version.pk)),
+    ],
+)
+def test_keyset_pages(script_versions, ordering, key):
+    pks = get_all_pages(APIClient(), {"ordering": ordering})
+    assert pks == [script_version.pk for script_version in sorted(script_versions, key=key)]
+
+
+@pytest.mark.django_db
+def test_keyset_pages_with_fields(script_versions):
+    response = APIClient().get("/api/scripts/", {"cursor": "", "all_scripts": "true", "fields": "pk,score"})
+    assert [set(result) for result in response.data["results"]] == [{"pk", "score"}] * len(script_versions)
+
+
+@pytest.mark.parametrize("method", ["get", "post", "put"])
+def test_fields_only_trim_reads(method):
+    request = Request(getattr(APIRequestFactory(), method)("/api/scripts/?fields=pk"))
+    fields = set(serializers.ScriptSerializer(context={"request": request}).fields)
+    if method == "get":
+        assert fields == {"pk"}
+    else:
+        assert fields == set(serializers.ScriptSerializer.Meta.fields)
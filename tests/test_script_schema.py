@@ -0,0 +1,78 @@
+import json as js
+import os
+import pytest
+import requests
+from jsonschema.exceptions import ValidationError
+from scripts import script_schema
+
+current_dir = os.path.dirname(os.path.realpath(__file__))
+
+SCHEMA = {
+    "$schema": "http://json-schema.org/draft-07/schema#",
+    "type": "array",
+    "items": {
+        "oneOf": [
+            {
+                "type": "object",
+                "properties": {"id": {"type": "string"}},
+                "required": ["id"],
+                "additionalProperties": False,
+            },
+            {"type": "string"},
+        ]
+    },
+}
+
+
+@pytest.fixture
+def schema_url(tmp_path):
+    path = tmp_path / "script-schema.json"
+    with open(path, "w") as f:
+        js.dump(SCHEMA, f)
+    return path.as_uri()
+
+
+def test_pin_and_validate(tmp_path, schema_url):
+    schema_dir = tmp_path / "schemas"
+    script_schema.pin_schema("v1.0.0", url=schema_url, schema_dir=schema_dir)
+    validator = script_schema.get_validator("v1.0.0", schema_dir=schema_dir)
+    assert validator is not None
+    assert validator is script_schema.get_validator("v1.0.0", schema_dir=schema_dir)
+
+    with open(os.path.join(current_dir, "input/hybrid1.json"), "r") as f:
+        validator.validate(js.load(f))
+    with pytest.raises(ValidationError):
+        validator.validate([{"name": "No ID"}])
+
+
+def test_missing_schema_is_fetched_and_pinned(tmp_path, schema_url, monkeypatch, caplog):
+    monkeypatch.setattr(script_schema, "get_schema_url", lambda version: schema_url)
+    schema_dir = tmp_path / "schemas"
+    validator = script_schema.get_validator("v1.0.0", schema_dir=schema_dir)
+    assert validator is not None
+    with pytest.raises(ValidationError):
+        validator.validate([{"name": "No ID"}])
+    assert script_schema.get_schema_path("v1.0.0", schema_dir).exists()
+    assert "hasn't been pinned" in caplog.text
+
+
+def test_missing_schema_that_cant_be_fetched(tmp_path, monkeypatch, caplog):
+    def get(url, timeout):
+        assert timeout == script_schema.FETCH_TIMEOUT
+        raise requests.Timeout()
+
+    monkeypatch.setattr(script_schema.requests, "get", get)
+    assert script_schema.get_validator("v1.0.0", schema_dir=tmp_path) is None
+    assert "scripts won't be validated" in caplog.text
+
+    # The fetch is retried rather than validation being left off.
+    monkeypatch.setattr(script_schema.requests, "get", lambda url, timeout: pytest.fail("retried"))
+    with pytest.raises(pytest.fail.Exception):
+        script_schema.get_validator("v1.0.0", schema_dir=tmp_path)
+
+
+def test_invalid_schema(tmp_path):
+    path = script_schema.get_schema_path("v1.0.0", tmp_path)
+    with open(path, "w") as f:
+        js.dump({"type": "array"}, f)
+    assert script_schema.get_validator("v1.0.0", schema_dir=tmp_path) is None
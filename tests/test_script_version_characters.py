@@ -0,0 +1,129 @@
+import pytest
+from django.contrib.admin import site
+from django.contrib.auth.models import Permission, User
+from django.forms import modelform_factory
+from django.test import RequestFactory
+from rest_framework.test import APIClient
+from scripts import filters, models
+from scripts.admin import ScriptVersionAdmin
+
+pytestmark = pytest.mark.django_db
+
+CONTENT = [
+    {"id": "_meta", "name": "Sync Test", "author": "Tester"},
+    {"id": "washerwoman"},
+    "imp",
+    {"id": "synctesthomebrew", "name": "Homebrew", "team": "minion", "ability": "Does something."},
+]
+
+
+@pytest.fixture
+def characters():
+    models.ClocktowerCharacter.objects.create(
+        character_id="washerwoman",
+        character_name="Washerwoman",
+        ability="You start knowing that 1 of 2 players is a particular Townsfolk.",
+        character_type=models.CharacterType.TOWNSFOLK,
+        edition=models.Edition.BASE,
+    )
+    models.ClocktowerCharacter.objects.create(
+        character_id="imp",
+        character_name="Imp",
+        ability="Each night*, choose a player: they die.",
+        character_type=models.CharacterType.DEMON,
+        edition=models.Edition.BASE,
+    )
+
+
+@pytest.fixture
+def client():
+    user = User.objects.create_user("uploader", "uploader@example.com", "password")
+    user.user_permissions.add(Permission.objects.get(codename="api_write_permission"))
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def upload(client, name="Sync Test", version="1.0.0", content=CONTENT):
+    response = client.post(
+        "/api/scripts/",
+        {"name": name, "version": version, "script_type": models.ScriptTypes.FULL, "content": content},
+        format="json",
+    )
+    assert response.status_code == 201, response.data
+    return models.ScriptVersion.plain_objects.get(pk=response.data["pk"])
+
+
+def test_upload_indexes_characters(characters, client):
+    script_version = upload(client)
+
+    assert list(
+        script_version.characters.order_by("position").values_list("character_id", "character_type", "position")
+    ) == [
+        ("washerwoman", models.CharacterType.TOWNSFOLK, 0),
+        ("imp", models.CharacterType.DEMON, 1),
+        ("synctesthomebrew", models.CharacterType.MINION, 2),
+    ]
+
+
+def test_uploaded_script_found_by_character_filters(characters, client):
+    script_version = upload(client)
+    other = upload(client, name="Other Script", content=[{"id": "washerwoman"}])
+    queryset = models.ScriptVersion.plain_objects.all()
+
+    assert list(filters.include_characters(queryset, "Imp")) == [script_version]
+    assert set(filters.include_characters(queryset, "Washerwoman")) == {script_version, other}
+    assert list(filters.exclude_characters(queryset, "Imp")) == [other]
+
+    response = client.get("/api/scripts/", {"include": "synctesthomebrew", "include_hybrid": "true"})
+    assert [result["pk"] for result in response.data["results"]] == [script_version.pk]
+
+
+def test_bulk_import_indexes_characters(characters, client):
+    response = client.post(
+        "/api/scripts/import/",
+        [{"name": "Bulk Sync Test", "version": "1.0.0", "script_type": models.ScriptTypes.FULL, "content": CONTENT}],
+        format="json",
+    )
+    assert response.status_code == 200, response.data
+    assert response.data["created"] == 1, response.data["results"][0].get("errors")
+    script_version = models.ScriptVersion.plain_objects.get(script__name="Bulk Sync Test")
+
+    assert list(script_version.characters.order_by("position").values_list("character_id", flat=True)) == [
+        "washerwoman",
+        "imp",
+        "synctesthomebrew",
+    ]
+
+
+def test_bulk_import_validates_against_schema(characters, client):
+    response = client.post(
+        "/api/scripts/import/",
+        [
+            {
+                "name": "Bad Team",
+                "version": "1.0.0",
+                "script_type": models.ScriptTypes.FULL,
+                "content": [{"id": "imp", "team": 5}],
+            }
+        ],
+        format="json",
+    )
+    assert response.status_code == 200, response.data
+    assert response.data["created"] == 0
+    assert response.data["results"][0]["errors"][0].startswith("Content does not conform to the script schema")
+
+
+def test_admin_edit_reindexes_characters(characters, client):
+    script_version = upload(client)
+    admin = User.objects.create_superuser("admin", "admin@example.com", "password")
+    request = RequestFactory().post("/")
+    request.user = admin
+    form = modelform_factory(models.ScriptVersion, fields=["content"])(
+        instance=script_version, data={"content": '[{"id": "imp"}]'}
+    )
+    assert form.is_valid(), form.errors
+
+    ScriptVersionAdmin(models.ScriptVersion, site).save_model(request, form.save(commit=False), form, change=True)
+
+    assert list(script_version.characters.values_list("character_id", flat=True)) == ["imp"]
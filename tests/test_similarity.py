@@ -1,7 +1,7 @@
 import json as js
 import os
 import pytest
-from scripts.script_json import get_similarity
+from scripts.script_json import get_character_ids, get_similarity, get_similarity_score
 
 current_dir = os.path.dirname(os.path.realpath(__file__))
 
@@ -101,3 +101,26 @@ def test_large_vs_small_script():
     assert reverse == 5
     reverse = get_similarity(v2, v1, False)
     assert reverse == 8
+
+
+@pytest.mark.parametrize(
+    "orig, new",
+    [
+        ("input/trouble_brewing.json", "input/trouble_brewing.json"),
+        ("input/trouble_brewing.json", "input/strings_pulling_with_meta.json"),
+        ("input/trouble_brewing.json", "input/half_of_the_108.json"),
+        ("input/trouble_brewing.json", "input/pies_baking.json"),
+        ("input/trouble_brewing.json", "input/just_the_drunk.json"),
+        ("input/strings_pulling.json", "input/pies_baking.json"),
+    ],
+)
+@pytest.mark.parametrize("same_type", [True, False])
+def test_score_from_shared_characters(orig, new, same_type):
+    with open(os.path.join(current_dir, orig), "r") as f:
+        v1 = js.load(f)
+    with open(os.path.join(current_dir, new), "r") as f:
+        v2 = js.load(f)
+    ids1 = get_character_ids(v1)
+    ids2 = get_character_ids(v2)
+    shared = len(set(ids1) & set(ids2))
+    assert get_similarity_score(shared, len(ids1), len(ids2), same_type) == get_similarity(v1, v2, same_type)
@@ -0,0 +1,161 @@
+import multiprocessing
+import threading
+import time
+
+import pytest
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.db import connections
+
+from scripts import single_flight
+from scripts.single_flight import CacheEntry
+
+
+def make_cache(name):
+    return LocMemCache(name, {})
+
+
+def test_computes_on_miss_and_caches():
+    cache = make_cache("test_computes_on_miss_and_caches")
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"imp": "Demon"}
+
+    assert single_flight.get_or_compute(cache, "characters", compute, 60) == {"imp": "Demon"}
+    assert single_flight.get_or_compute(cache, "characters", compute, 60) == {"imp": "Demon"}
+    assert len(calls) == 1
+    assert cache.get("characters:lock") is None
+
+
+def test_force_recomputes():
+    cache = make_cache("test_force_recomputes")
+    single_flight.get_or_compute(cache, "characters", lambda: 1, 60)
+    assert single_flight.get_or_compute(cache, "characters", lambda: 2, 60, force=True) == 2
+    assert single_flight.get_or_compute(cache, "characters", lambda: 3, 60) == 2
+
+
+def test_ignores_values_not_cached_by_it():
+    cache = make_cache("test_ignores_values_not_cached_by_it")
+    cache.set("characters", {"imp": "Demon"})
+    assert single_flight.get_or_compute(cache, "characters", lambda: "recomputed", 60) == "recomputed"
+
+
+def test_one_rebuild_under_concurrent_misses():
+    cache = make_cache("test_one_rebuild_under_concurrent_misses")
+    calls = []
+    calls_lock = threading.Lock()
+    barrier = threading.Barrier(50)
+    results = [None] * 50
+
+    def compute():
+        with calls_lock:
+            calls.append(1)
+        time.sleep(0.2)
+        return "characters"
+
+    def request(index):
+        barrier.wait()
+        results[index] = single_flight.get_or_compute(cache, "characters", compute, 60, poll_interval=0.01)
+
+    threads = [threading.Thread(target=request, args=(index,)) for index in range(50)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ["characters"] * 50
+
+
+def request_in_process(barrier, calls, results):
+    def compute():
+        with calls.get_lock():
+            calls.value += 1
+        time.sleep(0.5)
+        return "characters"
+
+    barrier.wait()
+    results.put(single_flight.get_or_compute(caches["shared"], "characters", compute, 60, poll_interval=0.01))
+    connections.close_all()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_one_rebuild_under_concurrent_misses_across_processes(settings):
+    # Workers share the database cache, whose add is atomic as the key is the table's primary key.
+    settings.CACHES = {
+        **settings.CACHES,
+        "shared": {"BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "single_flight_cache"},
+    }
+    call_command("createcachetable", "--database", "default")
+    # Forked processes must open their own database connections rather than share this one.
+    connections.close_all()
+    context = multiprocessing.get_context("fork")
+    barrier = context.Barrier(8)
+    calls = context.Value("i", 0)
+    results = context.Queue()
+
+    processes = [context.Process(target=request_in_process, args=(barrier, calls, results)) for _ in range(8)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=30)
+
+    assert [process.exitcode for process in processes] == [0] * 8
+    assert calls.value == 1
+    assert [results.get(timeout=1) for _ in processes] == ["characters"] * 8
+
+
+def test_lock_taken_by_another_request_is_not_released():
+    cache = make_cache("test_lock_taken_by_another_request_is_not_released")
+
+    def compute():
+        # The lock expired while computing, and another request took it.
+        cache.set("characters:lock", "another request")
+        return "characters"
+
+    assert single_flight.get_or_compute(cache, "characters", compute, 60) == "characters"
+    assert cache.get("characters:lock") == "another request"
+
+
+def test_value_cached_before_lock_taken_is_not_recomputed():
+    cache = make_cache("test_value_cached_before_lock_taken_is_not_recomputed")
+    add = cache.add
+
+    def add_after_another_request_finishes(*args, **kwargs):
+        # Another request cached the value and released the lock after this one missed.
+        cache.set("characters", CacheEntry("characters", 1.0, time.time() + 60))
+        return add(*args, **kwargs)
+
+    cache.add = add_after_another_request_finishes
+    assert single_flight.get_or_compute(cache, "characters", lambda: "recomputed", 60) == "characters"
+    assert cache.get("characters:lock") is None
+
+
+def test_stale_value_served_while_another_request_refreshes():
+    cache = make_cache("test_stale_value_served_while_another_request_refreshes")
+    cache.set("characters", CacheEntry("stale", 1.0, time.time() - 1))
+    cache.add("characters:lock", True)
+    assert single_flight.get_or_compute(cache, "characters", lambda: "fresh", 60) == "stale"
+
+
+def test_waits_no_longer_than_lock_timeout():
+    cache = make_cache("test_waits_no_longer_than_lock_timeout")
+    cache.add("characters:lock", True)
+    assert (
+        single_flight.get_or_compute(cache, "characters", lambda: "fresh", 60, lock_timeout=0, poll_interval=0)
+        == "fresh"
+    )
+
+
+def test_should_refresh_gets_likelier_near_expiry():
+    entry = CacheEntry("characters", delta=1.0, expires=1000.0)
+    # With rand = 1 - 1/e the value is refreshed up to delta * beta seconds before it expires.
+    rand = 1 - 1 / 2.718281828459045
+    assert not single_flight.should_refresh(entry, now=998.9, rand=rand)
+    assert single_flight.should_refresh(entry, now=999.1, rand=rand)
+    assert single_flight.should_refresh(entry, beta=2.0, now=998.1, rand=rand)
+    assert single_flight.should_refresh(entry, now=1000.0, rand=0.0)
+    assert not single_flight.should_refresh(entry, now=999.9, rand=0.0)
@@ -0,0 +1,62 @@
+import pytest
+from django.test import Client
+from scripts import models
+
+pytestmark = pytest.mark.django_db
+
+
+def create_script_version(name, content):
+    return models.ScriptVersion.objects.create(
+        script=models.Script.objects.create(name=name),
+        version="1.0.0",
+        content=content,
+        script_type=models.ScriptTypes.FULL,
+        num_townsfolk=0,
+        num_outsiders=0,
+        num_minions=0,
+        num_demons=0,
+        num_fabled=0,
+        num_loric=0,
+        num_travellers=0,
+    )
+
+
+@pytest.fixture
+def script_versions():
+    for character_id, character_type in [
+        ("washerwoman", models.CharacterType.TOWNSFOLK),
+        ("imp", models.CharacterType.DEMON),
+    ]:
+        models.ClocktowerCharacter.objects.create(
+            character_id=character_id,
+            character_name=character_id.title(),
+            ability="",
+            character_type=character_type,
+            edition=models.Edition.BASE,
+        )
+    create_script_version("Objects", [{"id": "_meta", "name": "Objects"}, {"id": "washerwoman"}, {"id": "imp"}])
+    create_script_version("Washerwoman", [{"id": "washerwoman"}])
+    # Old format scripts list bare character IDs, which aren't counted.
+    create_script_version("Old Format", ["washerwoman", "imp"])
+
+
+def get_statistics(**params):
+    response = Client().get("/api/statistics", params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_counts(script_versions):
+    assert get_statistics(total="") == {"total": 3, "washerwoman": 2, "imp": 1}
+
+
+def test_filtered_characters_are_counted(script_versions):
+    # The old format script isn't selected either, so every selected script counts the imp.
+    assert get_statistics(character="imp", total="") == {"total": 1, "washerwoman": 1, "imp": 1}
+    assert get_statistics(exclude="imp", total="") == {"total": 2, "washerwoman": 1, "imp": 0}
+    assert get_statistics(character_or=["imp", "washerwoman"], total="") == {"total": 2, "washerwoman": 2, "imp": 1}
+
+
+def test_unknown_characters(script_versions):
+    assert get_statistics(character_or="unknown", total="") == {"total": 0, "washerwoman": 0, "imp": 0}
+    assert get_statistics(character="unknown", total="") == {"total": 3, "washerwoman": 2, "imp": 1}
@@ -0,0 +1,43 @@
+import pytest
+from django.core.management import call_command
+from scripts import models
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_update_homebrewiness(workers, tmp_path):
+    models.ClocktowerCharacter.objects.create(
+        character_id="imp",
+        character_name="Imp",
+        ability="Each night*, choose a player: they die.",
+        character_type=models.CharacterType.DEMON,
+        edition=models.Edition.BASE,
+    )
+    script = models.Script.objects.create(name="Hybrid Script")
+    for number in range(1, 4):
+        models.ScriptVersion.objects.create(
+            script=script,
+            version=f"{number}.0.0",
+            content=[
+                {"id": "imp"},
+                {"id": "newbrew", "name": "Newbrew", "team": "minion", "ability": "Does something."},
+            ],
+            homebrewiness=models.Homebrewiness.CLOCKTOWER,
+            num_townsfolk=0,
+            num_outsiders=0,
+            num_minions=1,
+            num_demons=1,
+            num_fabled=0,
+            num_loric=0,
+            num_travellers=0,
+        )
+
+    checkpoint = tmp_path / "checkpoint"
+    call_command("update_homebrewiness", "--workers", str(workers), "--batch-size", "2", "--checkpoint", checkpoint)
+
+    assert set(models.ScriptVersion.plain_objects.values_list("homebrewiness", flat=True)) == {
+        models.Homebrewiness.HYBRID
+    }
+    assert models.HomebrewCharacter.objects.filter(character_id="newbrew").exists()
+    assert not checkpoint.exists()
@@ -0,0 +1,53 @@
+import pytest
+from django.contrib.auth.models import User
+from django.template import Context, Template
+from scripts import models
+from scripts.user_scripts import UserScriptLookup
+
+pytestmark = pytest.mark.django_db
+
+TEMPLATE = Template(
+    "{% load botc_script_tags %}"
+    "{% for script_version in script_versions %}"
+    "{% script_not_in_user_collection user script_version as can_add %}"
+    "{% if can_add %}can_add:{{ script_version.pk }} {% endif %}"
+    "{% for collection in user_scripts.collections %}"
+    "{% script_in_collection collection script_version as in_collection %}"
+    "{% if in_collection %}{{ script_version.pk }}:{{ collection.pk }} {% endif %}"
+    "{% endfor %}"
+    "{% endfor %}"
+)
+
+
+def create_script_version(name):
+    return models.Script.objects.create(name=name).versions.create(
+        version="1.0.0",
+        content=[],
+        num_townsfolk=0,
+        num_outsiders=0,
+        num_minions=0,
+        num_demons=0,
+        num_fabled=0,
+        num_loric=0,
+        num_travellers=0,
+    )
+
+
+def test_collection_tags_query_once_for_many_collections(django_assert_num_queries):
+    user = User.objects.create_user("collector")
+    script_versions = [create_script_version(f"Script {number}") for number in range(10)]
+    collections = [models.Collection.objects.create(name=f"Collection {number}", owner=user) for number in range(50)]
+    for collection in collections:
+        collection.scripts.add(script_versions[0])
+    collections[0].scripts.add(script_versions[1])
+
+    context = Context({"user": user, "user_scripts": UserScriptLookup(user), "script_versions": script_versions})
+    # One query for the user's collections and one for the scripts in them.
+    with django_assert_num_queries(2):
+        rendered = TEMPLATE.render(context)
+
+    assert set(rendered.split()) == {
+        *(f"can_add:{script_version.pk}" for script_version in script_versions[1:]),
+        *(f"{script_versions[0].pk}:{collection.pk}" for collection in collections),
+        f"{script_versions[1].pk}:{collections[0].pk}",
+    }
@@ -0,0 +1,115 @@
+import importlib
+
+import pytest
+from django.apps import apps
+from django.contrib.admin import site
+from django.contrib.auth.models import User
+from django.forms import modelform_factory
+from django.test import RequestFactory
+from scripts import constants, models, worldcup
+from scripts.admin import ScriptVersionAdmin
+from scripts.views import update_script
+
+pytestmark = pytest.mark.django_db
+
+backfill = importlib.import_module("scripts.migrations.0051_backfill_worldcupstatistic")
+
+CHARACTERS = {
+    "washerwoman": models.CharacterType.TOWNSFOLK,
+    "librarian": models.CharacterType.TOWNSFOLK,
+    "drunk": models.CharacterType.OUTSIDER,
+    "imp": models.CharacterType.DEMON,
+}
+
+
+@pytest.fixture
+def world_cup_script():
+    for character_id, character_type in CHARACTERS.items():
+        models.ClocktowerCharacter.objects.create(
+            character_id=character_id,
+            character_name=character_id.title(),
+            ability="",
+            character_type=character_type,
+            edition=models.Edition.BASE,
+        )
+    tag = models.ScriptTag.objects.create(pk=constants.WORLD_CUP_TAG_PK, name="World Cup", order=1)
+    script = models.Script.objects.create(name="World Cup Script")
+    contents = [["washerwoman", "drunk", "imp"], ["librarian", "drunk", "imp"], ["librarian", "imp", "homebrew"]]
+    for number, content in enumerate(contents, start=1):
+        script_version = models.ScriptVersion.objects.create(
+            script=script,
+            version=f"{number}.0.0",
+            content=[{"id": character_id} for character_id in content],
+            latest=number == len(contents),
+            num_townsfolk=1,
+            num_outsiders=0,
+            num_minions=0,
+            num_demons=1,
+            num_fabled=0,
+            num_loric=0,
+            num_travellers=0,
+        )
+        script_version.tags.add(tag)
+    models.Script.objects.create(name="Other Script").versions.create(
+        version="1.0.0",
+        content=[{"id": "washerwoman"}],
+        num_townsfolk=1,
+        num_outsiders=0,
+        num_minions=0,
+        num_demons=0,
+        num_fabled=0,
+        num_loric=0,
+        num_travellers=0,
+    )
+    return script
+
+
+def get_statistics():
+    return {
+        statistic.character_id: (statistic.additions, statistic.deletions)
+        for statistic in models.WorldCupStatistic.objects.all()
+    }
+
+
+def test_backfill_matches_rebuild(world_cup_script):
+    backfill.backfill_world_cup_statistics(apps, None)
+    backfilled = get_statistics()
+
+    worldcup.rebuild_world_cup_statistics()
+
+    assert backfilled == get_statistics() == {"washerwoman": (0, 1), "librarian": (1, 0), "drunk": (0, 1)}
+
+
+def test_edit_form_tag_changes_update_statistics(world_cup_script):
+    worldcup.rebuild_world_cup_statistics()
+    latest = world_cup_script.latest_version()
+    staff = User.objects.create_user("staff", is_staff=True)
+    cleaned_data = {"script_type": latest.script_type, "tags": models.ScriptTag.objects.none()}
+
+    update_script(latest, cleaned_data, latest.author, staff)
+    assert get_statistics() == {}
+
+    cleaned_data["tags"] = models.ScriptTag.objects.filter(pk=constants.WORLD_CUP_TAG_PK)
+    update_script(latest, cleaned_data, latest.author, staff)
+    assert get_statistics() == {"washerwoman": (0, 1), "librarian": (1, 0), "drunk": (0, 1)}
+
+
+def test_admin_edits_update_statistics(world_cup_script):
+    worldcup.rebuild_world_cup_statistics()
+    latest = world_cup_script.latest_version()
+    request = RequestFactory().post("/")
+    request.user = User.objects.create_superuser("admin", "admin@example.com", "password")
+    model_admin = ScriptVersionAdmin(models.ScriptVersion, site)
+
+    def edit(**data):
+        form = modelform_factory(models.ScriptVersion, fields=list(data))(instance=latest, data=data)
+        assert form.is_valid(), form.errors
+        model_admin.save_model(request, form.save(commit=False), form, change=True)
+        model_admin.save_related(request, form, [], change=True)
+
+    # The drunk is kept on the latest version, so it's no longer removed.
+    edit(content='[{"id": "librarian"}, {"id": "imp"}, {"id": "drunk"}]')
+    assert get_statistics() == {"washerwoman": (0, 1), "librarian": (1, 0)}
+
+    edit(tags=[])
+    assert get_statistics() == {}